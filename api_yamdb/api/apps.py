@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = "api"
+
+    def ready(self):
+        # Обработчики сигналов для версий токенов и ресурсов API
+        # и проверки постоянных соединений с базой.
+        from . import authentication, cache, connections  # noqa: F401
@@ -0,0 +1,220 @@
+"""
+ASGI-приложение поверх обработчика запросов Django 2.2.
+
+В Django 2.2 нет асинхронных представлений и асинхронного доступа к базе,
+поэтому запрос целиком обрабатывается обычным стеком Django (middleware,
+представления DRF, сериализаторы) в пуле потоков, а цикл событий ASGI-сервера
+только принимает тело запроса и отдаёт ответ. Медленный клиент занимает
+корутину, а не поток с соединением к базе: поток берётся, когда запрос
+полностью получен, и освобождается до отправки ответа. Клиент, закрывший
+соединение до окончания загрузки тела, до базы не доходит. Тело больше
+DATA_UPLOAD_MAX_MEMORY_SIZE не накапливается в памяти: запрос получает
+ответ 413 по заголовку Content-Length или как только принятые части
+превысят предел.
+
+Запросы на чтение публичных списков (READ_PATHS) выполняются в отдельном
+пуле, чтобы записи не отнимали у них потоки. Каждый поток держит своё
+постоянное соединение с базой, поэтому сумма ASGI["READ_THREADS"] и
+ASGI["WRITE_THREADS"] на процесс должна укладываться в число соединений.
+
+Запуск: uvicorn api_yamdb.asgi:application или через gunicorn с
+GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker (см. gunicorn.conf.py).
+"""
+
+import asyncio
+import io
+import json
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+
+READ_METHODS = ("GET", "HEAD")
+READ_PATHS = re.compile(
+    r"^/api/v1/(titles/(\d+/reviews/)?|categories/|genres/)$"
+)
+
+
+def get_environ(scope, body):
+    """
+    Окружение WSGI для HTTP-запроса ASGI.
+    """
+
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+    for name, value in scope.get("headers", ()):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = f"HTTP_{name}"
+        if name in environ:
+            value = f"{environ[name]},{value}"
+        environ[name] = value
+    return environ
+
+
+def get_content_length(scope):
+    """
+    Длина тела из заголовка Content-Length, 0 без него или с неверным.
+    """
+
+    for name, value in scope.get("headers", ()):
+        if name.lower() == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return 0
+    return 0
+
+
+class ThreadPoolApplication:
+    def __init__(self, read_threads=None, write_threads=None):
+        from django.core.handlers.wsgi import WSGIHandler
+
+        self.handler = WSGIHandler()
+        self.read_executor = ThreadPoolExecutor(
+            read_threads or settings.ASGI["READ_THREADS"],
+            thread_name_prefix="asgi-read",
+        )
+        self.write_executor = ThreadPoolExecutor(
+            write_threads or settings.ASGI["WRITE_THREADS"],
+            thread_name_prefix="asgi-write",
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise ValueError(
+                f"Неподдерживаемый тип соединения: {scope['type']}"
+            )
+
+        try:
+            body = await self.read_body(scope, receive)
+        except RequestDataTooBig:
+            await self.send_too_large(send)
+            return
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        status, headers, content = await loop.run_in_executor(
+            self.get_executor(scope), self.handle, get_environ(scope, body)
+        )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": headers,
+            }
+        )
+        await send({"type": "http.response.body", "body": content})
+
+    def get_executor(self, scope):
+        if scope["method"] in READ_METHODS and READ_PATHS.match(
+            scope["path"]
+        ):
+            return self.read_executor
+        return self.write_executor
+
+    async def read_body(self, scope, receive):
+        """
+        Тело запроса целиком или None, если клиент отключился.
+        RequestDataTooBig, если тело больше DATA_UPLOAD_MAX_MEMORY_SIZE.
+        """
+
+        limit = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        if limit is not None and get_content_length(scope) > limit:
+            raise RequestDataTooBig
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return None
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if limit is not None and size > limit:
+                raise RequestDataTooBig
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    async def send_too_large(self, send):
+        content = json.dumps(
+            {"detail": "Слишком большое тело запроса."}, ensure_ascii=False
+        ).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(content)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": content})
+
+    def handle(self, environ):
+        """
+        Обработка запроса обработчиком Django в потоке пула.
+        Ответ читается полностью, чтобы не держать поток во время отправки.
+        """
+
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [int(status.split(" ", 1)[0]), headers]
+
+        response = self.handler(environ, start_response)
+        try:
+            content = b"".join(response)
+        finally:
+            if hasattr(response, "close"):
+                response.close()
+        status, headers = started
+        return (
+            status,
+            [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in headers
+            ],
+            content,
+        )
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.read_executor.shutdown(wait=True)
+                self.write_executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def get_asgi_application():
+    django.setup(set_prefix=False)
+    return ThreadPoolApplication()
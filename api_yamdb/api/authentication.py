@@ -0,0 +1,186 @@
+"""
+Аутентификация по JWT без обращения к базе данных на каждый запрос.
+
+Токен, выданный APIGetToken, содержит имя пользователя, роль и версию
+токенов пользователя. Права проверяются по этим утверждениям, а версия
+сверяется с версией в базе: изменение роли, имени или блокировка
+пользователя увеличивают версию, и выданные ранее токены перестают
+приниматься. Версия берётся из кэша в памяти процесса не старше
+API_AUTH["TOKEN_VERSION_TTL"] секунд, поэтому другие воркеры перестают
+принимать отозванный токен не позже чем через это время. Полная строка
+пользователя нужна только при записи и кэшируется так же на
+API_AUTH["USER_CACHE_TTL"] секунд. В каждом кэше не больше
+API_AUTH["CACHE_SIZE"] пользователей: давно не запрошенные вытесняются.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTTokenUserAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.tokens import AccessToken
+from reviews.models import TOKEN_CLAIMS, User
+
+from api_yamdb.settings import ADMIN, MODERATOR, USER
+
+VERSION_CLAIM = "ver"
+# Версия для удалённых и заблокированных пользователей.
+REVOKED = -1
+
+
+def get_token_for_user(user):
+    token = AccessToken.for_user(user)
+    for claim in TOKEN_CLAIMS:
+        token[claim] = getattr(user, claim)
+    token[VERSION_CLAIM] = user.token_version
+    return token
+
+
+class ProcessCache:
+    """
+    Значения по id пользователя в памяти процесса на
+    API_AUTH[ttl_setting] секунд, не больше API_AUTH["CACHE_SIZE"]
+    значений. Значения упорядочены по последнему обращению: при записи
+    вытесняются устаревшие и давно не запрошенные значения из начала.
+    """
+
+    ttl_setting = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = OrderedDict()
+
+    def load(self, user_id):
+        raise NotImplementedError
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self.lock:
+            expires, value = self.values.get(user_id, (0, None))
+            if expires > now:
+                self.values.move_to_end(user_id)
+        if expires <= now:
+            value = self.load(user_id)
+            self.set(user_id, value)
+        return value
+
+    def set(self, user_id, value):
+        now = time.monotonic()
+        expires = now + settings.API_AUTH[self.ttl_setting]
+        size = settings.API_AUTH["CACHE_SIZE"]
+        with self.lock:
+            self.values[user_id] = (expires, value)
+            self.values.move_to_end(user_id)
+            while self.values:
+                oldest, (oldest_expires, _) = next(iter(self.values.items()))
+                if oldest_expires > now and len(self.values) <= size:
+                    break
+                del self.values[oldest]
+
+    def discard(self, user_id):
+        with self.lock:
+            self.values.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+
+class TokenVersionCache(ProcessCache):
+    ttl_setting = "TOKEN_VERSION_TTL"
+
+    def load(self, user_id):
+        version = (
+            User.objects.filter(pk=user_id, is_active=True)
+            .values_list("token_version", flat=True)
+            .first()
+        )
+        return REVOKED if version is None else version
+
+
+class UserCache(ProcessCache):
+    ttl_setting = "USER_CACHE_TTL"
+
+    def load(self, user_id):
+        user = User.objects.filter(pk=user_id, is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed(
+                "Пользователь не найден!", code="user_not_found"
+            )
+        return user
+
+    def get(self, user_id):
+        # Полная копия: у поверхностной общий с кэшем _state и кэш связей.
+        return copy.deepcopy(super().get(user_id))
+
+
+token_versions = TokenVersionCache()
+user_cache = UserCache()
+
+
+class ClaimsUser(TokenUser):
+    """
+    Пользователь, собранный из утверждений токена.
+    """
+
+    @property
+    def role(self):
+        return self.token.get("role", USER)
+
+    @property
+    def is_user(self):
+        return self.role == USER
+
+    @property
+    def is_admin(self):
+        return self.role == ADMIN
+
+    @property
+    def is_moderator(self):
+        return self.role == MODERATOR
+
+    def get_user(self):
+        return user_cache.get(self.id)
+
+
+def get_db_user(user):
+    """
+    Модель пользователя запроса: для пользователя из токена — из кэша.
+    """
+
+    if isinstance(user, ClaimsUser):
+        return user.get_user()
+    return user
+
+
+class ClaimsJWTAuthentication(JWTTokenUserAuthentication):
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        if VERSION_CLAIM not in validated_token:
+            # Токен выдан до появления утверждений о роли.
+            return user_cache.get(user.id)
+        if token_versions.get(user.id) != validated_token[VERSION_CLAIM]:
+            raise AuthenticationFailed(
+                "Токен отозван, получите новый!", code="token_revoked"
+            )
+        return ClaimsUser(validated_token)
+
+
+@receiver(post_save, sender=User)
+def update_token_version(instance, **kwargs):
+    token_versions.set(
+        instance.pk, instance.token_version if instance.is_active else REVOKED
+    )
+    user_cache.discard(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def revoke_tokens(instance, **kwargs):
+    token_versions.set(instance.pk, REVOKED)
+    user_cache.discard(instance.pk)
@@ -0,0 +1,769 @@
+"""
+Сценарии замеров для команды benchmark.
+
+Сценарий наполняет временную базу данными и возвращает словарь
+{название замера: медиана времени в миллисекундах}. Значение может быть
+и парой (число, единица измерения), например (12000.0, "/s").
+Сценарий endpoints замеряет запросы WORKLOADS через тестовый клиент,
+run_endpoints — те же запросы к запущенному серверу по HTTP. compare
+сравнивает результаты с сохранённой базовой линией.
+"""
+
+import asyncio
+import http.client
+import itertools
+import json
+import math
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from urllib.parse import quote, urlsplit
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+from api_yamdb.settings import ADMIN
+
+from .asgi import ThreadPoolApplication
+from .authentication import get_token_for_user
+from .pagination import KeysetPagination
+from .renderers import FastJSONRenderer
+from .serializers import (ReviewReadSerializer, ReviewSerializer,
+                          TitleReadSerializer, TitleUserSerializer)
+
+SCENARIOS = {}
+BATCH_SIZE = 500
+PERCENTILES = (50, 95, 99)
+# Объёмы набора данных сценария endpoints для 1000 произведений.
+DATASET = {
+    "users": 200,
+    "categories": 10,
+    "genres": 20,
+    "titles": 1000,
+    "reviews": 5000,
+    "comments": 10000,
+}
+ADMIN_USERNAME = "benchmark-admin"
+
+# Запросы сценария endpoints: метод, путь и тело. В пути подставляются
+# id произведения и отзыва, slug жанра и год из ответов самого API.
+WORKLOADS = {
+    "titles": ("GET", "/api/v1/titles/", None),
+    "titles filtered": (
+        "GET", "/api/v1/titles/?genre={genre}&year={year}", None
+    ),
+    "titles search": ("GET", "/api/v1/titles/?search=произведение", None),
+    "title": ("GET", "/api/v1/titles/{title}/", None),
+    "reviews": ("GET", "/api/v1/titles/{title}/reviews/", None),
+    "review": ("GET", "/api/v1/titles/{title}/reviews/{review}/", None),
+    "comments": (
+        "GET", "/api/v1/titles/{title}/reviews/{review}/comments/", None
+    ),
+    "categories": ("GET", "/api/v1/categories/", None),
+    "genres": ("GET", "/api/v1/genres/", None),
+    "users": ("GET", "/api/v1/users/", None),
+    "me": ("GET", "/api/v1/users/me/", None),
+    "comment create": (
+        "POST",
+        "/api/v1/titles/{title}/reviews/{review}/comments/",
+        {"text": "Комментарий из замера"},
+    ),
+}
+# Запросы, которым нужен токен администратора.
+AUTH_WORKLOADS = {"users", "me", "comment create"}
+
+
+@contextmanager
+def benchmark_database(cache=False):
+    """
+    Временная база для замеров: рабочая база не меняется. Кэш ответов
+    API отключается, если не передан cache, а ограничение частоты
+    запросов — всегда: замеры шлют много запросов с одного адреса.
+    """
+
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True
+    )
+    try:
+        with override_settings(
+            API_CACHE=dict(settings.API_CACHE, ENABLED=cache),
+            API_THROTTLE=dict(settings.API_THROTTLE, ENABLED=False),
+        ):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def scenario(func):
+    SCENARIOS[func.__name__] = func
+    return func
+
+
+def measure(func, repeat):
+    """
+    Медиана времени выполнения func за repeat запусков (после прогрева).
+    """
+
+    func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def get(client, url):
+    def request():
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+
+    return request
+
+
+def seed_users(count, prefix="user"):
+    users = (
+        User(username=f"{prefix}{i}", email=f"{prefix}{i}@yamdb.fake")
+        for i in range(count)
+    )
+    User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+    return list(
+        User.objects.filter(username__startswith=prefix).values_list(
+            "pk", flat=True
+        )
+    )
+
+
+def seed_title(name="Произведение"):
+    category, _ = Category.objects.get_or_create(
+        slug="category", defaults={"name": "Категория"}
+    )
+    genre, _ = Genre.objects.get_or_create(
+        slug="genre", defaults={"name": "Жанр"}
+    )
+    title = Title.objects.create(name=name, year=2000, category=category)
+    title.genre.add(genre)
+    return title
+
+
+def seed_reviews(title, count):
+    user_ids = seed_users(count, prefix=f"reviewer{title.pk}-")
+    reviews = (
+        Review(
+            title=title,
+            author_id=user_id,
+            text=f"Отзыв {i}",
+            score=i % 10 + 1,
+        )
+        for i, user_id in enumerate(user_ids)
+    )
+    Review.objects.bulk_create(reviews, batch_size=BATCH_SIZE)
+    Title.objects.filter(pk=title.pk).update_ratings()
+
+
+def seed_dataset(
+    users, categories, genres, titles, reviews, comments, seed=0
+):
+    """
+    Воспроизводимый набор данных для сценария endpoints. Отзыв i написан
+    пользователем (i // titles) % users о произведении i % titles, поэтому
+    отзывов не может быть больше users * titles.
+    """
+
+    if reviews > users * titles:
+        raise ValueError(
+            f"Отзывов не может быть больше {users * titles} "
+            "(пользователей × произведений)."
+        )
+    rng = random.Random(seed)
+    User.objects.create(
+        username=ADMIN_USERNAME, email=f"{ADMIN_USERNAME}@yamdb.fake",
+        role=ADMIN,
+    )
+    user_ids = sorted(seed_users(users, prefix="visitor"))
+    Category.objects.bulk_create(
+        Category(name=f"Категория {i}", slug=f"category{i}")
+        for i in range(categories)
+    )
+    Genre.objects.bulk_create(
+        Genre(name=f"Жанр {i}", slug=f"genre{i}") for i in range(genres)
+    )
+    category_ids = list(Category.objects.values_list("pk", flat=True))
+    genre_ids = list(Genre.objects.values_list("pk", flat=True))
+    Title.objects.bulk_create(
+        (
+            Title(
+                name=f"Произведение {i}",
+                year=rng.randint(1950, 2020),
+                description=f"Описание произведения {i}",
+                category_id=category_ids[i % len(category_ids)],
+            )
+            for i in range(titles)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    title_ids = list(
+        Title.objects.order_by("pk").values_list("pk", flat=True)
+    )
+    Title.genre.through.objects.bulk_create(
+        (
+            Title.genre.through(title_id=title_id, genre_id=genre_id)
+            for i, title_id in enumerate(title_ids)
+            for genre_id in {
+                genre_ids[i % len(genre_ids)],
+                genre_ids[(i * 7 + 1) % len(genre_ids)],
+            }
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    Review.objects.bulk_create(
+        (
+            Review(
+                title_id=title_ids[i % titles],
+                author_id=user_ids[i // titles % users],
+                text=f"Отзыв {i}",
+                score=rng.randint(1, 10),
+            )
+            for i in range(reviews)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    review_ids = list(
+        Review.objects.order_by("pk").values_list("pk", flat=True)
+    )
+    Comment.objects.bulk_create(
+        (
+            Comment(
+                review_id=review_ids[i % len(review_ids)],
+                author_id=user_ids[i % users],
+                text=f"Комментарий {i}",
+            )
+            for i in range(comments if review_ids else 0)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    Title.objects.update_ratings()
+
+
+def get_dataset(size=None):
+    """
+    Объёмы набора данных для size произведений: остальные объёмы
+    пропорциональны DATASET.
+    """
+
+    size = size or DATASET["titles"]
+    dataset = {
+        name: max(count * size // DATASET["titles"], 1)
+        for name, count in DATASET.items()
+    }
+    dataset["reviews"] = min(
+        dataset["reviews"], dataset["users"] * dataset["titles"]
+    )
+    return dataset
+
+
+def percentile(values, percent):
+    """
+    Процентиль по ближайшему рангу для отсортированного списка.
+    """
+
+    rank = max(math.ceil(len(values) * percent / 100), 1)
+    return values[rank - 1]
+
+
+def summarize(timings, elapsed):
+    """
+    Число запросов, запросы в секунду и процентили времени ответа в мс.
+    """
+
+    timings = sorted(timings)
+    result = {
+        "requests": len(timings),
+        "rps": len(timings) / max(elapsed, 1e-9),
+    }
+    for percent in PERCENTILES:
+        result[f"p{percent}"] = percentile(timings, percent) * 1000
+    return result
+
+
+class LocalClient:
+    """
+    Запросы через тестовый клиент DRF в текущем процессе.
+    """
+
+    counts_queries = True
+
+    def __init__(self, token=None):
+        self.client = APIClient()
+        if token:
+            self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    @classmethod
+    def for_admin(cls):
+        admin = User.objects.get(username=ADMIN_USERNAME)
+        return cls(str(get_token_for_user(admin)))
+
+    def request(self, method, path, data=None):
+        response = self.client.generic(
+            method,
+            path,
+            json.dumps(data) if data else "",
+            content_type="application/json",
+        )
+        return response.status_code, response.content
+
+
+class HTTPClient:
+    """
+    Запросы к запущенному серверу через одно keep-alive соединение.
+    """
+
+    counts_queries = False
+
+    def __init__(self, base_url, token=None):
+        parts = urlsplit(base_url)
+        connection_class = (
+            http.client.HTTPSConnection
+            if parts.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self.connection = connection_class(parts.netloc, timeout=30)
+        self.prefix = parts.path.rstrip("/")
+        self.headers = {"Content-Type": "application/json"}
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+
+    def request(self, method, path, data=None):
+        body = json.dumps(data) if data else None
+        try:
+            self.connection.request(
+                method,
+                quote(self.prefix + path, safe="/?=&"),
+                body,
+                self.headers,
+            )
+            response = self.connection.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            raise
+
+
+def get_path_values(client):
+    """
+    Значения для путей WORKLOADS из ответов API: первое произведение
+    списка, его первый отзыв, жанр и год. Отсутствующие значения
+    не подставляются, и такие запросы пропускаются.
+    """
+
+    values = {}
+    status, content = client.request("GET", "/api/v1/titles/")
+    titles = json.loads(content)["results"] if status == 200 else []
+    if titles:
+        values.update(title=titles[0]["id"], year=titles[0]["year"])
+        if titles[0]["genre"]:
+            values["genre"] = titles[0]["genre"][0]["slug"]
+        status, content = client.request(
+            "GET", f"/api/v1/titles/{values['title']}/reviews/"
+        )
+        reviews = json.loads(content)["results"] if status == 200 else []
+        if reviews:
+            values["review"] = reviews[0]["id"]
+    return values
+
+
+def run_workload(client, method, path, data, count):
+    """
+    Первый запрос прогревает кэши и считает SQL-запросы, затем count
+    запросов подряд замеряются.
+    """
+
+    def send():
+        status, content = client.request(method, path, data)
+        if status >= 400:
+            raise ValueError(f"{method} {path}: ответ {status}")
+
+    queries = None
+    if client.counts_queries:
+        with CaptureQueriesContext(connection) as context:
+            send()
+        queries = len(context)
+    else:
+        send()
+
+    timings = []
+    started = time.perf_counter()
+    for _ in range(count):
+        request_started = time.perf_counter()
+        send()
+        timings.append(time.perf_counter() - request_started)
+    result = summarize(timings, time.perf_counter() - started)
+    result["queries"] = queries
+    return result
+
+
+def run_endpoints(client, admin_client, repeat):
+    """
+    Все запросы WORKLOADS: процентили времени ответа, пропускная
+    способность и, если клиент их считает, SQL-запросы на ответ.
+    Запросы с авторизацией без admin_client пропускаются.
+    """
+
+    values = get_path_values(client)
+    results = {}
+    for name, (method, path, data) in WORKLOADS.items():
+        workload_client = admin_client if name in AUTH_WORKLOADS else client
+        try:
+            path = path.format(**values)
+        except KeyError:
+            continue
+        if workload_client is None:
+            continue
+        result = run_workload(workload_client, method, path, data, repeat)
+        for percent in PERCENTILES:
+            results[f"{name} p{percent}"] = result[f"p{percent}"]
+        results[f"{name} rps"] = result["rps"], "/s"
+        if result["queries"] is not None:
+            results[f"{name} SQL"] = result["queries"], "queries"
+    return results
+
+
+def is_regression(value, old, unit, threshold):
+    if unit == "queries":
+        return value > old
+    if unit == "/s":
+        return value < old * (1 - threshold / 100)
+    return value > old * (1 + threshold / 100)
+
+
+def compare(results, baseline, threshold):
+    """
+    Регрессии относительно базовой линии в формате
+    {сценарий: {замер: (значение, единица)}}: время выросло или
+    пропускная способность упала больше чем на threshold процентов,
+    либо выросло число SQL-запросов. Новые замеры не сравниваются.
+    """
+
+    regressions = []
+    for name, measurements in results.items():
+        old_measurements = baseline.get(name, {})
+        for label, (value, unit) in measurements.items():
+            if label not in old_measurements:
+                continue
+            old, _ = old_measurements[label]
+            if is_regression(value, old, unit, threshold):
+                regressions.append(
+                    f"{name}, {label}: {old:.2f} -> {value:.2f} {unit}"
+                )
+    return regressions
+
+
+@scenario
+def pagination(size=None, repeat=20):
+    """
+    Первая и последняя страница отзывов: номер страницы против курсора.
+    """
+
+    size = size or 100_000
+    title = seed_title()
+    seed_reviews(title, size)
+    page_size = PageNumberPagination.page_size
+    last_page = max(size // page_size, 1)
+    url = f"/api/v1/titles/{title.pk}/reviews/"
+
+    boundary = (
+        Review.objects.filter(title=title)
+        .order_by("pub_date", "pk")[(last_page - 1) * page_size - 1]
+        if last_page > 1
+        else None
+    )
+    last_cursor = (
+        KeysetPagination.make_cursor(boundary) if boundary else ""
+    )
+
+    client = APIClient()
+    return {
+        "page 1": measure(get(client, f"{url}?page=1"), repeat),
+        f"page {last_page}": measure(
+            get(client, f"{url}?page={last_page}"), repeat
+        ),
+        "cursor page 1": measure(get(client, f"{url}?cursor="), repeat),
+        f"cursor page {last_page}": measure(
+            get(client, f"{url}?cursor={last_cursor}"), repeat
+        ),
+    }
+
+
+@scenario
+def conditional(size=None, repeat=20):
+    """
+    Полный ответ на список отзывов против 304 по If-None-Match.
+    """
+
+    size = size or 1000
+    title = seed_title()
+    seed_reviews(title, size)
+    url = f"/api/v1/titles/{title.pk}/reviews/"
+    client = APIClient()
+    etag = client.get(url)["ETag"]
+
+    def not_modified():
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, response.status_code
+
+    return {
+        "reviews 200": measure(get(client, url), repeat),
+        "reviews 304": measure(not_modified, repeat),
+    }
+
+
+SEARCH_WORDS = (
+    "побег", "отец", "миля", "война", "мир", "тишина", "город", "звезда",
+    "ночь", "дорога", "остров", "море", "песня", "сердце", "зима", "солнце",
+)
+
+
+@scenario
+def search(size=None, repeat=20):
+    """
+    Поиск произведений: icontains по названию против полнотекстового поиска.
+    """
+
+    size = size or 1_000_000
+    rng = random.Random(size)
+    category = seed_title().category
+    titles = (
+        Title(
+            name=" ".join(rng.sample(SEARCH_WORDS, 3)) + f" {i}",
+            description=" ".join(rng.sample(SEARCH_WORDS, 5)),
+            year=2000,
+            category=category,
+        )
+        for i in range(size)
+    )
+    Title.objects.bulk_create(titles, batch_size=BATCH_SIZE)
+
+    client = APIClient()
+    url = "/api/v1/titles/"
+    return {
+        "name icontains": measure(get(client, f"{url}?name=остров"), repeat),
+        "search": measure(get(client, f"{url}?search=остров"), repeat),
+        "search prefix": measure(get(client, f"{url}?search=остр"), repeat),
+        "search typo": measure(get(client, f"{url}?search=астров"), repeat),
+    }
+
+
+@scenario
+def signup(size=None, repeat=20):
+    """
+    Регистрация через API (1000 / время = регистраций в секунду) и массовое
+    создание size пользователей с кодами подтверждения.
+    """
+
+    size = size or 1000
+    client = APIClient()
+    numbers = itertools.count()
+
+    def request():
+        number = next(numbers)
+        response = client.post(
+            "/api/v1/auth/signup/",
+            {
+                "username": f"signup{number}",
+                "email": f"signup{number}@yamdb.fake",
+            },
+        )
+        assert response.status_code == 200, response.status_code
+
+    def bulk():
+        prefix = f"bulk{next(numbers)}-"
+        User.objects.bulk_create(
+            (
+                User(username=f"{prefix}{i}", email=f"{prefix}{i}@yamdb.fake")
+                for i in range(size)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+    return {
+        "signup request": measure(request, repeat),
+        f"bulk_create {size} users": measure(bulk, max(repeat // 10, 1)),
+    }
+
+
+@scenario
+def asgi(size=None, repeat=20):
+    """
+    Список произведений через ASGI-приложение при разном числе
+    одновременных клиентов: время пачки запросов, делённое на их число.
+    """
+
+    size = size or 1000
+    category = seed_title().category
+    Title.objects.bulk_create(
+        (
+            Title(name=f"Произведение {i}", year=2000, category=category)
+            for i in range(size)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    application = ThreadPoolApplication()
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/v1/titles/",
+        "query_string": b"",
+        "headers": [(b"host", b"testserver")],
+    }
+
+    async def request():
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            sent.append(message)
+
+        await application(scope, receive, send)
+        assert sent[0]["status"] == 200, sent[0]["status"]
+
+    def batch(concurrency):
+        async def run():
+            await asyncio.gather(*(request() for _ in range(concurrency)))
+
+        return lambda: asyncio.run(run())
+
+    results = {}
+    try:
+        for concurrency in (1, 4, 16, 64):
+            results[f"{concurrency} concurrent, per request"] = (
+                measure(batch(concurrency), repeat) / concurrency
+            )
+    finally:
+        application.read_executor.shutdown()
+        application.write_executor.shutdown()
+    return results
+
+
+@scenario
+def serializers(size=None, repeat=20):
+    """
+    Сериализации в секунду: ModelSerializer против сериализатора для
+    чтения на size произведениях и отзывах, загруженных заранее.
+    """
+
+    size = size or 1000
+    title = seed_title()
+    genres = list(title.genre.all())
+    Title.objects.bulk_create(
+        (
+            Title(
+                name=f"Произведение {i}",
+                year=2000,
+                description=f"Описание {i}",
+                category=title.category,
+            )
+            for i in range(size - 1)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    Title.genre.through.objects.bulk_create(
+        (
+            Title.genre.through(title_id=title_id, genre_id=genres[0].pk)
+            # Произведения этого сценария создаются после title, у прочих
+            # сценариев запуска жанр уже может быть.
+            for title_id in Title.objects.filter(pk__gt=title.pk).values_list(
+                "pk", flat=True
+            )
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    seed_reviews(title, size)
+    titles = list(
+        Title.objects.filter(pk__gte=title.pk)
+        .select_related("category")
+        .prefetch_related("genre")
+    )
+    reviews = list(
+        Review.objects.filter(title=title).select_related("title", "author")
+    )
+
+    def rate(serializer, objects):
+        def serialize():
+            return serializer(objects, many=True).data
+
+        return len(objects) * 1000 / measure(serialize, repeat), "/s"
+
+    return {
+        "TitleUserSerializer": rate(TitleUserSerializer, titles),
+        "TitleReadSerializer": rate(TitleReadSerializer, titles),
+        "ReviewSerializer": rate(ReviewSerializer, reviews),
+        "ReviewReadSerializer": rate(ReviewReadSerializer, reviews),
+    }
+
+
+@scenario
+def renderers(size=None, repeat=20):
+    """
+    JSONRenderer DRF против FastJSONRenderer: страница из 100 произведений
+    и список из size отзывов.
+    """
+
+    size = size or 10_000
+    title = seed_title()
+    Title.objects.bulk_create(
+        (
+            Title(
+                name=f"Произведение {i}",
+                year=2000,
+                description=f"Описание {i}",
+                category=title.category,
+            )
+            for i in range(99)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    seed_reviews(title, size)
+    page = {
+        "count": 100,
+        "next": None,
+        "previous": None,
+        "results": TitleReadSerializer(
+            Title.objects.select_related("category").prefetch_related(
+                "genre"
+            ),
+            many=True,
+        ).data,
+    }
+    reviews = ReviewReadSerializer(
+        Review.objects.select_related("title", "author"), many=True
+    ).data
+
+    results = {}
+    for renderer in (JSONRenderer(), FastJSONRenderer()):
+        name = type(renderer).__name__
+        results[f"{name}, 100 titles"] = measure(
+            lambda: renderer.render(page), repeat
+        )
+        results[f"{name}, {size} reviews"] = measure(
+            lambda: renderer.render(reviews), repeat
+        )
+    return results
+
+
+@scenario
+def endpoints(size=None, repeat=20):
+    """
+    Эндпоинты API из WORKLOADS на наборе данных из size произведений:
+    процентили времени ответа, запросы в секунду и SQL-запросы на ответ.
+    """
+
+    seed_dataset(**get_dataset(size))
+    return run_endpoints(LocalClient(), LocalClient.for_admin(), repeat)
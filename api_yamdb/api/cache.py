@@ -0,0 +1,233 @@
+"""
+Версии ресурсов API и кэш ответов публичных эндпоинтов на чтение.
+
+Ключ ответа строится из адреса запроса (путь и отсортированные параметры),
+класса аутентификации и версий ресурсов, от которых зависит ответ. Версии
+хранятся в базе (api.models.ResourceVersion) и увеличиваются обработчиками
+сигналов моделей, поэтому запись в любом процессе, в том числе через
+админку, сразу меняет ключи и ETag во всех воркерах. Старые ответы
+перестают находиться по ключу и вытесняются по TTL без полной очистки
+кэша. Обработчики сигналов внутри транзакции только собирают ресурсы, а
+версии увеличиваются один раз при её фиксации (каскадное удаление
+произведения с отзывами и комментариями — один запрос). Команды, пишущие
+в базу в обход моделей, увеличивают версии сами: rebuild_ratings — версию
+произведений, import_data — общую версию ALL_RESOURCES, от которой
+зависят все ответы.
+"""
+
+import hashlib
+import threading
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+from . import metrics
+from .models import ResourceVersion
+
+RESPONSE_PREFIX = "api-cache-response"
+# Версия, от которой зависят все ответы.
+ALL_RESOURCES = "*"
+
+# Имена кэшируемых вьюсетов для отчёта о попаданиях и промахах.
+CACHED_VIEWS = set()
+
+
+def get_cache():
+    return caches[settings.API_CACHE["ALIAS"]]
+
+
+def is_enabled():
+    return settings.API_CACHE["ENABLED"]
+
+
+def get_versions(resources):
+    """
+    Текущие версии ресурсов и время последнего изменения любого из них,
+    одним запросом к базе. Версия ресурса, в который ещё не писали, — 0,
+    время изменения без записей — начало эпохи.
+    """
+
+    names = [ALL_RESOURCES, *resources]
+    rows = {
+        name: (version, modified.timestamp())
+        for name, version, modified in ResourceVersion.objects.filter(
+            name__in=names
+        ).values_list("name", "version", "modified")
+    }
+    versions = [rows.get(name, (0, 0))[0] for name in names]
+    last_modified = max((modified for _, modified in rows.values()), default=0)
+    return versions, last_modified
+
+
+def bump_versions(resources):
+    """
+    Увеличение версий ресурсов одним запросом INSERT ... ON CONFLICT:
+    строки ресурсов, в которые ещё не писали, создаются с версией 1.
+    Строки блокируются в порядке имён, чтобы параллельные транзакции
+    не ждали друг друга по кругу.
+    """
+
+    names = sorted(set(resources))
+    if not names:
+        return
+    table = connection.ops.quote_name(ResourceVersion._meta.db_table)
+    modified = connection.ops.adapt_datetimefield_value(timezone.now())
+    values = ", ".join(["(%s, 1, %s)"] * len(names))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (name, version, modified) VALUES {values} "
+            f"ON CONFLICT (name) DO UPDATE SET version = {table}.version + 1, "
+            "modified = EXCLUDED.modified",
+            [value for name in names for value in (name, modified)],
+        )
+
+
+class PendingVersions(threading.local):
+    """
+    Ресурсы, изменённые в текущей транзакции потока.
+    """
+
+    def __init__(self):
+        self.resources = set()
+
+
+pending = PendingVersions()
+
+
+def bump_on_commit(resources):
+    """
+    Увеличение версий при фиксации транзакции, вне транзакции — сразу.
+    Каждый вызов регистрирует обработчик on_commit, но версии всех
+    ресурсов транзакции увеличивает первый из них. Ресурсы отменённой
+    транзакции увеличиваются со следующей: лишняя смена версии только
+    сбрасывает кэш.
+    """
+
+    if not transaction.get_connection().in_atomic_block:
+        bump_versions(resources)
+        return
+    pending.resources.update(resources)
+    transaction.on_commit(bump_pending)
+
+
+def bump_pending():
+    resources, pending.resources = pending.resources, set()
+    bump_versions(resources)
+
+
+def bump_all():
+    bump_versions([ALL_RESOURCES])
+
+
+def fingerprint(request, versions):
+    """
+    Отпечаток ответа: адрес запроса, класс аутентификации, формат ответа
+    и версии ресурсов. Служит и ключом кэша, и ETag.
+    """
+
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    authenticator = request.successful_authenticator
+    renderer = getattr(request, "accepted_renderer", None)
+    parts = (
+        request.get_host(),
+        request.path,
+        query,
+        type(authenticator).__name__ if authenticator else "anonymous",
+        renderer.format if renderer else "",
+        *map(str, versions),
+    )
+    return hashlib.md5("|".join(parts).encode()).hexdigest()
+
+
+def record(name, outcome):
+    metrics.registry.count((metrics.CACHE, name, outcome))
+
+
+def get_stats():
+    """
+    Число попаданий и промахов кэша по каждому вьюсету во всех процессах.
+    """
+
+    counters = metrics.get_counters(metrics.CACHE)
+    return {
+        name: {
+            outcome: counters.get((name, outcome), 0)
+            for outcome in ("hits", "misses")
+        }
+        for name in sorted(CACHED_VIEWS)
+    }
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_categories(**kwargs):
+    bump_on_commit(["categories", "titles"])
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def bump_genres(**kwargs):
+    bump_on_commit(["genres", "titles"])
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def bump_title(instance, created=False, **kwargs):
+    # Название произведения выводится в его отзывах.
+    bump_on_commit(
+        ["titles"] if created else ["titles", f"reviews:{instance.pk}"]
+    )
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def bump_title_genres(action, **kwargs):
+    if action.startswith("post_"):
+        bump_on_commit(["titles"])
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_title(instance, **kwargs):
+    # Обработчик рейтинга в post_save обновляет загруженное произведение.
+    instance._previous_title_id = getattr(instance, "_loaded_title_id", None)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def bump_review(instance, created=False, **kwargs):
+    # Отзывы меняют рейтинг произведения, а текст отзыва выводится
+    # в его комментариях.
+    resources = ["titles", f"reviews:{instance.title_id}"]
+    previous = getattr(instance, "_previous_title_id", None)
+    if previous is not None and previous != instance.title_id:
+        resources.append(f"reviews:{previous}")
+    if not created:
+        resources.append(f"comments:{instance.pk}")
+    bump_on_commit(resources)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment(instance, **kwargs):
+    bump_on_commit([f"comments:{instance.review_id}"])
+
+
+@receiver(pre_save, sender=User)
+def remember_username_change(instance, **kwargs):
+    loaded = getattr(instance, "_loaded_username", None)
+    instance._username_changed = loaded not in (None, instance.username)
+
+
+@receiver(post_save, sender=User)
+def bump_users(instance, **kwargs):
+    # Из данных пользователя в отзывах и комментариях выводится только
+    # имя. Отзывы и комментарии удалённого пользователя удаляются
+    # каскадом и меняют версии своих списков сами.
+    if getattr(instance, "_username_changed", False):
+        bump_on_commit(["users"])
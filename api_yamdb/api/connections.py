@@ -0,0 +1,43 @@
+"""
+Проверка постоянных соединений с базой данных.
+
+При CONN_MAX_AGE > 0 соединение переживает запрос и может оказаться
+разорванным сервером, пока поток простаивал (перезапуск PostgreSQL,
+таймаут pgbouncer). Django 2.2 узнаёт об этом только по ошибке в самом
+запросе, поэтому перед запросом соединение, которое простаивало дольше
+HEALTH_CHECK_IDLE секунд, проверяется и при необходимости закрывается;
+следующий запрос к базе откроет новое. Проверка включается ключом
+CONN_HEALTH_CHECKS в настройках соединения, как в Django 4.1.
+"""
+
+import time
+
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.dispatch import receiver
+
+HEALTH_CHECK_IDLE = 10
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    now = time.monotonic()
+    for connection in connections.all():
+        idle_since = getattr(connection, "idle_since", None)
+        if (
+            connection.connection is None
+            or not connection.settings_dict.get("CONN_HEALTH_CHECKS")
+            or idle_since is None
+            or now - idle_since < HEALTH_CHECK_IDLE
+        ):
+            continue
+        if not connection.is_usable():
+            connection.close()
+
+
+@receiver(request_finished)
+def mark_idle(**kwargs):
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.idle_since = now
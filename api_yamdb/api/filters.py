@@ -1,18 +1,42 @@
+from django.conf import settings
 from django_filters import rest_framework as filters
+from rest_framework.exceptions import ValidationError
 from reviews.models import Title
 
 
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
+
+
 class TitleFilter(filters.FilterSet):
     """
     Фильтр для произведений: данные фильтруются по полям slug категории,
-    slug жанра, по названию и по году.
+    slug жанра, по названию и по году. Параметр search — полнотекстовый
+    поиск по названию и описанию с сортировкой по релевантности, ids —
+    список id произведений через запятую.
     """
 
     category = filters.CharFilter(field_name="category__slug")
     genre = filters.CharFilter(field_name="genre__slug")
     name = filters.CharFilter(field_name="name", lookup_expr="icontains")
     year = filters.NumberFilter(field_name="year")
+    search = filters.CharFilter(method="search_titles")
+    ids = NumberInFilter(method="filter_ids")
 
     class Meta:
         model = Title
-        fields = ("category", "genre", "year", "name")
+        fields = ("category", "genre", "year", "name", "search", "ids")
+
+    def search_titles(self, queryset, name, value):
+        return queryset.search(value)
+
+    def filter_ids(self, queryset, name, value):
+        value = [pk for pk in value if pk is not None]
+        if not value:
+            return queryset
+        limit = settings.TITLES_BULK["MAX_ITEMS"]
+        if len(value) > limit:
+            raise ValidationError(
+                {name: [f"Не больше {limit} id в одном запросе!"]}
+            )
+        return queryset.filter(pk__in=value).order_by("pk")
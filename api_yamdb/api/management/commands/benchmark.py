@@ -0,0 +1,151 @@
+import json
+
+from api.benchmarks import (SCENARIOS, HTTPClient, benchmark_database, compare,
+                            get_dataset, run_endpoints, seed_dataset)
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+THRESHOLD = 25
+
+
+class Command(BaseCommand):
+    help = (
+        "Run API benchmark scenarios against a temporary database, "
+        "with an optional baseline comparison"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "scenarios",
+            nargs="*",
+            help=f"Сценарии: {', '.join(SCENARIOS)} (по умолчанию все).",
+        )
+        parser.add_argument(
+            "--size",
+            type=int,
+            help="Объём тестовых данных сценария.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Число замеров каждого запроса.",
+        )
+        parser.add_argument(
+            "--cache",
+            action="store_true",
+            help="Не отключать кэш ответов API на время замеров.",
+        )
+        parser.add_argument(
+            "--http",
+            metavar="URL",
+            help=(
+                "Замерять сценарий endpoints на запущенном сервере по HTTP "
+                "(например http://localhost:8000) вместо временной базы."
+            ),
+        )
+        parser.add_argument(
+            "--token",
+            help="Токен администратора для запросов с авторизацией (--http).",
+        )
+        parser.add_argument(
+            "--seed-only",
+            action="store_true",
+            help=(
+                "Наполнить рабочую базу данными сценария endpoints "
+                "для --http."
+            ),
+        )
+        parser.add_argument(
+            "--save",
+            help="Сохранить результаты в JSON-файл базовой линии.",
+        )
+        parser.add_argument(
+            "--compare",
+            help="Сравнить с базовой линией и завершиться ошибкой при "
+            "регрессии.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=THRESHOLD,
+            help="Допустимое ухудшение времени и rps в процентах.",
+        )
+
+    def handle(self, *args, **options):
+        names = options["scenarios"] or list(SCENARIOS)
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(
+                f"Неизвестные сценарии: {', '.join(sorted(unknown))}"
+            )
+
+        if options["seed_only"]:
+            with transaction.atomic():
+                seed_dataset(**get_dataset(options["size"]))
+            self.stdout.write(self.style.SUCCESS("Данные созданы."))
+            return
+        try:
+            if options["http"]:
+                results = self.run_http(options)
+            else:
+                with benchmark_database(cache=options["cache"]):
+                    results = {
+                        name: self.run_scenario(name, options)
+                        for name in names
+                    }
+        except ValueError as error:
+            raise CommandError(error)
+
+        if options["save"]:
+            with open(options["save"], "w", encoding="utf-8") as file:
+                json.dump(results, file, indent=2, ensure_ascii=False)
+        if options["compare"]:
+            self.compare(results, options)
+
+    def run_http(self, options):
+        if options["scenarios"] not in ([], ["endpoints"]):
+            raise CommandError("По HTTP замеряется только сценарий endpoints.")
+        self.stdout.write(self.style.MIGRATE_HEADING("endpoints"))
+        admin_client = None
+        if options["token"]:
+            admin_client = HTTPClient(options["http"], options["token"])
+        results = run_endpoints(
+            HTTPClient(options["http"]), admin_client, options["repeat"]
+        )
+        return {"endpoints": self.report(results)}
+
+    def run_scenario(self, name, options):
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        results = SCENARIOS[name](
+            size=options["size"], repeat=options["repeat"]
+        )
+        return self.report(results)
+
+    def report(self, results):
+        """
+        Выводит результаты сценария и возвращает их в виде
+        {замер: (значение, единица)}.
+        """
+
+        measurements = {}
+        for label, value in results.items():
+            unit = "ms"
+            if isinstance(value, tuple):
+                value, unit = value
+            measurements[label] = value, unit
+            self.stdout.write(f"  {label:<40} {value:10.2f} {unit}")
+        return measurements
+
+    def compare(self, results, options):
+        with open(options["compare"], encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, options["threshold"])
+        if regressions:
+            raise CommandError(
+                "Регрессия относительно базовой линии:\n  "
+                + "\n  ".join(regressions)
+            )
+        self.stdout.write(
+            self.style.SUCCESS("Регрессий относительно базовой линии нет.")
+        )
@@ -0,0 +1,166 @@
+import csv
+import gzip
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .import_data import FILES_TBLS_LIST, FLD_TITLES_TO_CHANGE, get_models
+
+CHUNK_SIZE = 2000
+# Пользователи выгружаются только по явному запросу и без паролей и кодов
+# подтверждения, в том же составе столбцов, что и исходный users.csv.
+PRIVATE_FILES = {"users.csv"}
+EXPORT_COLUMNS = {
+    "users.csv": [
+        "id", "username", "email", "role", "bio", "first_name", "last_name"
+    ],
+}
+# Служебные столбцы, которые база заполняет сама.
+SKIPPED_COLUMNS = {"search_vector"}
+FORMATS = ("csv", "jsonl")
+
+
+class Command(BaseCommand):
+    help = "Export data from DB to csv or jsonl files"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "files",
+            nargs="*",
+            help=(
+                f"Файлы для выгрузки: {', '.join(FILES_TBLS_LIST)} "
+                f"(по умолчанию все, кроме {', '.join(PRIVATE_FILES)})."
+            ),
+        )
+        parser.add_argument(
+            "--path",
+            default=os.getcwd(),
+            help="Каталог для выгружаемых файлов.",
+        )
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            default="csv",
+            help="Формат файлов: csv в раскладке import_data или jsonl.",
+        )
+        parser.add_argument(
+            "--gzip",
+            action="store_true",
+            help="Сжимать файлы gzip.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help="Число строк, получаемых из базы за один раз.",
+        )
+
+    def handle(self, *args, **options):
+        files = options["files"] or [
+            file_name
+            for file_name in FILES_TBLS_LIST
+            if file_name not in PRIVATE_FILES
+        ]
+        unknown = set(files) - set(FILES_TBLS_LIST)
+        if unknown:
+            raise CommandError(
+                f"Неизвестные файлы: {', '.join(sorted(unknown))}"
+            )
+        path = options["path"]
+        if not os.path.isdir(path):
+            raise CommandError(f"Не найден каталог: {path}")
+
+        file_models = get_models()
+        for file_name in files:
+            self.export_file(
+                path, file_name, file_models[file_name], options
+            )
+        self.stdout.write(self.style.SUCCESS("Экспорт данных завершен!"))
+
+    def export_file(self, path, file_name, model, options):
+        """
+        Выгрузка одной таблицы. Строки читаются серверным курсором порциями
+        по chunk_size и сразу пишутся в файл, поэтому расход памяти
+        не зависит от размера таблицы.
+        """
+
+        header, fields = self.get_columns(file_name, model)
+        name = os.path.splitext(file_name)[0] + "." + options["format"]
+        if options["gzip"]:
+            name += ".gz"
+            opener = gzip.open
+        else:
+            opener = open
+        rows = (
+            model.objects.order_by("pk")
+            .values_list(*fields)
+            .iterator(chunk_size=options["chunk_size"])
+        )
+
+        started = time.perf_counter()
+        with opener(
+            os.path.join(path, name), "wt", encoding="utf-8", newline=""
+        ) as file:
+            if options["format"] == "csv":
+                count = self.write_csv(file, header, rows)
+            else:
+                count = self.write_jsonl(file, header, rows)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{name}: {count} строк за {elapsed:.2f} с "
+            f"({count / max(elapsed, 1e-9):.0f} строк/с)"
+        )
+
+    def get_columns(self, file_name, model):
+        """
+        Заголовок файла в раскладке import_data и соответствующие ему
+        атрибуты модели.
+        """
+
+        fields = {
+            field.column: field.attname
+            for field in model._meta.concrete_fields
+            if field.column not in SKIPPED_COLUMNS
+        }
+        columns = EXPORT_COLUMNS.get(file_name, list(fields))
+        header = columns
+        if FILES_TBLS_LIST[file_name][1] == 1:
+            renamed = {
+                column: name for name, column in FLD_TITLES_TO_CHANGE.items()
+            }
+            header = [renamed.get(column, column) for column in columns]
+        return header, [fields[column] for column in columns]
+
+    def write_csv(self, file, header, rows):
+        encoder = DjangoJSONEncoder()
+        writer = csv.writer(file)
+        writer.writerow(header)
+        count = 0
+        for row in rows:
+            writer.writerow(
+                [
+                    "" if value is None
+                    else value if isinstance(value, (str, int))
+                    else encoder.default(value)
+                    for value in row
+                ]
+            )
+            count += 1
+        return count
+
+    def write_jsonl(self, file, header, rows):
+        count = 0
+        for row in rows:
+            file.write(
+                json.dumps(
+                    dict(zip(header, row)),
+                    cls=DjangoJSONEncoder,
+                    ensure_ascii=False,
+                )
+            )
+            file.write("\n")
+            count += 1
+        return count
@@ -1,10 +1,21 @@
 import csv
+import io
 import os
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from itertools import islice
 
+from api.cache import bump_all
+from api.models import ImportCheckpoint
+from django.apps import apps
 from django.conf import settings
-from django.core.management.base import BaseCommand
-from django.db import connection
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from reviews.models import Title
 
 TABLE_PREFIX = "reviews"
 FILES_TBLS_LIST = {
@@ -18,87 +29,461 @@ FILES_TBLS_LIST = {
 }
 PATH_TO_CSV = os.path.join(settings.BASE_DIR, "static", "data")
 FLD_TITLES_TO_CHANGE = {"category": "category_id", "author": "author_id"}
+CHUNK_SIZE = 10000
+WORKERS = 4
+# Как часто (в секундах) выводить ход загрузки файла.
+PROGRESS_INTERVAL = 1
+
+
+def get_models():
+    models = {
+        model._meta.db_table: model
+        for model in apps.get_models(include_auto_created=True)
+    }
+    return {
+        file_name: models[tbl_t]
+        for file_name, (tbl_t, _) in FILES_TBLS_LIST.items()
+    }
+
+
+def get_import_levels(file_models):
+    """
+    Уровни загрузки по графу внешних ключей между файлами: файлы одного
+    уровня не зависят друг от друга и загружаются параллельно, а каждый
+    следующий уровень — после фиксации всех предыдущих.
+    """
+
+    files_by_model = {model: name for name, model in file_models.items()}
+    dependencies = {
+        file_name: {
+            files_by_model[field.related_model]
+            for field in model._meta.concrete_fields
+            if field.is_relation
+            and field.related_model in files_by_model
+            and field.related_model is not model
+        }
+        for file_name, model in file_models.items()
+    }
+    levels = []
+    loaded = set()
+    while len(loaded) < len(dependencies):
+        level = sorted(
+            file_name
+            for file_name, parents in dependencies.items()
+            if file_name not in loaded and parents <= loaded
+        )
+        if not level:
+            raise CommandError("Циклическая зависимость между файлами!")
+        levels.append(level)
+        loaded.update(level)
+    return levels
+
+
+def find_dangling_references(models):
+    """
+    Строки со ссылками на несуществующие строки: по одному LEFT JOIN на
+    каждый внешний ключ моделей. Отложенные ограничения СУБД проверяются
+    только при фиксации транзакции каждого файла, а
+    connection.check_constraints() на PostgreSQL в Django 2.2 лишь
+    выполняет SET CONSTRAINTS и сами строки не проверяет.
+    """
+
+    quote = connection.ops.quote_name
+    errors = []
+    with connection.cursor() as cursor:
+        for model in models:
+            for field in model._meta.concrete_fields:
+                if not field.is_relation:
+                    continue
+                column = quote(field.column)
+                target_column = quote(field.target_field.column)
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM {quote(model._meta.db_table)} "
+                    f"AS child LEFT JOIN "
+                    f"{quote(field.related_model._meta.db_table)} AS parent "
+                    f"ON child.{column} = parent.{target_column} "
+                    f"WHERE child.{column} IS NOT NULL "
+                    f"AND parent.{target_column} IS NULL"
+                )
+                count = cursor.fetchone()[0]
+                if count:
+                    errors.append(
+                        f"{model._meta.db_table}.{field.column}: {count}"
+                    )
+    return errors
 
 
 class Command(BaseCommand):
     help = "Import data from csv files to DB"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            default=PATH_TO_CSV,
+            help="Каталог с csv-файлами.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help="Число строк, загружаемых за одну операцию.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=WORKERS,
+            help="Число параллельно загружаемых файлов (соединений с БД).",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help=(
+                "Загружать с upsert и контрольными точками, продолжая "
+                "прерванную загрузку."
+            ),
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только разобрать файлы и показать план загрузки.",
+        )
+
     def handle(self, *args, **options):
-        cursor = connection.cursor()
-        # Временно отключаем внешние ключи.
-        cursor.execute("PRAGMA foreign_keys = OFF;")
-        files_csv_list = os.listdir(PATH_TO_CSV)
-
-        for file_name in files_csv_list:
-            if file_name in FILES_TBLS_LIST.keys():
-                tbl_t = FILES_TBLS_LIST[file_name][0]
-                header_in_query = FILES_TBLS_LIST[file_name][1]
-                file = os.path.join(PATH_TO_CSV, file_name)
-                with open(file, newline="", encoding="utf-8") as csvfile:
-                    csv_reader = csv.reader(csvfile, delimiter=",")
-                    row_num = 0
-                    for row in csv_reader:
-                        if row_num == 0:
-                            sql_hdr = self.header_handler(
-                                row, header_in_query, tbl_t, file_name
-                            )
-                        else:
-                            sql_fld_values = self.data_handler(row, file_name)
-                            sql_body_final = (
-                                f"{sql_hdr} VALUES ({sql_fld_values})"
-                            )
-                            cursor.execute(sql_body_final)
-                        row_num += 1
-        # Включаем внешние ключи.
-        cursor.execute("PRAGMA foreign_keys = ON;")
+        path = options["path"]
+        if not os.path.isdir(path):
+            raise CommandError(f"Не найден каталог с данными: {path}")
+        self.chunk_size = options["chunk_size"]
+        self.dry_run = options["dry_run"]
+        self.incremental = options["incremental"]
+        self.output_lock = threading.Lock()
+        workers = options["workers"]
+        if connection.vendor == "sqlite" and workers > 1:
+            # SQLite всё равно выполняет записи по одной.
+            workers = 1
+
+        file_models = get_models()
+        levels = [
+            [
+                file_name
+                for file_name in level
+                if os.path.exists(os.path.join(path, file_name))
+            ]
+            for level in get_import_levels(file_models)
+        ]
+        for number, level in enumerate(filter(None, levels), start=1):
+            self.write(f"Уровень {number}: {', '.join(level)}")
+            files = [
+                (os.path.join(path, file_name), file_models[file_name],
+                 FILES_TBLS_LIST[file_name][1])
+                for file_name in level
+            ]
+            if workers == 1:
+                for file_args in files:
+                    self.import_file(*file_args)
+            else:
+                self.import_parallel(files, workers)
+
+        if self.dry_run:
+            self.stdout.write(self.style.SUCCESS("Проверка файлов завершена!"))
+            return
+
+        # Внешние ключи проверяются один раз по всем загруженным таблицам.
+        errors = find_dangling_references(file_models.values())
+        if errors:
+            raise CommandError(
+                "Ссылки на несуществующие строки:\n  " + "\n  ".join(errors)
+            )
+        # Рейтинги произведений хранятся в таблице произведений и после
+        # загрузки отзывов пересчитываются одним запросом.
+        Title.objects.update_ratings()
+        # Строки загружены в обход моделей: ETag и кэш ответов API
+        # сбрасываются общей версией.
+        bump_all()
         self.stdout.write(self.style.SUCCESS("Импорт данных завершен!"))
 
-    def header_handler(self, row, header_in_query, tbl_t, file_name):
+    def import_parallel(self, files, workers):
         """
-        Создание заголовочной части тела запроса.
+        Параллельная загрузка файлов одного уровня: у каждого потока своё
+        соединение с базой данных.
+        """
+
+        def run(file_args):
+            try:
+                return self.import_file(*file_args)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for future in [executor.submit(run, args) for args in files]:
+                future.result()
+
+    def write(self, message):
+        with self.output_lock:
+            self.stdout.write(message)
+
+    def import_file(self, file, model, header_in_query):
+        """
+        Загрузка одного файла порциями по chunk_size строк: COPY FROM STDIN
+        на PostgreSQL, executemany на остальных СУБД.
+
+        Обычно весь файл загружается в одной транзакции. В режиме
+        --incremental каждая порция фиксируется вместе с контрольной точкой
+        (смещением в файле), строки вставляются через ON CONFLICT, а
+        прерванная загрузка продолжается с последней зафиксированной порции.
+        """
+
+        file_name = os.path.basename(file)
+        checkpoint = None
+        if self.incremental and not self.dry_run:
+            checkpoint = self.get_checkpoint(file)
+            if checkpoint.completed:
+                self.write(f"{file_name}: не изменился, пропущен")
+                return 0
+
+        started = last_report = time.perf_counter()
+        rows_total = 0
+        with open(file, "rb") as csvfile:
+            lines = CountingLines(csvfile)
+            csv_reader = csv.reader(lines, delimiter=",")
+            header = next(csv_reader)
+            columns, defaults = self.header_handler(
+                header, header_in_query, model
+            )
+            if checkpoint is not None and checkpoint.offset:
+                lines.seek(checkpoint.offset)
+                self.write(
+                    f"{file_name}: продолжение со строки {checkpoint.rows}"
+                )
+
+            with ExitStack() as stack:
+                if checkpoint is None:
+                    stack.enter_context(transaction.atomic())
+                cursor = stack.enter_context(connection.cursor())
+                for chunk in self.read_chunks(csv_reader, header, defaults):
+                    if checkpoint is not None:
+                        self.load_checkpointed(
+                            cursor, model, columns, chunk, len(header),
+                            checkpoint, lines.offset,
+                        )
+                    elif not self.dry_run:
+                        self.load_rows(cursor, model, columns, chunk)
+                    rows_total += len(chunk)
+                    now = time.perf_counter()
+                    if now - last_report >= PROGRESS_INTERVAL:
+                        last_report = now
+                        self.write(
+                            f"  {file_name}: {rows_total} строк "
+                            f"({rows_total / (now - started):.0f} строк/с)"
+                        )
+                if not self.dry_run:
+                    self.finish_file(cursor, model, checkpoint)
+
+        elapsed = time.perf_counter() - started
+        self.write(
+            f"{file_name}: {rows_total} строк за {elapsed:.2f} с "
+            f"({rows_total / max(elapsed, 1e-9):.0f} строк/с)"
+        )
+        return rows_total
+
+    def read_chunks(self, csv_reader, header, defaults):
+        while True:
+            chunk = [
+                self.data_handler(row, len(header)) + defaults
+                for row in islice(csv_reader, self.chunk_size)
+            ]
+            if not chunk:
+                return
+            yield chunk
+
+    def finish_file(self, cursor, model, checkpoint):
+        with transaction.atomic():
+            self.reset_sequence(cursor, model)
+            if checkpoint is not None:
+                checkpoint.completed = True
+                checkpoint.save()
+
+    def get_checkpoint(self, file):
+        """
+        Контрольная точка файла. Если файл изменился с прошлой загрузки,
+        она начинается заново: изменённые строки обновятся через upsert.
+        """
+
+        stat = os.stat(file)
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(
+            file_name=os.path.basename(file),
+            defaults={
+                "file_size": stat.st_size,
+                "file_mtime": stat.st_mtime_ns,
+            },
+        )
+        if not checkpoint.matches(stat):
+            checkpoint.file_size = stat.st_size
+            checkpoint.file_mtime = stat.st_mtime_ns
+            checkpoint.offset = checkpoint.rows = 0
+            checkpoint.completed = False
+            checkpoint.save()
+        return checkpoint
+
+    def header_handler(self, row, header_in_query, model):
+        """
+        Столбцы таблицы по заголовку файла и значения по умолчанию для
+        обязательных столбцов, которых в файле нет.
         """
 
         if header_in_query == 1:
-            for k in FLD_TITLES_TO_CHANGE.keys():
-                if k in row:
-                    cur_i = row.index(k)
-                    row[cur_i] = FLD_TITLES_TO_CHANGE[k]
-            if "user" in file_name:
-                row.append("password")
-                row.append("is_superuser")
-                row.append("is_staff")
-                row.append("is_active")
-                row.append("date_joined")
-            f"INSERT INTO `{tbl_t}` ({', '.join(row)})"
+            row = [FLD_TITLES_TO_CHANGE.get(name, name) for name in row]
+        fields = {field.column: field for field in model._meta.concrete_fields}
+        unknown = set(row) - set(fields)
+        if unknown:
+            raise CommandError(
+                f"Неизвестные столбцы {model._meta.db_table}: "
+                f"{', '.join(sorted(unknown))}"
+            )
+        missing = [
+            field
+            for column, field in fields.items()
+            if column not in row and not field.null and not field.primary_key
+        ]
+        columns = [fields[name] for name in row] + missing
+        return columns, [field.get_default() for field in missing]
+
+    def data_handler(self, row, width):
+        """
+        Строка файла. Строка, целиком попавшая в одно поле из-за кавычек,
+        разбивается по запятым вне кавычек.
+        """
+
+        if len(row) != 1 or width == 1:
+            return row
+        value = row[0]
+        if value[:1] == '"' and value[-1:] == '"':
+            value = value[1:-1]
+        return re.split(r""",(?=(?:[^'"]|'[^']*'|"[^"]*")*$)""", value)
+
+    def load_checkpointed(
+        self, cursor, model, columns, rows, width, checkpoint, offset
+    ):
+        with transaction.atomic():
+            self.upsert_rows(cursor, model, columns, rows, width)
+            checkpoint.offset = offset
+            checkpoint.rows += len(rows)
+            checkpoint.save()
+
+    def load_rows(self, cursor, model, columns, rows):
+        table = connection.ops.quote_name(model._meta.db_table)
+        if connection.vendor == "postgresql":
+            self.copy_rows(cursor, table, columns, rows)
         else:
-            f"INSERT INTO `{tbl_t}`"
-        return f"INSERT INTO `{tbl_t}` ({', '.join(row)})"
+            self.insert_rows(cursor, table, columns, rows)
 
-    def data_handler(self, row, file_name):
+    def upsert_rows(self, cursor, model, columns, rows, width):
         """
-        Создание основной части тела запроса.
+        Вставка с обновлением по первичному ключу. Обновляются только
+        столбцы из файла и только у строк, где они действительно изменились.
         """
 
-        vals = ""
-        if len(row) == 1:
-            # Разделитель в данных
-            if row[0][0] == '"' and row[0][-1] == '"':
-                row[0] = row[0][1:-1]
-            row = re.split(
-                """,
-                (?=(?:[^'"]|'[^']*'|"[^"]*")*$)""",
-                row[0],
+        quote = connection.ops.quote_name
+        table = quote(model._meta.db_table)
+        updated = [
+            quote(field.column)
+            for field in columns[:width]
+            if not field.primary_key
+        ]
+        conflict = f"ON CONFLICT ({quote(model._meta.pk.column)}) "
+        if updated:
+            distinct = (
+                "IS DISTINCT FROM"
+                if connection.vendor == "postgresql"
+                else "IS NOT"
             )
-        for w in row:
-            if w.isnumeric():
-                vals += f"{w}, "
-            else:
-                w = w.replace("'", "%27")
-                vals += f"'{w}', "
-        if "user" in file_name:
-            vals += "'0', "
-            vals += "'no', "
-            vals += "'no', "
-            vals += "'yes', "
-            vals += "'2022-09-16T21:08:21.567Z', "
-        return vals[0:-2]
+            assignments = ", ".join(f"{c} = EXCLUDED.{c}" for c in updated)
+            current = ", ".join(f"{table}.{c}" for c in updated)
+            excluded = ", ".join(f"EXCLUDED.{c}" for c in updated)
+            conflict += (
+                f"DO UPDATE SET {assignments} "
+                f"WHERE ({current}) {distinct} ({excluded})"
+            )
+        else:
+            conflict += "DO NOTHING"
+
+        if connection.vendor != "postgresql":
+            self.insert_rows(cursor, table, columns, rows, conflict)
+            return
+        # COPY не умеет ON CONFLICT: порция загружается во временную
+        # таблицу и переносится одним INSERT ... SELECT.
+        stage = quote(f"import_{model._meta.db_table}")
+        cursor.execute(
+            f"CREATE TEMP TABLE {stage} (LIKE {table}) ON COMMIT DROP"
+        )
+        self.copy_rows(cursor, stage, columns, rows)
+        names = ", ".join(quote(field.column) for field in columns)
+        cursor.execute(
+            f"INSERT INTO {table} ({names}) SELECT {names} FROM {stage} "
+            f"{conflict}"
+        )
+
+    def copy_rows(self, cursor, table, columns, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        quote = connection.ops.quote_name
+        not_null = [
+            quote(field.column)
+            for field in columns
+            if not field.null and not field.primary_key
+        ]
+        options = "FORMAT csv"
+        if not_null:
+            options += f", FORCE_NOT_NULL ({', '.join(not_null)})"
+        cursor.copy_expert(
+            f"COPY {table} "
+            f"({', '.join(quote(field.column) for field in columns)}) "
+            f"FROM STDIN WITH ({options})",
+            buffer,
+        )
+
+    def insert_rows(self, cursor, table, columns, rows, conflict=""):
+        quote = connection.ops.quote_name
+        nullable = [field.null for field in columns]
+        cursor.executemany(
+            f"INSERT INTO {table} "
+            f"({', '.join(quote(field.column) for field in columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(columns))}) {conflict}",
+            [
+                [
+                    None if null and value == "" else value
+                    for value, null in zip(row, nullable)
+                ]
+                for row in rows
+            ],
+        )
+
+    def reset_sequence(self, cursor, model):
+        for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+            cursor.execute(sql)
+
+
+class CountingLines:
+    """
+    Строки файла, открытого в двоичном режиме, со счётчиком прочитанных
+    байт: csv.reader не читает впрок, поэтому после каждой порции счётчик
+    указывает на начало следующей записи.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.offset = file.tell()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.file.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        return line.decode("utf-8")
+
+    def seek(self, offset):
+        self.file.seek(offset)
+        self.offset = offset
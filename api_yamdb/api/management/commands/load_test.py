@@ -0,0 +1,155 @@
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+from api.benchmarks import PERCENTILES, summarize
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test a running API: requests/sec and latency percentiles "
+        "under concurrent keep-alive clients"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "url",
+            nargs="?",
+            default="http://localhost:8000/api/v1/titles/",
+            help="Адрес для нагрузки.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=20,
+            help="Число одновременных клиентов.",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=10,
+            help="Длительность нагрузки в секундах.",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=float,
+            default=2,
+            help="Прогрев в секундах, не входит в результат.",
+        )
+        parser.add_argument(
+            "--header",
+            action="append",
+            default=[],
+            help='Заголовок запроса "Имя: значение", можно повторять.',
+        )
+        parser.add_argument(
+            "--save",
+            help="Сохранить результат в JSON-файл.",
+        )
+        parser.add_argument(
+            "--compare",
+            help="JSON-файл предыдущего запуска (--save) для сравнения.",
+        )
+
+    def handle(self, *args, **options):
+        headers = {}
+        for header in options["header"]:
+            name, sep, value = header.partition(":")
+            if not sep:
+                raise CommandError(f"Неверный заголовок: {header}")
+            headers[name.strip()] = value.strip()
+
+        self.stdout.write(
+            f"{options['url']}: {options['concurrency']} клиентов, "
+            f"{options['duration']:.0f} с"
+        )
+        if options["warmup"]:
+            self.run_load(
+                options["url"],
+                headers,
+                options["concurrency"],
+                options["warmup"],
+            )
+        result = self.run_load(
+            options["url"],
+            headers,
+            options["concurrency"],
+            options["duration"],
+        )
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as file:
+                baseline = json.load(file)
+        self.report(result, baseline)
+        if options["save"]:
+            with open(options["save"], "w", encoding="utf-8") as file:
+                json.dump(result, file, indent=2)
+
+    def run_load(self, url, headers, concurrency, duration):
+        """
+        concurrency потоков в течение duration секунд шлют запросы подряд,
+        каждый через своё keep-alive соединение.
+        """
+
+        parts = urlsplit(url)
+        connection_class = (
+            http.client.HTTPSConnection
+            if parts.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        timings, errors = [], []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def client():
+            connection = connection_class(parts.netloc, timeout=30)
+            own_timings, own_errors = [], 0
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    connection.request("GET", path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    failed = response.status >= 400
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    failed = True
+                own_timings.append(time.perf_counter() - started)
+                own_errors += failed
+            connection.close()
+            with lock:
+                timings.extend(own_timings)
+                errors.append(own_errors)
+
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(target=client) for _ in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if not timings:
+            raise CommandError("Не выполнено ни одного запроса.")
+        result = summarize(timings, elapsed)
+        result["errors"] = sum(errors)
+        return result
+
+    def report(self, result, baseline=None):
+        self.stdout.write(
+            f"  {'requests':<10} {result['requests']:10d}"
+            f"  (ошибок: {result['errors']})"
+        )
+        rows = [("rps", "")] + [(f"p{p}", " ms") for p in PERCENTILES]
+        for key, unit in rows:
+            line = f"  {key:<10} {result[key]:10.2f}{unit}"
+            if baseline and baseline.get(key):
+                change = (result[key] / baseline[key] - 1) * 100
+                line += f"  (было {baseline[key]:.2f}, {change:+.1f}%)"
+            self.stdout.write(line)
@@ -0,0 +1,57 @@
+from api.cache import bump_versions
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    help = "Rebuild stored title ratings and check them against reviews"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Только проверить сохранённые рейтинги, ничего не меняя.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["check"]:
+            updated = Title.objects.all().update_ratings()
+            bump_versions(["titles"])
+            self.stdout.write(f"Пересчитано произведений: {updated}")
+
+        mismatched = self.find_mismatched()
+        if mismatched:
+            for title_id, rating_sum, review_count, live_sum, live_count in (
+                mismatched
+            ):
+                self.stderr.write(
+                    f"Произведение {title_id}: сохранено "
+                    f"{rating_sum}/{review_count}, "
+                    f"по отзывам {live_sum}/{live_count}"
+                )
+            raise CommandError(
+                f"Рейтинг расходится у {len(mismatched)} произведений!"
+            )
+        self.stdout.write(self.style.SUCCESS("Рейтинги произведений верны!"))
+
+    def find_mismatched(self):
+        """
+        Сравнение сохранённых сумм и количества оценок с агрегатом
+        по таблице отзывов.
+        """
+
+        return list(
+            Title.objects.annotate(
+                live_sum=Coalesce(Sum("reviews__score"), 0),
+                live_count=Count("reviews"),
+            )
+            .exclude(
+                Q(rating_sum=F("live_sum")) & Q(review_count=F("live_count"))
+            )
+            .order_by("pk")
+            .values_list(
+                "pk", "rating_sum", "review_count", "live_sum", "live_count"
+            )
+        )
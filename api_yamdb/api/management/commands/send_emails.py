@@ -0,0 +1,40 @@
+import time
+
+from api.outbox import send_batch
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Send queued emails from the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.EMAIL_OUTBOX["BATCH_SIZE"],
+            help="Число писем, отправляемых через одно соединение.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Пауза в секундах, когда очередь пуста.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Разобрать очередь один раз и завершиться.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_batch(options["batch_size"])
+            if sent or failed:
+                self.stdout.write(
+                    f"Отправлено: {sent}, отложено из-за ошибок: {failed}"
+                )
+            if sent + failed < options["batch_size"]:
+                if options["once"]:
+                    return
+                time.sleep(options["interval"])
@@ -0,0 +1,429 @@
+"""
+Метрики запросов API в формате Prometheus.
+
+MetricsMiddleware считает все запросы по представлению, действию и классу
+статуса ответа, а для доли METRICS["SAMPLE_RATE"] запросов дополнительно
+записывает в гистограммы время обработки, число и время SQL-запросов и
+размер ответа. SQL-запросы считаются обёрткой курсора
+(connection.execute_wrapper), поэтому DEBUG не нужен.
+
+Туда же api.cache и api.throttling пишут счётчики попаданий в кэш ответов
+и проверок ограничения частоты, их эндпоинты статистики читают их отсюда.
+
+Метрики копятся в памяти процесса и не чаще раза в FLUSH_INTERVAL секунд
+сохраняются в хранилище METRICS["STORE"]: FileStore пишет файл на каждый
+процесс в каталог METRICS["DIR"], и эндпоинт метрик суммирует файлы всех
+воркеров gunicorn; MemoryStore отдаёт метрики только своего процесса.
+"""
+
+import hmac
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+from rest_framework.permissions import BasePermission
+from rest_framework.renderers import BaseRenderer
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+HISTOGRAMS = {
+    "api_request_duration_seconds": (
+        "Время обработки запроса, с", DURATION_BUCKETS
+    ),
+    "api_db_queries": ("Число SQL-запросов на запрос", QUERY_BUCKETS),
+    "api_db_duration_seconds": (
+        "Время SQL-запросов за запрос, с", DURATION_BUCKETS
+    ),
+    "api_response_size_bytes": ("Размер тела ответа, байт", SIZE_BUCKETS),
+}
+logger = logging.getLogger(__name__)
+
+REQUESTS = "api_requests_total"
+CACHE = "api_response_cache_total"
+THROTTLE = "api_throttle_requests_total"
+COUNTERS = {
+    REQUESTS: ("Число запросов", ("view", "action", "status")),
+    CACHE: ("Обращения к кэшу ответов", ("view", "result")),
+    THROTTLE: ("Проверки ограничения частоты", ("throttle", "outcome")),
+}
+
+
+class Registry:
+    """
+    Метрики текущего процесса: счётчики и гистограммы. Ключ счётчика —
+    (метрика, *метки) с метками из COUNTERS. Ключ гистограммы — (метрика,
+    представление, действие), значение — число наблюдений в каждом
+    интервале (последний — +Inf) и их сумма.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.flushed = time.monotonic()
+
+    def count(self, key):
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def observe(self, view, action, values):
+        with self.lock:
+            for name, value in values.items():
+                buckets = HISTOGRAMS[name][1]
+                key = (name, view, action)
+                if key not in self.histograms:
+                    self.histograms[key] = [0] * (len(buckets) + 1) + [0]
+                histogram = self.histograms[key]
+                index = next(
+                    (i for i, le in enumerate(buckets) if value <= le),
+                    len(buckets),
+                )
+                histogram[index] += 1
+                histogram[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return dump(self.counters, self.histograms)
+
+    def clear(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+registry = Registry()
+
+
+def dump(counters, histograms):
+    return {
+        "counters": [[list(key), value] for key, value in counters.items()],
+        "histograms": [
+            [list(key), list(value)] for key, value in histograms.items()
+        ],
+    }
+
+
+class MemoryStore:
+    """
+    Метрики только текущего процесса.
+    """
+
+    def save(self, snapshot):
+        pass
+
+    def load(self):
+        return [registry.snapshot()]
+
+    def collect(self, pid):
+        pass
+
+    def clear(self):
+        pass
+
+
+class FileStore:
+    """
+    Файл METRICS["DIR"]/<pid>.json на каждый процесс. Мастер gunicorn
+    переносит метрики завершившегося воркера в общий файл TOTAL и удаляет
+    файл воркера (см. child_exit в gunicorn.conf.py): число файлов не
+    растёт с перезапусками воркеров, счётчики не уменьшаются, а новый
+    воркер с тем же pid не затирает чужие метрики. Каталог очищается при
+    запуске gunicorn.
+    """
+
+    TOTAL = "total.json"
+
+    def __init__(self):
+        self.path = settings.METRICS["DIR"]
+
+    def read(self, name):
+        try:
+            with open(os.path.join(self.path, name), encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def write(self, name, snapshot):
+        # Свой временный файл на каждую запись: файл воркера пишут и
+        # потоки запросов, и worker_exit.
+        os.makedirs(self.path, exist_ok=True)
+        descriptor, temp_name = tempfile.mkstemp(
+            dir=self.path, prefix=f"{name}.", suffix=".tmp"
+        )
+        try:
+            with open(descriptor, "w", encoding="utf-8") as file:
+                json.dump(snapshot, file)
+            os.replace(temp_name, os.path.join(self.path, name))
+        except BaseException:
+            os.remove(temp_name)
+            raise
+
+    def save(self, snapshot):
+        self.write(f"{os.getpid()}.json", snapshot)
+
+    def load(self):
+        own = f"{os.getpid()}.json"
+        snapshots = [registry.snapshot()]
+        if not os.path.isdir(self.path):
+            return snapshots
+        for name in os.listdir(self.path):
+            if not name.endswith(".json") or name == own:
+                continue
+            snapshot = self.read(name)
+            if snapshot is not None:
+                snapshots.append(snapshot)
+        return snapshots
+
+    def collect(self, pid):
+        """
+        Переносит метрики воркера pid в TOTAL. Вызывается только мастером,
+        поэтому TOTAL не пишут несколько процессов сразу.
+        """
+
+        name = f"{pid}.json"
+        snapshot = self.read(name)
+        if snapshot is not None:
+            total = self.read(self.TOTAL)
+            snapshots = [snapshot] if total is None else [total, snapshot]
+            self.write(self.TOTAL, dump(*merge(snapshots)))
+        try:
+            os.remove(os.path.join(self.path, name))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        if not os.path.isdir(self.path):
+            return
+        for name in os.listdir(self.path):
+            if name.endswith((".json", ".tmp")):
+                os.remove(os.path.join(self.path, name))
+
+
+def get_store():
+    return import_string(settings.METRICS["STORE"])()
+
+
+def get_counters(metric):
+    """
+    Счётчики metric всех процессов: {метки: значение}.
+    """
+
+    counters, _ = merge(get_store().load())
+    return {
+        tuple(key[1:]): value
+        for key, value in counters.items()
+        if key[0] == metric
+    }
+
+
+flush_lock = threading.Lock()
+
+
+def flush(force=False):
+    """
+    Сохраняет метрики процесса в хранилище не чаще раза в FLUSH_INTERVAL
+    секунд. Пока сохраняет один поток, остальные без force не ждут его.
+    """
+
+    if not flush_lock.acquire(blocking=force):
+        return
+    try:
+        now = time.monotonic()
+        interval = settings.METRICS["FLUSH_INTERVAL"]
+        if force or now - registry.flushed >= interval:
+            registry.flushed = now
+            get_store().save(registry.snapshot())
+    finally:
+        flush_lock.release()
+
+
+def flush_safely():
+    """
+    flush() для обработки запроса: ошибка записи метрик пишется в журнал
+    и не меняет ответ.
+    """
+
+    try:
+        flush()
+    except OSError:
+        logger.exception("Не удалось сохранить метрики")
+
+
+class QueryTimer:
+    """
+    Обёртка курсора: число и суммарное время SQL-запросов.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+def get_labels(request):
+    """
+    Представление и действие, обработавшие запрос: для вьюсетов DRF —
+    класс и действие ("list", "retrieve", ...), иначе — метод запроса.
+    """
+
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved", request.method.lower()
+    view = getattr(match.func, "cls", match.func)
+    actions = getattr(match.func, "actions", None) or {}
+    method = request.method.lower()
+    return view.__name__, actions.get(method, method)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS["ENABLED"]:
+            # Счётчики кэша и ограничения частоты копятся и без метрик
+            # запросов.
+            try:
+                return self.get_response(request)
+            finally:
+                flush_safely()
+        if random.random() >= settings.METRICS["SAMPLE_RATE"]:
+            response = self.get_response(request)
+            view, action = get_labels(request)
+        else:
+            timer = QueryTimer()
+            started = time.perf_counter()
+            with connection.execute_wrapper(timer):
+                response = self.get_response(request)
+            duration = time.perf_counter() - started
+            view, action = get_labels(request)
+            size = 0 if response.streaming else len(response.content)
+            registry.observe(
+                view,
+                action,
+                {
+                    "api_request_duration_seconds": duration,
+                    "api_db_queries": timer.count,
+                    "api_db_duration_seconds": timer.duration,
+                    "api_response_size_bytes": size,
+                },
+            )
+        registry.count(
+            (REQUESTS, view, action, f"{response.status_code // 100}xx")
+        )
+        flush_safely()
+        return response
+
+
+def merge(snapshots):
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        for labels, value in snapshot["counters"]:
+            labels = tuple(labels)
+            counters[labels] = counters.get(labels, 0) + value
+        for key, value in snapshot["histograms"]:
+            key = tuple(key)
+            if key in histograms:
+                value = [a + b for a, b in zip(histograms[key], value)]
+            histograms[key] = value
+    return counters, histograms
+
+
+def format_labels(**labels):
+    escaped = (
+        (name, str(value).replace("\\", r"\\").replace('"', r"\""))
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def render_counters(counters):
+    lines = []
+    for name, (help_text, label_names) in COUNTERS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for (metric, *values), value in sorted(counters.items()):
+            if metric != name:
+                continue
+            labels = format_labels(**dict(zip(label_names, values)))
+            lines.append(f"{name}{labels} {value}")
+    return lines
+
+
+def render_histograms(histograms):
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for (metric, view, action), value in sorted(histograms.items()):
+            if metric != name:
+                continue
+            total = 0
+            for le, count in zip(buckets + ("+Inf",), value):
+                total += count
+                labels = format_labels(view=view, action=action, le=le)
+                lines.append(f"{name}_bucket{labels} {total}")
+            labels = format_labels(view=view, action=action)
+            lines.append(f"{name}_sum{labels} {value[-1]}")
+            lines.append(f"{name}_count{labels} {total}")
+    return lines
+
+
+def render():
+    """
+    Метрики всех процессов в текстовом формате Prometheus.
+    """
+
+    counters, histograms = merge(get_store().load())
+    lines = render_counters(counters) + render_histograms(histograms)
+    lines += [
+        "# HELP api_metrics_sample_rate Доля запросов в гистограммах",
+        "# TYPE api_metrics_sample_rate gauge",
+        f"api_metrics_sample_rate {settings.METRICS['SAMPLE_RATE']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = "text/plain"
+    format = "prometheus"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        # Ошибки (например, отказ в доступе) выводятся текстом.
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class HasMetricsToken(BasePermission):
+    """
+    Доступ сборщика метрик по заголовку "Authorization: Metrics <токен>"
+    с токеном METRICS["TOKEN"].
+    """
+
+    def has_permission(self, request, view):
+        token = settings.METRICS["TOKEN"]
+        scheme, _, value = request.META.get(
+            "HTTP_AUTHORIZATION", ""
+        ).partition(" ")
+        return bool(
+            token
+            and scheme == "Metrics"
+            and hmac.compare_digest(value.encode(), token.encode())
+        )
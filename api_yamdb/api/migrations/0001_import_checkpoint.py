@@ -0,0 +1,71 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "file_name",
+                    models.CharField(
+                        max_length=255, unique=True, verbose_name="Файл"
+                    ),
+                ),
+                (
+                    "file_size",
+                    models.BigIntegerField(verbose_name="Размер файла"),
+                ),
+                (
+                    "file_mtime",
+                    models.BigIntegerField(
+                        verbose_name="Время изменения файла, нс"
+                    ),
+                ),
+                (
+                    "offset",
+                    models.BigIntegerField(
+                        default=0, verbose_name="Загружено байт"
+                    ),
+                ),
+                (
+                    "rows",
+                    models.BigIntegerField(
+                        default=0, verbose_name="Загружено строк"
+                    ),
+                ),
+                (
+                    "completed",
+                    models.BooleanField(
+                        default=False, verbose_name="Загрузка завершена"
+                    ),
+                ),
+                (
+                    "updated",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Обновлено"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Контрольная точка импорта",
+                "verbose_name_plural": "Контрольные точки импорта",
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:56
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_outgoing_email"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResourceVersion",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=100, unique=True, verbose_name="Ресурс"
+                    ),
+                ),
+                (
+                    "version",
+                    models.BigIntegerField(default=0, verbose_name="Версия"),
+                ),
+                (
+                    "modified",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="Изменён",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Версия ресурса",
+                "verbose_name_plural": "Версии ресурсов",
+            },
+        ),
+    ]
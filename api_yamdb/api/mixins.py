@@ -0,0 +1,176 @@
+from django.conf import settings
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from reviews.models import Comment, Review, Title
+
+from . import cache
+
+
+class NestedResourceMixin:
+    """
+    Получение объектов вложенных ресурсов
+    /titles/{title_id}/reviews/{review_id}/comments/{comment_id}/.
+
+    Запрашиваемый объект загружается одним запросом вместе с родительскими
+    объектами и автором. Дополнительные запросы выполняются только при
+    ошибке, чтобы вернуть 404 для того уровня, на котором объект не найден.
+    """
+
+    def resolve(self, title_id, review_id=None, comment_id=None):
+        if comment_id is not None:
+            queryset = Comment.objects.select_related(
+                "review__title", "author"
+            ).filter(
+                pk=comment_id, review_id=review_id, review__title_id=title_id
+            )
+        elif review_id is not None:
+            queryset = Review.objects.select_related(
+                "title", "author"
+            ).filter(pk=review_id, title_id=title_id)
+        else:
+            queryset = Title.objects.filter(pk=title_id)
+
+        obj = queryset.first()
+        if obj is not None:
+            return obj
+
+        if comment_id is not None:
+            self.resolve(title_id, review_id)
+            raise NotFound(detail="Не найден комментарий!")
+        if review_id is not None:
+            self.resolve(title_id)
+            raise NotFound(detail="Не найден отзыв!")
+        raise NotFound(detail="Не найдено произведение!")
+
+
+class ResourceVersionMixin:
+    """
+    Версии ресурсов, от которых зависят ответы вьюсета.
+
+    cache_resources — ресурсы, от которых зависит ответ на чтение. Имена
+    могут ссылаться на параметры URL, например "reviews:{title_id}".
+    Версии увеличивают обработчики сигналов моделей (см. api.cache).
+    """
+
+    cache_resources = ()
+
+    def get_cache_resources(self):
+        return [
+            resource.format(**self.kwargs) for resource in self.cache_resources
+        ]
+
+    def get_resource_state(self):
+        """
+        Отпечаток ответа и время изменения ресурсов, один раз за запрос.
+        """
+
+        if not hasattr(self, "_resource_state"):
+            versions, last_modified = cache.get_versions(
+                self.get_cache_resources()
+            )
+            self._resource_state = (
+                cache.fingerprint(self.request, versions),
+                last_modified,
+            )
+        return self._resource_state
+
+
+class ConditionalGetMixin(ResourceVersionMixin):
+    """
+    ETag и Last-Modified для list/retrieve по версиям ресурсов.
+
+    Совпавший If-None-Match (или, без него, не устаревший
+    If-Modified-Since) сразу даёт 304: только запрос версий, без выборки
+    данных и сериализации.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        digest, last_modified = self.get_resource_state()
+        etag = f'"{digest}"'
+        last_modified = int(last_modified)
+
+        if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+        if_modified_since = parse_http_date_safe(
+            request.META.get("HTTP_IF_MODIFIED_SINCE", "")
+        )
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            not_modified = etag in tags
+            if not not_modified and "*" in tags:
+                # "*" совпадает только с существующим ресурсом: иначе 404.
+                self.check_exists()
+                not_modified = True
+        else:
+            not_modified = (
+                if_modified_since is not None
+                and last_modified <= if_modified_since
+            )
+
+        if not_modified:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def check_exists(self):
+        if "pk" in self.kwargs:
+            self.get_object()
+        else:
+            # Для вложенных списков проверяет родительские объекты.
+            self.get_queryset()
+
+
+class CachedResponseMixin(ResourceVersionMixin):
+    """
+    Кэширование ответов list/retrieve с версионной инвалидацией.
+    """
+
+    cache_name = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.cache_name:
+            cache.CACHED_VIEWS.add(cls.cache_name)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not cache.is_enabled():
+            return handler(request, *args, **kwargs)
+
+        digest, _ = self.get_resource_state()
+        key = f"{cache.RESPONSE_PREFIX}:{digest}"
+        data = cache.get_cache().get(key)
+        if data is not None:
+            cache.record(self.cache_name, "hits")
+            return Response(data, headers={"X-Cache": "HIT"})
+
+        cache.record(self.cache_name, "misses")
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.get_cache().set(
+                key, response.data, settings.API_CACHE["TIMEOUT"]
+            )
+        response["X-Cache"] = "MISS"
+        return response
@@ -0,0 +1,90 @@
+from django.db import models
+from django.utils import timezone
+
+
+class ImportCheckpoint(models.Model):
+    """
+    Ход инкрементальной загрузки csv-файла командой import_data.
+    """
+
+    file_name = models.CharField("Файл", max_length=255, unique=True)
+    file_size = models.BigIntegerField("Размер файла")
+    file_mtime = models.BigIntegerField("Время изменения файла, нс")
+    offset = models.BigIntegerField("Загружено байт", default=0)
+    rows = models.BigIntegerField("Загружено строк", default=0)
+    completed = models.BooleanField("Загрузка завершена", default=False)
+    updated = models.DateTimeField("Обновлено", auto_now=True)
+
+    class Meta:
+        verbose_name = "Контрольная точка импорта"
+        verbose_name_plural = "Контрольные точки импорта"
+
+    def __str__(self):
+        return f"{self.file_name}: {self.rows}"
+
+    def matches(self, stat):
+        return (self.file_size, self.file_mtime) == (
+            stat.st_size,
+            stat.st_mtime_ns,
+        )
+
+
+class OutgoingEmail(models.Model):
+    """
+    Письмо в очереди на отправку (см. api.outbox и команду send_emails).
+    """
+
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "В очереди"),
+        (SENT, "Отправлено"),
+        (FAILED, "Не отправлено"),
+    ]
+
+    subject = models.CharField("Тема", max_length=255)
+    body = models.TextField("Текст")
+    from_email = models.CharField("Отправитель", max_length=254)
+    recipients = models.TextField("Получатели через запятую")
+    status = models.CharField(
+        "Состояние", max_length=10, choices=STATUS_CHOICES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField("Попыток", default=0)
+    next_attempt = models.DateTimeField(
+        "Следующая попытка", default=timezone.now
+    )
+    last_error = models.TextField("Последняя ошибка", blank=True)
+    created = models.DateTimeField("Создано", auto_now_add=True)
+    sent = models.DateTimeField("Отправлено", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Исходящее письмо"
+        verbose_name_plural = "Исходящие письма"
+        indexes = [
+            models.Index(
+                fields=("status", "next_attempt"),
+                name="email_status_next_attempt_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipients}: {self.subject}"
+
+
+class ResourceVersion(models.Model):
+    """
+    Версия ресурса API (см. api.cache). Хранится в базе, поэтому ETag,
+    Last-Modified и ключи кэша ответов одинаковы во всех процессах.
+    """
+
+    name = models.CharField("Ресурс", max_length=100, unique=True)
+    version = models.BigIntegerField("Версия", default=0)
+    modified = models.DateTimeField("Изменён", default=timezone.now)
+
+    class Meta:
+        verbose_name = "Версия ресурса"
+        verbose_name_plural = "Версии ресурсов"
+
+    def __str__(self):
+        return f"{self.name}: {self.version}"
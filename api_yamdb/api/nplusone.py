@@ -0,0 +1,166 @@
+"""
+Поиск повторяющихся SQL-запросов (N+1) в пределах одного запроса к API.
+
+QueryCollector подключается обёрткой курсора (connection.execute_wrapper)
+и приводит каждый запрос к общему виду: значения параметров и списки IN
+заменяются заполнителями. Запрос одного вида, выполненный больше
+NPLUSONE["THRESHOLD"] раз, считается проблемой: для неё запоминаются поле
+сериализатора, при выводе которого он выполнен, и стек вызовов кода
+проекта. Стек снимается один раз на вид запроса, когда порог превышен,
+поэтому накладные расходы невелики, но детектор включается только явно:
+NPLUSONE_ENABLED=1 для NPlusOneMiddleware или фикстура
+assert_no_n_plus_one в тестах.
+"""
+
+import logging
+import os
+import re
+import sys
+import traceback
+
+from django.conf import settings
+from django.db import connection
+from rest_framework.fields import Field
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+from . import metrics
+from .metrics import get_labels
+
+logger = logging.getLogger(__name__)
+
+SERVICE_STATEMENTS = ("BEGIN", "SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK")
+STACK_LIMIT = 10
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+IN_LIST_RE = re.compile(r"\bIN \((?:\s*(?:%s|\?)\s*,?)+\)", re.IGNORECASE)
+SPACE_RE = re.compile(r"\s+")
+
+
+def normalize(sql):
+    """
+    Вид запроса: строки и числа заменены на ?, список IN любой длины —
+    на IN (...).
+    """
+
+    sql = STRING_RE.sub("?", sql)
+    sql = NUMBER_RE.sub("?", sql)
+    sql = IN_LIST_RE.sub("IN (...)", sql)
+    return SPACE_RE.sub(" ", sql).strip()
+
+
+def get_serializer_field():
+    """
+    Поле сериализатора, при выводе которого выполняется запрос: ближайший
+    по стеку объект поля DRF с именем, например "TitleUserSerializer.genre".
+    У сериализаторов без полей (TitleReadSerializer) — имя сериализатора.
+    """
+
+    frame = sys._getframe(2)
+    while frame is not None:
+        field = frame.f_locals.get("self")
+        if isinstance(field, Field) and field.field_name:
+            return f"{type(field.parent).__name__}.{field.field_name}"
+        if isinstance(field, BaseSerializer) and not isinstance(
+            field, ListSerializer
+        ):
+            return type(field).__name__
+        frame = frame.f_back
+    return None
+
+
+def get_project_stack():
+    """
+    Кадры стека из кода проекта, без библиотек и middleware замеров.
+    """
+
+    root = settings.BASE_DIR + os.sep
+    skipped = (__file__, metrics.__file__)
+    frames = [
+        frame
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(root)
+        and "site-packages" not in frame.filename
+        and frame.filename not in skipped
+    ]
+    return [
+        f"{os.path.relpath(frame.filename, root)}:{frame.lineno} "
+        f"in {frame.name}"
+        for frame in frames[-STACK_LIMIT:]
+    ]
+
+
+class QueryCollector:
+    """
+    Обёртка курсора, считающая запросы по виду.
+    """
+
+    def __init__(self, threshold=None):
+        if threshold is None:
+            threshold = settings.NPLUSONE["THRESHOLD"]
+        self.threshold = threshold
+        self.counts = {}
+        self.problems = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith(SERVICE_STATEMENTS):
+            shape = normalize(sql)
+            count = self.counts.get(shape, 0) + 1
+            self.counts[shape] = count
+            if count == self.threshold + 1:
+                self.problems[shape] = {
+                    "field": get_serializer_field(),
+                    "stack": get_project_stack(),
+                }
+        return execute(sql, params, many, context)
+
+    def get_problems(self):
+        """
+        Повторяющиеся запросы: вид, число выполнений, поле и стек.
+        """
+
+        return [
+            dict(problem, sql=shape, count=self.counts[shape])
+            for shape, problem in self.problems.items()
+        ]
+
+    def format(self, view=None):
+        lines = []
+        for problem in self.get_problems():
+            lines.append(
+                f"{problem['count']} раз: {problem['sql']}"
+                + (f"\n  представление: {view}" if view else "")
+                + (
+                    f"\n  поле: {problem['field']}"
+                    if problem["field"]
+                    else ""
+                )
+            )
+            lines += [f"    {frame}" for frame in problem["stack"]]
+        return "\n".join(lines)
+
+
+class NPlusOneMiddleware:
+    """
+    Запись в журнал api.nplusone запросов, в которых SQL-запрос одного
+    вида повторился больше NPLUSONE["THRESHOLD"] раз.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.NPLUSONE["ENABLED"]:
+            return self.get_response(request)
+        collector = QueryCollector()
+        try:
+            with connection.execute_wrapper(collector):
+                return self.get_response(request)
+        finally:
+            if collector.problems:
+                logger.warning(
+                    "Повторяющиеся SQL-запросы в %s %s:\n%s",
+                    request.method,
+                    request.path,
+                    collector.format(".".join(get_labels(request))),
+                )
@@ -0,0 +1,120 @@
+"""
+Очередь исходящих писем.
+
+Запрос только записывает письмо в таблицу OutgoingEmail, а команда
+send_emails отправляет накопившиеся письма порциями через одно соединение
+с почтовым сервером. Неудачная отправка повторяется с экспоненциально
+растущей задержкой, после EMAIL_OUTBOX["MAX_ATTEMPTS"] попыток письмо
+помечается неотправленным.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+
+def queue_email(subject, body, from_email, recipients):
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email,
+        recipients=",".join(recipients),
+    )
+
+
+def get_retry_delay(attempts):
+    return timedelta(
+        seconds=min(
+            settings.EMAIL_OUTBOX["RETRY_DELAY"] * 2 ** (attempts - 1),
+            settings.EMAIL_OUTBOX["MAX_RETRY_DELAY"],
+        )
+    )
+
+
+def claim_batch(batch_size):
+    """
+    Письма, которые пора отправить. Они откладываются на время аренды,
+    чтобы параллельный обработчик не взял их повторно; при падении
+    обработчика письма вернутся в очередь после её окончания.
+    """
+
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutgoingEmail.PENDING, next_attempt__lte=now)
+            .order_by("next_attempt", "pk")[:batch_size]
+        )
+        OutgoingEmail.objects.filter(
+            pk__in=[email.pk for email in emails]
+        ).update(
+            next_attempt=now
+            + timedelta(seconds=settings.EMAIL_OUTBOX["LEASE"])
+        )
+    return emails
+
+
+def deliver(emails):
+    """
+    Отправка писем по одному через общее открытое соединение, чтобы
+    ошибка одного письма не мешала остальным.
+    """
+
+    sent, failed = [], []
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        for email in emails:
+            email.last_error = f"{type(error).__name__}: {error}"
+        return sent, emails
+    try:
+        for email in emails:
+            message = EmailMessage(
+                email.subject,
+                email.body,
+                email.from_email,
+                email.recipients.split(","),
+                connection=connection,
+            )
+            try:
+                connection.send_messages([message])
+            except Exception as error:
+                email.last_error = f"{type(error).__name__}: {error}"
+                failed.append(email)
+            else:
+                sent.append(email)
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def send_batch(batch_size=None):
+    """
+    Отправка одной порции писем через одно соединение.
+    Возвращает число отправленных и число неудачных попыток.
+    """
+
+    emails = claim_batch(batch_size or settings.EMAIL_OUTBOX["BATCH_SIZE"])
+    if not emails:
+        return 0, 0
+
+    sent, failed = deliver(emails)
+    now = timezone.now()
+    OutgoingEmail.objects.filter(pk__in=[email.pk for email in sent]).update(
+        status=OutgoingEmail.SENT, sent=now
+    )
+    for email in failed:
+        email.attempts += 1
+        if email.attempts >= settings.EMAIL_OUTBOX["MAX_ATTEMPTS"]:
+            email.status = OutgoingEmail.FAILED
+        email.next_attempt = now + get_retry_delay(email.attempts)
+        email.save(
+            update_fields=("attempts", "status", "next_attempt", "last_error")
+        )
+    return len(sent), len(failed)
@@ -0,0 +1,130 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as DecodeError
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset-пагинация по паре (pub_date, id).
+
+    Страница выбирается условием на ключ последнего показанного объекта,
+    поэтому глубокие страницы стоят столько же, сколько первая: нет ни
+    COUNT(*), ни OFFSET. Курсор непрозрачен для клиента и передаётся
+    в параметре cursor ссылок next/previous.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Неверный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        position = self.decode_cursor(request)
+        reverse = position is not None and position[2]
+
+        if position is not None:
+            pub_date, pk = position[:2]
+            if reverse:
+                queryset = queryset.filter(pub_date__lte=pub_date).filter(
+                    Q(pub_date__lt=pub_date) | Q(pk__lt=pk)
+                )
+            else:
+                queryset = queryset.filter(pub_date__gte=pub_date).filter(
+                    Q(pub_date__gt=pub_date) | Q(pk__gt=pk)
+                )
+        if reverse:
+            queryset = queryset.order_by("-pub_date", "-pk")
+        else:
+            queryset = queryset.order_by("pub_date", "pk")
+
+        page = list(queryset[: self.page_size + 1])
+        has_more = len(page) > self.page_size
+        page = page[: self.page_size]
+        if reverse:
+            page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = page
+        return page
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                (
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                )
+            )
+        )
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, obj, reverse):
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            self.make_cursor(obj, reverse),
+        )
+
+    @staticmethod
+    def make_cursor(obj, reverse=False):
+        raw = f"{obj.pub_date.isoformat()}|{obj.pk}|{int(reverse)}"
+        return urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request):
+        """
+        Позиция из курсора: (pub_date, id, reverse) или None для первой
+        страницы.
+        """
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            raw = urlsafe_b64decode(cursor.encode()).decode()
+            pub_date, pk, reverse = raw.split("|")
+            position = (parse_datetime(pub_date), int(pk), bool(int(reverse)))
+        except (DecodeError, UnicodeDecodeError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+
+class OptionalKeysetPagination(PageNumberPagination):
+    """
+    Постраничная пагинация, которую клиент может заменить на keyset,
+    передав параметр cursor (пустой — для первой страницы).
+    """
+
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
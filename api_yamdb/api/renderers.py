@@ -0,0 +1,68 @@
+"""
+Вывод и разбор JSON через orjson.
+
+FastJSONRenderer и FastJSONParser подключаются в REST_FRAMEWORK вместо
+JSONRenderer и JSONParser DRF. Вывод тот же: компактный JSON в UTF-8,
+даты в ISO 8601 с "Z" для UTC, экранированные U+2028 и U+2029. Даты,
+UUID и числа orjson выводит сам, остальные типы (Decimal, ленивые
+строки, timedelta) — через JSONEncoder DRF. Отличия от JSONRenderer:
+порядок экспоненты у float (1e16 и 1e-7 вместо 1e+16 и 1e-07), а NaN и
+бесконечность выводятся как null, тогда как DRF их не выводит. Данные,
+которые orjson не выводит (например, целые шире 64 бит), выводит
+JSONRenderer. Если orjson не установлен или запрошен отступ
+(Accept: application/json; indent=4), работает стандартный модуль json.
+"""
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+OPTIONS = 0
+if orjson is not None:
+    OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+LINE_SEPARATOR = "\u2028".encode()
+PARAGRAPH_SEPARATOR = "\u2029".encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        try:
+            content = orjson.dumps(
+                data, default=self.encoder_class().default, option=OPTIONS
+            )
+        except (orjson.JSONEncodeError, TypeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        return content.replace(LINE_SEPARATOR, b"\\u2028").replace(
+            PARAGRAPH_SEPARATOR, b"\\u2029"
+        )
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get(
+            "encoding", settings.DEFAULT_CHARSET
+        )
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as error:
+            raise ParseError(f"JSON parse error - {error}")
@@ -3,6 +3,10 @@ import datetime as dt
 from rest_framework import serializers
 from reviews.models import Category, Comment, Genre, Review, Title, User
 
+# Даты в ответах сериализаторов для чтения выводятся так же, как в
+# ModelSerializer.
+DATETIME_FIELD = serializers.DateTimeField()
+
 
 class AdminsSerializer(serializers.ModelSerializer):
     class Meta:
@@ -55,10 +59,35 @@ class TitleUserSerializer(serializers.ModelSerializer):
     rating = serializers.IntegerField(read_only=True)
 
     class Meta:
-        fields = "__all__"
+        exclude = ("rating_sum", "review_count", "search_vector")
         model = Title
 
 
+class TitleReadSerializer(serializers.BaseSerializer):
+    """
+    Вывод TitleUserSerializer без полей DRF для list и retrieve: ответ
+    собирается прямо из атрибутов произведения, категория и жанры берутся
+    из select_related и prefetch_related вьюсета.
+    """
+
+    def to_representation(self, title):
+        category = title.category
+        if category is not None:
+            category = {"name": category.name, "slug": category.slug}
+        return {
+            "id": title.pk,
+            "category": category,
+            "genre": [
+                {"name": genre.name, "slug": genre.slug}
+                for genre in title.genre.all()
+            ],
+            "rating": title.rating,
+            "name": title.name,
+            "year": title.year,
+            "description": title.description,
+        }
+
+
 class TitleAdminSerializer(serializers.ModelSerializer):
     category = serializers.SlugRelatedField(
         queryset=Category.objects.all(), slug_field="slug"
@@ -68,7 +97,7 @@ class TitleAdminSerializer(serializers.ModelSerializer):
     )
 
     class Meta:
-        fields = "__all__"
+        exclude = ("rating_sum", "review_count", "search_vector")
         model = Title
 
     def validate_year(self, value):
@@ -78,6 +107,21 @@ class TitleAdminSerializer(serializers.ModelSerializer):
         return value
 
 
+class TitleBulkSerializer(TitleAdminSerializer):
+    """
+    Произведение из пакетной загрузки. Категория и жанры принимаются
+    как slug'и без обращения к базе: представление проверяет их сразу
+    для всего пакета.
+    """
+
+    category = serializers.SlugField()
+    genre = serializers.ListField(child=serializers.SlugField())
+
+    class Meta:
+        fields = ("name", "year", "description", "category", "genre")
+        model = Title
+
+
 class ReviewSerializer(serializers.ModelSerializer):
     title = serializers.SlugRelatedField(slug_field="name", read_only=True)
     author = serializers.SlugRelatedField(
@@ -89,6 +133,22 @@ class ReviewSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class ReviewReadSerializer(serializers.BaseSerializer):
+    """
+    Вывод ReviewSerializer без полей DRF для list и retrieve.
+    """
+
+    def to_representation(self, review):
+        return {
+            "id": review.pk,
+            "title": review.title.name,
+            "author": review.author.username,
+            "text": review.text,
+            "score": review.score,
+            "pub_date": DATETIME_FIELD.to_representation(review.pub_date),
+        }
+
+
 class CommentSerializer(serializers.ModelSerializer):
     review = serializers.SlugRelatedField(slug_field="text", read_only=True)
     author = serializers.SlugRelatedField(
@@ -98,3 +158,18 @@ class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = "__all__"
+
+
+class CommentReadSerializer(serializers.BaseSerializer):
+    """
+    Вывод CommentSerializer без полей DRF для list и retrieve.
+    """
+
+    def to_representation(self, comment):
+        return {
+            "id": comment.pk,
+            "review": comment.review.text,
+            "author": comment.author.username,
+            "text": comment.text,
+            "pub_date": DATETIME_FIELD.to_representation(comment.pub_date),
+        }
@@ -0,0 +1,156 @@
+"""
+Ограничение частоты запросов к эндпоинтам аутентификации.
+
+Для каждой пары (эндпоинт, IP) и (эндпоинт, имя пользователя) хранится
+корзина токенов: запрос забирает токен, а корзина равномерно наполняется
+со скоростью из API_THROTTLE["RATES"]. Проверка выполняется в initial()
+представления, до разбора данных сериализатором и запросов к базе.
+
+Состояние корзин хранится в подключаемом хранилище: общий кэш (по
+умолчанию), чтобы все процессы gunicorn видели одни и те же корзины, или
+память процесса. Счётчики пропущенных и отклонённых запросов собираются
+вместе с метриками (api.metrics) со всех процессов.
+"""
+
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+from . import metrics
+
+THROTTLE_PREFIX = "api-throttle"
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+OUTCOMES = ("allowed", "throttled")
+
+
+class CacheStore:
+    """
+    Хранилище в кэше Django. Чтение и запись корзины не атомарны, поэтому
+    при одновременных запросах лимит соблюдается приблизительно.
+    """
+
+    def __init__(self):
+        self.cache = caches[settings.API_THROTTLE["ALIAS"]]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, timeout):
+        self.cache.set(key, value, timeout)
+
+
+class MemoryStore:
+    """
+    Хранилище в памяти процесса, общее для всех его потоков.
+    """
+
+    lock = threading.Lock()
+    data = {}
+
+    def get(self, key):
+        with self.lock:
+            value, expires = self.data.get(key, (None, None))
+            if expires is not None and expires <= time.monotonic():
+                return None
+            return value
+
+    def set(self, key, value, timeout):
+        expires = time.monotonic() + timeout if timeout else None
+        with self.lock:
+            self.data[key] = (value, expires)
+
+    @classmethod
+    def clear(cls):
+        with cls.lock:
+            cls.data.clear()
+
+
+def get_store():
+    return import_string(settings.API_THROTTLE["STORE"])()
+
+
+def parse_rate(rate):
+    """
+    "10/m" — корзина на 10 запросов, полностью наполняется за минуту.
+    """
+
+    number, period = rate.split("/")
+    return int(number), PERIODS[period[0]]
+
+
+def get_stats():
+    """
+    Число пропущенных и отклонённых запросов по каждому ограничению во
+    всех процессах.
+    """
+
+    counters = metrics.get_counters(metrics.THROTTLE)
+    return {
+        name: {
+            outcome: counters.get((name, outcome), 0) for outcome in OUTCOMES
+        }
+        for name in sorted(settings.API_THROTTLE["RATES"])
+    }
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Корзина токенов для области throttle_scope представления. Ограничение
+    называется "<область>_<kind>" и берёт скорость из API_THROTTLE["RATES"].
+    """
+
+    kind = None
+
+    def get_ident_value(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        name = f"{getattr(view, 'throttle_scope', '')}_{self.kind}"
+        rate = settings.API_THROTTLE["RATES"].get(name)
+        if not settings.API_THROTTLE["ENABLED"] or rate is None:
+            return True
+        ident = self.get_ident_value(request)
+        if not ident:
+            return True
+
+        store = get_store()
+        capacity, period = parse_rate(rate)
+        digest = hashlib.md5(ident.encode()).hexdigest()
+        key = f"{THROTTLE_PREFIX}:{name}:{digest}"
+        now = time.time()
+        tokens, updated = store.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + (now - updated) * capacity / period)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        else:
+            self.wait_time = (1 - tokens) * period / capacity
+        store.set(key, (tokens, now), period)
+        metrics.registry.count((metrics.THROTTLE, name, OUTCOMES[not allowed]))
+        return allowed
+
+    def wait(self):
+        return getattr(self, "wait_time", None)
+
+
+class IPThrottle(TokenBucketThrottle):
+    kind = "ip"
+
+    def get_ident_value(self, request):
+        return self.get_ident(request)
+
+
+class UsernameThrottle(TokenBucketThrottle):
+    kind = "username"
+
+    def get_ident_value(self, request):
+        data = request.data
+        username = data.get("username") if hasattr(data, "get") else None
+        if isinstance(username, str):
+            return username.strip().lower()
+        return None
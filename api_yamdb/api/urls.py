@@ -1,8 +1,9 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import (APIGetToken, APISignUp, CategoryViewSet, CommentViewSet,
-                    GenreViewSet, ReviewViewSet, TitleViewSet, UsersViewSet)
+from .views import (APIGetToken, APISignUp, CacheStatsView, CategoryViewSet,
+                    CommentViewSet, GenreViewSet, MetricsView, ReviewViewSet,
+                    ThrottleStatsView, TitleViewSet, UsersViewSet)
 
 router = routers.DefaultRouter()
 
@@ -30,4 +31,11 @@ urlpatterns = [
     path("v1/", include(router.urls), name="v1"),
     path("v1/auth/token/", APIGetToken.as_view(), name="get_token"),
     path("v1/auth/signup/", APISignUp.as_view(), name="sign_up_token"),
+    path("v1/cache/stats/", CacheStatsView.as_view(), name="cache_stats"),
+    path(
+        "v1/throttle/stats/",
+        ThrottleStatsView.as_view(),
+        name="throttle_stats",
+    ),
+    path("v1/metrics/", MetricsView.as_view(), name="metrics"),
 ]
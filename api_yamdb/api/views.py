@@ -1,29 +1,38 @@
 from http import HTTPStatus
 
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import mixins, permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.exceptions import ParseError
 from rest_framework.filters import SearchFilter
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.models import Category, Genre, Title, User
 
 from api_yamdb.settings import ADMIN_EMAIL, USER
 
+from . import cache, throttling
+from .authentication import get_db_user, get_token_for_user
 from .filters import TitleFilter
+from .metrics import HasMetricsToken, PrometheusRenderer, render
+from .mixins import (CachedResponseMixin, ConditionalGetMixin,
+                     NestedResourceMixin)
+from .outbox import queue_email
+from .pagination import OptionalKeysetPagination
 from .permissons import IsAdmin, IsAdminOrReadOnly, IsAuthorOrModerator
 from .serializers import (AdminsSerializer, CategorySerializer,
-                          CommentSerializer, GenreSerializer,
-                          GetTokenSerializer, ReviewSerializer,
+                          CommentReadSerializer, CommentSerializer,
+                          GenreSerializer, GetTokenSerializer,
+                          ReviewReadSerializer, ReviewSerializer,
                           SignUpSerializer, TitleAdminSerializer,
-                          TitleUserSerializer, UsersSerializer)
+                          TitleBulkSerializer, TitleReadSerializer,
+                          UsersSerializer)
+from .throttling import IPThrottle, UsernameThrottle
 
 
 class UsersViewSet(viewsets.ModelViewSet):
@@ -74,18 +83,19 @@ class UsersViewSet(viewsets.ModelViewSet):
         url_path="me",
     )
     def get_current_user_info(self, request):
-        serializer = AdminsSerializer(request.user)
+        user = get_db_user(request.user)
+        serializer = AdminsSerializer(user)
         if request.method == "PATCH":
             serializer = AdminsSerializer(
-                request.user, data=request.data, partial=True
+                user, data=request.data, partial=True
             )
-            if request.user.is_admin:
+            if user.is_admin:
                 serializer = AdminsSerializer(
-                    request.user, data=request.data, partial=True
+                    user, data=request.data, partial=True
                 )
             else:
                 serializer = UsersSerializer(
-                    request.user, data=request.data, partial=True
+                    user, data=request.data, partial=True
                 )
             serializer.is_valid(raise_exception=True)
             serializer.save()
@@ -109,6 +119,9 @@ class APIGetToken(APIView):
     }
     """
 
+    throttle_classes = (IPThrottle, UsernameThrottle)
+    throttle_scope = "token"
+
     def post(self, request):
         serializer = GetTokenSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -117,7 +130,7 @@ class APIGetToken(APIView):
         user = get_object_or_404(User, username=data["username"])
 
         if data.get("confirmation_code") == user.confirmation_code:
-            token = RefreshToken.for_user(user).access_token
+            token = get_token_for_user(user)
             return Response(
                 {"token": str(token)}, status=status.HTTP_201_CREATED
             )
@@ -140,26 +153,85 @@ class APISignUp(APIView):
     """
 
     permission_classes = (AllowAny,)
+    throttle_classes = (IPThrottle, UsernameThrottle)
+    throttle_scope = "signup"
 
     def post(self, request):
         serializer = SignUpSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user = serializer.save()
-
-        send_mail(
-            "Код для API",
-            (
-                f"Здравствуйте, {user.username}!\n"
-                f"Код доступа к API: {user.confirmation_code}"
-            ),
-            ADMIN_EMAIL,
-            [user.email],
-        )
+        # Письмо с кодом отправляет команда send_emails: запрос только
+        # ставит его в очередь вместе с созданием пользователя.
+        with transaction.atomic():
+            user = serializer.save()
+            queue_email(
+                "Код для API",
+                (
+                    f"Здравствуйте, {user.username}!\n"
+                    f"Код доступа к API: {user.confirmation_code}"
+                ),
+                ADMIN_EMAIL,
+                [user.email],
+            )
 
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class CacheStatsView(APIView):
+    """
+    APIView статистики кэша ответов (только для администратора).
+
+    Ответ:
+    {
+        "<вьюсет>": {
+            "hits": число попаданий(:obj:`int`),
+            "misses": число промахов(:obj:`int`).
+        }
+    }
+    """
+
+    permission_classes = (IsAuthenticated, IsAdmin)
+
+    def get(self, request):
+        return Response(cache.get_stats())
+
+
+class ThrottleStatsView(APIView):
+    """
+    APIView статистики ограничения частоты запросов (только для
+    администратора).
+
+    Ответ:
+    {
+        "<ограничение>": {
+            "allowed": пропущено запросов(:obj:`int`),
+            "throttled": отклонено запросов(:obj:`int`).
+        }
+    }
+    """
+
+    permission_classes = (IsAuthenticated, IsAdmin)
+
+    def get(self, request):
+        return Response(throttling.get_stats())
+
+
+class MetricsView(APIView):
+    """
+    APIView метрик в текстовом формате Prometheus (для администратора
+    или сборщика метрик с токеном METRICS["TOKEN"]).
+    """
+
+    permission_classes = (HasMetricsToken | (IsAuthenticated & IsAdmin),)
+    renderer_classes = (PrometheusRenderer,)
+
+    def get(self, request):
+        return Response(
+            render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+
 class CategoryViewSet(
+    CachedResponseMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.DestroyModelMixin,
@@ -191,9 +263,12 @@ class CategoryViewSet(
     filter_backends = (SearchFilter,)
     search_fields = ("name",)
     lookup_field = "slug"
+    cache_name = "categories"
+    cache_resources = ("categories",)
 
 
 class GenreViewSet(
+    CachedResponseMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.DestroyModelMixin,
@@ -225,9 +300,13 @@ class GenreViewSet(
     filter_backends = (SearchFilter,)
     search_fields = ("name",)
     lookup_field = "slug"
+    cache_name = "genres"
+    cache_resources = ("genres",)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(
+    ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet
+):
     """
     ViewSet для работы с произведениями.
 
@@ -260,85 +339,212 @@ class TitleViewSet(viewsets.ModelViewSet):
     Частичное обновление информации о произведении: PATCH /titles/{titles_id}/
 
     Удаление произведения: DELETE /titles/{titles_id}/
+
+    С параметром ?facets=true в ответ на список добавляется поле "facets":
+    число отфильтрованных произведений по категориям, жанрам и интервалам
+    лет (один дополнительный запрос).
+
+    С параметром ?ids=1,2,3 список отдаётся целиком, без страниц; пустой
+    ids не учитывается.
+
+    Пакетная загрузка: POST /titles/bulk/ со списком произведений в формате
+    POST /titles/. Ответ содержит по элементу на каждое произведение
+    запроса: созданное произведение с id или {"errors": {...}}.
     """
 
-    queryset = queryset = Title.objects.annotate(
-        rating=Avg("reviews__score")
-    ).all()
+    queryset = Title.objects.all()
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     pagination_class = PageNumberPagination
     filterset_class = TitleFilter
+    cache_name = "titles"
+    cache_resources = ("titles",)
+
+    def paginate_queryset(self, queryset):
+        ids = self.request.query_params.get("ids", "").split(",")
+        if any(pk.strip() for pk in ids):
+            # Список уже ограничен TITLES_BULK["MAX_ITEMS"] в TitleFilter.
+            return None
+        if self.request.query_params.get("facets") in ("1", "true"):
+            self.facets = queryset.facets()
+        return super().paginate_queryset(queryset)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if hasattr(self, "facets"):
+            response.data["facets"] = self.facets
+        return response
 
-    def get_serializer_class(self):
+    def get_queryset(self):
+        queryset = super().get_queryset()
         if self.action in ("list", "retrieve"):
-            return TitleUserSerializer
+            # Категория и жанры нужны сериализатору: загружаем их одним
+            # JOIN и одним запросом на всю страницу. Поисковый вектор
+            # в ответ не выводится.
+            return (
+                queryset.select_related("category")
+                .prefetch_related("genre")
+                .defer("search_vector")
+            )
+        return queryset
+
+    def get_serializer_class(self):
+        # Формы браузируемого API запрашивают сериализатор с методом
+        # POST или PUT даже для list и retrieve.
+        if self.request.method in permissions.SAFE_METHODS:
+            return TitleReadSerializer
+        if self.action == "bulk":
+            return TitleBulkSerializer
         return TitleAdminSerializer
 
+    @action(methods=("POST",), detail=False)
+    def bulk(self, request):
+        limit = settings.TITLES_BULK["MAX_ITEMS"]
+        if not isinstance(request.data, list):
+            raise ParseError("Ожидается список произведений!")
+        if len(request.data) > limit:
+            raise ParseError(
+                f"Не больше {limit} произведений в одном запросе!"
+            )
+
+        items = [self.get_serializer(data=item) for item in request.data]
+        titles, results = self.build_titles(items)
+        if titles:
+            with transaction.atomic():
+                self.create_titles(titles)
+                # bulk_create не отправляет сигналы, версию меняем сами.
+                cache.bump_versions(["titles"])
+        for index, title, genres in titles:
+            results[index] = {"id": title.pk, **items[index].data}
+        if not titles:
+            return Response(results, status=status.HTTP_400_BAD_REQUEST)
+        return Response(results, status=status.HTTP_201_CREATED)
+
+    def build_titles(self, items):
+        """
+        Проверка пакета. Slug'и категорий и жанров всех произведений
+        проверяются двумя запросами; для ошибочных произведений в результат
+        записываются ошибки, для остальных создаются несохранённые объекты.
+        """
+
+        valid = [item.validated_data for item in items if item.is_valid()]
+        categories = Category.objects.in_bulk(
+            {data["category"] for data in valid}, field_name="slug"
+        )
+        genres = Genre.objects.in_bulk(
+            {slug for data in valid for slug in data["genre"]},
+            field_name="slug",
+        )
+
+        titles, results = [], []
+        for index, item in enumerate(items):
+            errors = dict(item.errors)
+            data = item.validated_data if not errors else {}
+            if data and data["category"] not in categories:
+                errors["category"] = [
+                    f"Категория {data['category']} не найдена!"
+                ]
+            missing = [
+                slug for slug in data.get("genre", ()) if slug not in genres
+            ]
+            if missing:
+                errors["genre"] = [f"Жанры не найдены: {', '.join(missing)}!"]
+            results.append({"errors": errors} if errors else None)
+            if not errors:
+                title = Title(
+                    name=data["name"],
+                    year=data["year"],
+                    description=data.get("description"),
+                    category=categories[data["category"]],
+                )
+                titles.append(
+                    (index, title, [genres[slug] for slug in data["genre"]])
+                )
+        return titles, results
+
+    def create_titles(self, titles):
+        """
+        Вставка произведений и их связей с жанрами порциями по
+        TITLES_BULK["BATCH_SIZE"] строк. Если СУБД не возвращает id
+        вставленных строк (возвращает только PostgreSQL), произведения
+        сохраняются по одному.
+        """
+
+        batch_size = settings.TITLES_BULK["BATCH_SIZE"]
+        objs = [title for index, title, genres in titles]
+        if connection.features.can_return_ids_from_bulk_insert:
+            Title.objects.bulk_create(objs, batch_size=batch_size)
+        else:
+            for title in objs:
+                title.save(force_insert=True)
+        through = Title.genre.through
+        through.objects.bulk_create(
+            [
+                through(title_id=title.pk, genre_id=genre.pk)
+                for index, title, genres in titles
+                for genre in dict.fromkeys(genres)
+            ],
+            batch_size=batch_size,
+        )
+
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    NestedResourceMixin,
+    viewsets.ModelViewSet,
+):
     """
     ViewSet для работы с отзывами.
+
+    Список отзывов: GET /titles/{title_id}/reviews/
+    С параметром ?cursor= вместо номера страницы используется
+    keyset-пагинация по дате публикации (без подсчёта общего числа).
     """
 
     serializer_class = ReviewSerializer
-    pagination_class = PageNumberPagination
+    pagination_class = OptionalKeysetPagination
     permission_classes = (IsAuthorOrModerator,)
+    cache_name = "reviews"
+    cache_resources = ("reviews:{title_id}", "users")
 
     def get_queryset(self):
-        title_id = self.kwargs.get("title_id")
-        pk = self.kwargs.get("pk")
-        if not Title.objects.filter(id=title_id).exists():
-            raise NotFound(
-                detail="Произведение не найдено", code=HTTPStatus.NOT_FOUND
-            )
-        if pk and not Review.objects.filter(id=pk).exists():
-            raise NotFound(detail="Отзыв не найден", code=HTTPStatus.NOT_FOUND)
-        return Review.objects.filter(title_id=title_id)
+        title = self.resolve(self.kwargs.get("title_id"))
+        return title.reviews.select_related("title", "author")
+
+    def get_serializer_class(self):
+        if self.request.method in permissions.SAFE_METHODS:
+            return ReviewReadSerializer
+        return ReviewSerializer
+
+    def get_object(self):
+        review = self.resolve(self.kwargs.get("title_id"), self.kwargs["pk"])
+        self.check_object_permissions(self.request, review)
+        return review
 
     def perform_create(self, serializer):
-        title_id = self.kwargs.get("title_id")
-        text = self.request.data.get("text")
-        score = self.request.data.get("score")
-        if not Title.objects.filter(id=title_id).exists():
-            raise NotFound(
-                detail="Не найдено произведение!!!", code=HTTPStatus.NOT_FOUND
-            )
-        if Review.objects.filter(
-            title_id=title_id, author=self.request.user
-        ).exists():
+        title = self.resolve(self.kwargs.get("title_id"))
+        # Повторный отзыв отсекает ограничение unique-review: так не нужен
+        # отдельный запрос на проверку и нет гонки между проверкой и записью.
+        try:
+            with transaction.atomic():
+                serializer.save(
+                    title=title, author=get_db_user(self.request.user)
+                )
+        except IntegrityError:
             raise ParseError(
                 detail="Нельзя добавить больше одного отзыва!",
                 code=HTTPStatus.BAD_REQUEST,
             )
-        serializer.save(
-            title_id=title_id,
-            text=text,
-            score=score,
-            author=self.request.user,
-        )
-        return Response(status=status.HTTP_201_CREATED)
 
     def partial_update(self, request, pk, title_id):
-        if not Title.objects.filter(id=title_id).exists():
-            return Response(
-                "Не найдено произведение!", status=status.HTTP_404_NOT_FOUND
-            )
-        review = Review.objects.filter(title=title_id, id=pk)
-        if not review.exists():
-            return Response(
-                "Не найден отзыв!", status=status.HTTP_404_NOT_FOUND
-            )
-        review = review.first()
-        cur_user = request.user
-        review_author = review.author
-        cur_user_group = cur_user.role
+        review = self.resolve(title_id, pk)
         if not request.data.get("text") and not request.data.get("score"):
             return Response(
                 "Не передано ни одно из обязательных полей!",
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        if cur_user_group == USER and cur_user != review_author:
+        if request.user.role == USER and request.user.id != review.author_id:
             return Response(
                 "Вы не можете редактировать чужой отзыв!",
                 status=status.HTTP_403_FORBIDDEN,
@@ -346,97 +552,66 @@ class ReviewViewSet(viewsets.ModelViewSet):
         serializer = self.serializer_class(
             review, data=self.request.data, partial=True
         )
-        if serializer.is_valid(raise_exception=True):
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        return None
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
     def destroy(self, request, pk, title_id):
-        if not Title.objects.filter(id=title_id).exists():
-            return Response(
-                "Не найдено произведение!", status=status.HTTP_404_NOT_FOUND
-            )
-        review = Review.objects.filter(title=title_id, id=pk)
-        if not review.exists():
-            return Response(
-                "Отзыв не найден!", status=status.HTTP_404_NOT_FOUND
-            )
-        cur_user = request.user
-        review = review.first()
-        review_author = review.author
-        cur_user_group = cur_user.role
-        if cur_user_group == USER and cur_user != review_author:
+        review = self.resolve(title_id, pk)
+        if request.user.role == USER and request.user.id != review.author_id:
             return Response(
                 "Вы не можете удалить чужой отзыв!",
                 status=status.HTTP_403_FORBIDDEN,
             )
-        else:
-            review.delete()
-            return Response("Отзыв удален!", status=status.HTTP_204_NO_CONTENT)
+        review.delete()
+        return Response("Отзыв удален!", status=status.HTTP_204_NO_CONTENT)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(
+    ConditionalGetMixin, NestedResourceMixin, viewsets.ModelViewSet
+):
     """
     ViewSet для работы с комментариями.
+
+    Список комментариев: GET /titles/{title_id}/reviews/{review_id}/comments/
+    Поддерживает keyset-пагинацию с параметром ?cursor=, как и отзывы.
     """
 
     serializer_class = CommentSerializer
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
-    pagination_class = PageNumberPagination
+    pagination_class = OptionalKeysetPagination
+    # Комментарии выводят текст отзыва и пропадают вместе с произведением.
+    cache_resources = ("comments:{review_id}", "reviews:{title_id}", "users")
 
     def get_queryset(self):
-        title_id = self.kwargs.get("title_id")
-        review_id = self.kwargs.get("review_id")
-        comment_id = self.kwargs.get("pk")
-        if not Review.objects.filter(id=review_id).exists():
-            raise NotFound(detail="Не найден отзыв!", code=404)
-        if not Title.objects.filter(id=title_id).exists():
-            raise NotFound(
-                detail="Не найдено произведение!", code=HTTPStatus.NOT_FOUND
-            )
-        if comment_id and not Comment.objects.filter(id=comment_id).exists():
-            raise NotFound(
-                detail="Не найден комментарий!", code=HTTPStatus.NOT_FOUND
-            )
-        return Comment.objects.filter(review=review_id)
+        review = self.resolve(
+            self.kwargs.get("title_id"), self.kwargs.get("review_id")
+        )
+        return review.comments.select_related("review", "author")
+
+    def get_serializer_class(self):
+        if self.request.method in permissions.SAFE_METHODS:
+            return CommentReadSerializer
+        return CommentSerializer
+
+    def get_object(self):
+        comment = self.resolve(
+            self.kwargs.get("title_id"),
+            self.kwargs.get("review_id"),
+            self.kwargs["pk"],
+        )
+        self.check_object_permissions(self.request, comment)
+        return comment
 
     def perform_create(self, serializer):
-        title_id = self.kwargs.get("title_id")
-        review_id = self.kwargs.get("review_id")
-        text = self.request.data.get("text")
-        if not Title.objects.filter(id=title_id).exists():
-            raise NotFound(
-                detail="Не найдено произведение!", code=HTTPStatus.NOT_FOUND
-            )
-        if not Review.objects.filter(title_id=title_id, id=review_id).exists():
-            raise NotFound(
-                detail="Не найден отзыв!", code=HTTPStatus.NOT_FOUND
-            )
-        serializer.save(
-            review_id=review_id, text=text, author=self.request.user
+        review = self.resolve(
+            self.kwargs.get("title_id"), self.kwargs.get("review_id")
         )
-        return Response(status=status.HTTP_201_CREATED)
+        serializer.save(review=review, author=get_db_user(self.request.user))
 
     def partial_update(self, request, pk, title_id, review_id):
-        comment = Comment.objects.filter(id=pk, review_id=review_id)
-        if not Title.objects.filter(id=title_id).exists():
-            raise NotFound(
-                detail="Не найдено произведение!", code=HTTPStatus.NOT_FOUND
-            )
-        if not Review.objects.filter(id=review_id).exists():
-            raise NotFound(
-                detail="Не найден отзыв!", code=HTTPStatus.NOT_FOUND
-            )
-        if not comment.exists():
-            raise NotFound(
-                detail="Не найден комментарий!", code=HTTPStatus.NOT_FOUND
-            )
-
-        cur_user = request.user
-        cur_user_group = cur_user.role
-        comment = comment.first()
-        comment_author = comment.author
-        if cur_user_group == USER and cur_user != comment_author:
+        comment = self.resolve(title_id, review_id, pk)
+        if request.user.role == USER and request.user.id != comment.author_id:
             return Response(
                 "Вы не можете редактировать чужой комментарий!",
                 status=status.HTTP_403_FORBIDDEN,
@@ -444,36 +619,18 @@ class CommentViewSet(viewsets.ModelViewSet):
         serializer = self.serializer_class(
             comment, data=self.request.data, partial=True
         )
-        if serializer.is_valid(raise_exception=True):
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
     def destroy(self, request, pk, title_id, review_id):
-        if not Title.objects.filter(id=title_id).exists():
-            return Response(
-                "Не найдено произведение!", status=status.HTTP_404_NOT_FOUND
-            )
-        if not Review.objects.filter(id=review_id, title_id=title_id).exists():
-            return Response(
-                "Не найден отзыв!", status=status.HTTP_404_NOT_FOUND
-            )
-        comment = Comment.objects.filter(id=pk, review_id=review_id)
-        if not comment.exists():
-            return Response(
-                "Не найден комментарий!", status=status.HTTP_404_NOT_FOUND
-            )
-        cur_user = request.user
-        cur_user_group = cur_user.role
-        comment = comment.first()
-        comment_author = comment.author
-        if cur_user_group == USER and cur_user != comment_author:
+        comment = self.resolve(title_id, review_id, pk)
+        if request.user.role == USER and request.user.id != comment.author_id:
             return Response(
                 "Вы не можете удалить чужой комментарий!",
                 status=status.HTTP_403_FORBIDDEN,
             )
-        else:
-            comment.delete()
-            return Response(
-                "Комментарий удален!", status=status.HTTP_204_NO_CONTENT
-            )
+        comment.delete()
+        return Response(
+            "Комментарий удален!", status=status.HTTP_204_NO_CONTENT
+        )
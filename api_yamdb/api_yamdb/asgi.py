@@ -1,13 +1,13 @@
 """
 ASGI config for YaMDb project.
+
 It exposes the ASGI callable as a module-level variable named ``application``.
-For more information on this file, see
-https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
+Django 2.2 has no ASGI handler of its own, see api.asgi.
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+from api.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "api_yamdb.settings")
 
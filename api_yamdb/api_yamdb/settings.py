@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 
 from dotenv import load_dotenv
@@ -23,6 +24,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework_simplejwt",
     "django_filters",
@@ -31,6 +33,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.metrics.MetricsMiddleware",
+    "api.nplusone.NPlusOneMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -61,6 +65,13 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "api_yamdb.wsgi.application"
 
+# Потоки ASGI-приложения (api.asgi) на процесс: для чтения публичных
+# списков и для остальных запросов.
+ASGI = {
+    "READ_THREADS": int(os.getenv("ASGI_READ_THREADS", default=16)),
+    "WRITE_THREADS": int(os.getenv("ASGI_WRITE_THREADS", default=4)),
+}
+
 
 # Database
 
@@ -71,7 +82,12 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default="postgres"),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default="postgres"),
         'HOST': os.getenv('DB_HOST', default="db"),
-        'PORT': os.getenv('DB_PORT', default="5432")
+        'PORT': os.getenv('DB_PORT', default="5432"),
+        # Соединение переиспользуется запросами одного потока CONN_MAX_AGE
+        # секунд; перед запросом после простоя оно проверяется
+        # (см. api.connections).
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -118,13 +134,28 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.ClaimsJWTAuthentication",
     ),
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 10,
+    # Адрес клиента для ограничения частоты запросов — последний адрес
+    # X-Forwarded-For, который дописывает nginx (infra/nginx/default.conf).
+    # Адреса, присланные самим клиентом, стоят раньше и не учитываются.
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", default=1)),
+    # JSON выводится и разбирается через orjson (см. api/renderers.py).
+    # Браузируемый API подключается только при DEBUG.
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+    ]
+    + (["rest_framework.renderers.BrowsableAPIRenderer"] if DEBUG else []),
+    "DEFAULT_PARSER_CLASSES": [
+        "api.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 SIMPLE_JWT = {
@@ -134,11 +165,116 @@ SIMPLE_JWT = {
 
 AUTH_USER_MODEL = "reviews.User"
 
+# Число цифр в коде подтверждения, который отправляется при регистрации.
+CONFIRMATION_CODE_LENGTH = int(
+    os.getenv("CONFIRMATION_CODE_LENGTH", default=6)
+)
+
+# Полная строка пользователя (для записи от его имени) хранится в памяти
+# процесса не дольше USER_CACHE_TTL секунд, версия токенов пользователя —
+# не дольше TOKEN_VERSION_TTL: столько другие воркеры ещё принимают
+# отозванный токен. CACHE_SIZE — предел числа пользователей в каждом из
+# этих кэшей.
+API_AUTH = {
+    "USER_CACHE_TTL": int(os.getenv("API_AUTH_USER_CACHE_TTL", default=30)),
+    "TOKEN_VERSION_TTL": int(
+        os.getenv("API_AUTH_TOKEN_VERSION_TTL", default=5)
+    ),
+    "CACHE_SIZE": int(os.getenv("API_AUTH_CACHE_SIZE", default=10000)),
+}
+
+# Пакетная загрузка произведений (POST /titles/bulk/) и получение
+# произведений по списку id (GET /titles/?ids=).
+TITLES_BULK = {
+    "MAX_ITEMS": int(os.getenv("TITLES_BULK_MAX_ITEMS", default=5000)),
+    # SQLite принимает не больше 500 строк в одном INSERT.
+    "BATCH_SIZE": 500,
+}
+
+
+# Cache
+
+# По умолчанию кэш в памяти процесса. Общий для всех воркеров кэш
+# подключается переменной REDIS_URL (нужен пакет django-redis).
+# Ключи ответов API_CACHE строятся по версиям ресурсов из базы (см.
+# api.cache), поэтому запись в любом воркере сразу сбрасывает ответы
+# во всех. Без REDIS_URL каждый воркер gunicorn заполняет свою копию
+# кэша; попадания и промахи всех воркеров собираются в METRICS["STORE"].
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+if os.getenv("REDIS_URL"):
+    CACHES["default"] = {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": os.getenv("REDIS_URL"),
+    }
+
+API_CACHE = {
+    "ENABLED": os.getenv("API_CACHE_ENABLED", default="1") == "1",
+    "ALIAS": "default",
+    "TIMEOUT": int(os.getenv("API_CACHE_TIMEOUT", default=60)),
+}
+
+# Ограничение частоты запросов к регистрации и получению токена (см.
+# api.throttling). Скорость "N/период" — корзина на N запросов, которая
+# полностью наполняется за период. STORE — api.throttling.CacheStore (кэш
+# ALIAS, общий для процессов при REDIS_URL) или api.throttling.MemoryStore.
+API_THROTTLE = {
+    "ENABLED": os.getenv("API_THROTTLE_ENABLED", default="1") == "1",
+    "STORE": os.getenv(
+        "API_THROTTLE_STORE", default="api.throttling.CacheStore"
+    ),
+    "ALIAS": "default",
+    "RATES": {
+        "signup_ip": "10/m",
+        "signup_username": "3/m",
+        "token_ip": "20/m",
+        "token_username": "5/m",
+    },
+}
+
+# Метрики запросов для Prometheus (см. api.metrics): все запросы
+# считаются, а в гистограммы времени, SQL-запросов и размера ответа
+# попадает доля SAMPLE_RATE. Эндпоинт /api/v1/metrics/ доступен
+# администратору или с заголовком "Authorization: Metrics <TOKEN>".
+METRICS = {
+    "ENABLED": os.getenv("METRICS_ENABLED", default="1") == "1",
+    "SAMPLE_RATE": float(os.getenv("METRICS_SAMPLE_RATE", default=0.1)),
+    "STORE": os.getenv("METRICS_STORE", default="api.metrics.FileStore"),
+    "DIR": os.getenv(
+        "METRICS_DIR",
+        default=os.path.join(tempfile.gettempdir(), "api_yamdb_metrics"),
+    ),
+    "FLUSH_INTERVAL": 1,
+    "TOKEN": os.getenv("METRICS_TOKEN", default=""),
+}
+
+# Поиск N+1 (см. api.nplusone): запрос, в котором SQL-запрос одного вида
+# выполнен больше THRESHOLD раз, записывается в журнал api.nplusone.
+NPLUSONE = {
+    "ENABLED": os.getenv("NPLUSONE_ENABLED", default="0") == "1",
+    "THRESHOLD": int(os.getenv("NPLUSONE_THRESHOLD", default=3)),
+}
+
 
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
+# Очередь писем: команда send_emails отправляет их порциями по BATCH_SIZE,
+# повторяя неудачные попытки через RETRY_DELAY * 2^(n-1) секунд (не больше
+# MAX_RETRY_DELAY) до MAX_ATTEMPTS раз. LEASE — на сколько секунд письмо
+# закрепляется за обработчиком.
+EMAIL_OUTBOX = {
+    "BATCH_SIZE": int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", default=100)),
+    "MAX_ATTEMPTS": 5,
+    "RETRY_DELAY": 60,
+    "MAX_RETRY_DELAY": 3600,
+    "LEASE": 300,
+}
+
 ADMIN_EMAIL = "support_api@mail.com"
 USER = "user"
 ADMIN = "admin"
@@ -0,0 +1,66 @@
+"""
+Настройки gunicorn для api_yamdb; файл из рабочего каталога gunicorn
+читает сам. Значения переопределяются переменными окружения GUNICORN_*.
+
+По умолчанию используются воркеры gthread: представления в основном ждут
+базу, и потоки дают конкурентность без патчинга стандартной библиотеки.
+Для gevent (GUNICORN_WORKER_CLASS=gevent) нужны пакеты gevent и psycogreen.
+ASGI-приложение api_yamdb.asgi:application запускается воркерами
+uvicorn.workers.UvicornWorker, потоки для запросов оно создаёт само.
+Каждый поток держит своё постоянное соединение с базой (CONN_MAX_AGE),
+поэтому workers * threads не должно превышать max_connections PostgreSQL
+(или размер пула pgbouncer).
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(
+    os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1)
+)
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 100))
+# Приложение загружается один раз в мастер-процессе до форка воркеров.
+preload_app = True
+# Воркеры перезапускаются в разное время, чтобы не освобождать память
+# одновременно.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+# nginx держит соединения с gunicorn открытыми между запросами.
+keepalive = 5
+accesslog = "-"
+
+
+def on_starting(server):
+    # Файлы метрик воркеров прошлого запуска (см. api.metrics.FileStore).
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "api_yamdb.settings")
+    from api.metrics import get_store
+
+    get_store().clear()
+
+
+def worker_exit(server, worker):
+    from api.metrics import flush
+
+    flush(force=True)
+
+
+def child_exit(server, worker):
+    # Мастер переносит метрики завершившегося (в том числе убитого по
+    # таймауту) воркера в общий файл, до того как pid займёт новый воркер.
+    from api.metrics import get_store
+
+    get_store().collect(worker.pid)
+
+
+def post_fork(server, worker):
+    # Соединения с базой, открытые в мастере при загрузке приложения,
+    # не должны разделяться воркерами.
+    from django.db import connections
+
+    for connection in connections.all():
+        connection.close()
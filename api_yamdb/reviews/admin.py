@@ -20,6 +20,7 @@ class CommentAdmin(admin.ModelAdmin):
 
 class TitleAdmin(admin.ModelAdmin):
     list_display = ("name",)
+    readonly_fields = ("rating_sum", "review_count")
     empty_value_display = "-пусто-"
 
 
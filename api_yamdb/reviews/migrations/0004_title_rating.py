@@ -0,0 +1,46 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:03
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_ratings(apps, schema_editor):
+    Title = apps.get_model("reviews", "Title")
+    Review = apps.get_model("reviews", "Review")
+    reviews = (
+        Review.objects.filter(title=OuterRef("pk")).order_by().values("title")
+    )
+    Title.objects.update(
+        rating_sum=Coalesce(
+            Subquery(reviews.annotate(total=Sum("score")).values("total")), 0
+        ),
+        review_count=Coalesce(
+            Subquery(reviews.annotate(total=Count("pk")).values("total")), 0
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reviews", "0003_auto_20220916_1511"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="title",
+            name="rating_sum",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Сумма оценок"
+            ),
+        ),
+        migrations.AddField(
+            model_name="title",
+            name="review_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Количество отзывов"
+            ),
+        ),
+        migrations.RunPython(fill_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:18
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Поисковый вектор поддерживается триггером, поэтому он актуален и для
+# строк, загруженных в обход ORM (COPY в import_data).
+CREATE_SEARCH = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE FUNCTION reviews_title_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A')
+        || setweight(
+            to_tsvector('russian', coalesce(NEW.description, '')), 'B'
+        );
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER reviews_title_search_vector
+    BEFORE INSERT OR UPDATE OF name, description ON reviews_title
+    FOR EACH ROW EXECUTE PROCEDURE reviews_title_search_vector();
+
+UPDATE reviews_title SET name = name;
+
+CREATE INDEX reviews_title_search_vector_gin
+    ON reviews_title USING gin (search_vector);
+CREATE INDEX reviews_title_name_trgm
+    ON reviews_title USING gin (name gin_trgm_ops);
+"""
+
+DROP_SEARCH = """
+DROP INDEX IF EXISTS reviews_title_name_trgm;
+DROP INDEX IF EXISTS reviews_title_search_vector_gin;
+DROP TRIGGER IF EXISTS reviews_title_search_vector ON reviews_title;
+DROP FUNCTION IF EXISTS reviews_title_search_vector();
+"""
+
+
+def create_search(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_SEARCH)
+
+
+def drop_search(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_SEARCH)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reviews", "0004_title_rating"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="title",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(create_search, drop_search),
+    ]
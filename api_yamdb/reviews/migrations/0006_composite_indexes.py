@@ -0,0 +1,47 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reviews", "0005_title_search"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="comment",
+            options={
+                "ordering": ("pub_date",),
+                "verbose_name": "Комментарий",
+                "verbose_name_plural": "Комментарии",
+            },
+        ),
+        # Промежуточная таблица жанров создаётся автоматически и индексирует
+        # (title_id, genre_id); фильтру по жанру нужен обратный порядок.
+        migrations.RunSQL(
+            "CREATE INDEX title_genre_genre_title_idx "
+            "ON reviews_title_genre (genre_id, title_id)",
+            "DROP INDEX title_genre_genre_title_idx",
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["review", "pub_date"],
+                name="comment_review_pub_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["title", "pub_date"], name="review_title_pub_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="title",
+            index=models.Index(
+                fields=["category", "year"], name="title_category_year_idx"
+            ),
+        ),
+    ]
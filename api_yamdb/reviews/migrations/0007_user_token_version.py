@@ -0,0 +1,20 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reviews", "0006_composite_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="token_version",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Версия токенов"
+            ),
+        ),
+    ]
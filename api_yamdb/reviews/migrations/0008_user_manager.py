@@ -0,0 +1,20 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:26
+
+from django.db import migrations
+import reviews.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reviews", "0007_user_token_version"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="user",
+            managers=[
+                ("objects", reviews.models.UserManager()),
+            ],
+        ),
+    ]
@@ -1,16 +1,51 @@
-import random
+import secrets
+import string
+import threading
 
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import UserManager as BaseUserManager
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVectorField,
+                                            TrigramSimilarity)
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import connections, models
+from django.db.models import (Case, CharField, Count, F, IntegerField,
+                              OuterRef, Q, Subquery, Sum, Value, When)
+from django.db.models.functions import Cast, Coalesce, Concat
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
 from django.dispatch import receiver
 
 from api_yamdb.settings import ADMIN, MODERATOR, USER
 
+from . import search
 from .validators import validate_username, validate_year
 
 ROLE_CHOICES = [(USER, USER), (ADMIN, ADMIN), (MODERATOR, MODERATOR)]
+# Поля пользователя, которые передаются в JWT и проверяются без базы.
+TOKEN_CLAIMS = ("username", "role", "is_staff", "is_superuser")
+# Ширина интервала лет в фасетах списка произведений.
+YEAR_FACET_STEP = 10
+
+
+def generate_confirmation_code(length=None):
+    length = length or settings.CONFIRMATION_CODE_LENGTH
+    return "".join(secrets.choice(string.digits) for _ in range(length))
+
+
+class UserManager(BaseUserManager):
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Массовое создание пользователей. Сигналы при этом не вызываются,
+        поэтому коды подтверждения заполняются здесь.
+        """
+
+        objs = list(objs)
+        for user in objs:
+            if not user.confirmation_code:
+                user.confirmation_code = generate_confirmation_code()
+        return super().bulk_create(objs, *args, **kwargs)
 
 
 class User(AbstractUser):
@@ -35,6 +70,11 @@ class User(AbstractUser):
         max_length=255,
         null=True,
     )
+    token_version = models.PositiveIntegerField(
+        "Версия токенов", default=0, editable=False
+    )
+
+    objects = UserManager()
 
     @property
     def is_user(self):
@@ -56,15 +96,40 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем данные, попавшие в токены пользователя, чтобы при их
+        # изменении отозвать выданные токены, и имя, которое выводится
+        # в отзывах и комментариях.
+        instance._loaded_claims = instance.get_claims()
+        instance._loaded_username = instance.__dict__.get("username")
+        return instance
+
+    def get_claims(self):
+        return [
+            self.__dict__.get(name) for name in TOKEN_CLAIMS + ("is_active",)
+        ]
+
+
+@receiver(pre_save, sender=User)
+def bump_token_version(instance, **kwargs):
+    loaded_claims = getattr(instance, "_loaded_claims", None)
+    if loaded_claims is not None and loaded_claims != instance.get_claims():
+        instance.token_version += 1
+
 
 @receiver(post_save, sender=User)
-def post_save(instance, created, **kwargs):
-    if created:
-        confirmation_code = "".join(
-            random.sample(tuple(map(str, range(0, 10))), 4)
-        )
-        instance.confirmation_code = confirmation_code
-        instance.save()
+def remember_claims(instance, **kwargs):
+    instance._loaded_claims = instance.get_claims()
+    instance._loaded_username = instance.username
+
+
+@receiver(pre_save, sender=User)
+def set_confirmation_code(instance, **kwargs):
+    # Код создаётся до вставки строки, чтобы регистрация была одной записью.
+    if instance._state.adding and not instance.confirmation_code:
+        instance.confirmation_code = generate_confirmation_code()
 
 
 class Category(models.Model):
@@ -96,6 +161,111 @@ class Genre(models.Model):
         return self.name
 
 
+class TitleQuerySet(models.QuerySet):
+    def update_ratings(self):
+        """
+        Пересчёт суммы и количества оценок одним запросом UPDATE.
+        """
+
+        reviews = (
+            Review.objects.filter(title=OuterRef("pk"))
+            .order_by()
+            .values("title")
+        )
+        return self.update(
+            rating_sum=Coalesce(
+                Subquery(reviews.annotate(total=Sum("score")).values("total")),
+                0,
+            ),
+            review_count=Coalesce(
+                Subquery(reviews.annotate(total=Count("pk")).values("total")),
+                0,
+            ),
+        )
+
+    def search(self, text):
+        """
+        Произведения, подходящие под поисковый запрос, по убыванию
+        релевантности.
+        """
+
+        words = search.get_words(text)
+        if not words:
+            return self.none()
+        if connections[self.db].vendor == "postgresql":
+            query = SearchQuery(
+                " & ".join(f"{word}:*" for word in words),
+                config=search.SEARCH_CONFIG,
+                search_type="raw",
+            )
+            return (
+                self.filter(
+                    Q(search_vector=query) | Q(name__trigram_similar=text)
+                )
+                .annotate(
+                    search_rank=SearchRank(F("search_vector"), query)
+                    + TrigramSimilarity("name", text)
+                )
+                .order_by("-search_rank", "pk")
+            )
+
+        # Без PostgreSQL ранжирование выполняется в процессе по названиям
+        # и описаниям, а порядок передаётся в базу выражением CASE.
+        ranks = {}
+        for pk, name, description in self.values_list(
+            "pk", "name", "description"
+        ).iterator():
+            rank = search.rank(text, name, description)
+            if rank:
+                ranks[pk] = rank
+        if not ranks:
+            return self.none()
+        order = sorted(ranks, key=lambda pk: (-ranks[pk], pk))
+        return self.filter(pk__in=order).order_by(
+            Case(
+                *(
+                    When(pk=pk, then=position)
+                    for position, pk in enumerate(order)
+                ),
+                output_field=IntegerField(),
+            )
+        )
+
+    def facets(self):
+        """
+        Число произведений выборки по категориям, жанрам и интервалам лет.
+
+        Три группировки объединяются через UNION ALL, так что все фасеты
+        считаются одним запросом к базе.
+        """
+
+        titles = self.model.objects.filter(
+            pk__in=self.order_by().values("pk")
+        ).order_by()
+        decade = F("year") / YEAR_FACET_STEP * YEAR_FACET_STEP
+        groups = [
+            titles.values(
+                value=Concat(
+                    Value(f"{facet}:"), field, output_field=CharField()
+                )
+            ).annotate(count=Count("pk", distinct=True))
+            for facet, field in (
+                ("category", F("category__slug")),
+                ("genre", F("genre__slug")),
+                ("year", Cast(decade, CharField())),
+            )
+        ]
+        facets = {"category": {}, "genre": {}, "year": {}}
+        for row in groups[0].union(*groups[1:], all=True):
+            facet, value = row["value"].split(":", 1)
+            if not value:
+                continue
+            if facet == "year":
+                value = f"{value}-{int(value) + YEAR_FACET_STEP - 1}"
+            facets[facet][value] = row["count"]
+        return facets
+
+
 class Title(models.Model):
     name = models.CharField("Название", max_length=200, db_index=True)
     year = models.IntegerField("Год", validators=(validate_year,))
@@ -113,14 +283,35 @@ class Title(models.Model):
     genre = models.ManyToManyField(
         Genre, related_name="titles", verbose_name="Жанр"
     )
+    rating_sum = models.PositiveIntegerField("Сумма оценок", default=0)
+    review_count = models.PositiveIntegerField("Количество отзывов", default=0)
+    # Заполняется триггером PostgreSQL из названия и описания.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Произведение"
         verbose_name_plural = "Произведения"
+        indexes = [
+            models.Index(
+                fields=("category", "year"), name="title_category_year_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def rating(self):
+        """
+        Рейтинг произведения по сохранённым сумме и количеству оценок.
+        """
+
+        if not self.review_count:
+            return None
+        return self.rating_sum // self.review_count
+
 
 class Review(models.Model):
     title = models.ForeignKey(
@@ -159,11 +350,119 @@ class Review(models.Model):
                 name="unique-review",
             )
         ]
+        indexes = [
+            models.Index(
+                fields=("title", "pub_date"), name="review_title_pub_date_idx"
+            ),
+        ]
         ordering = ("pub_date",)
 
     def __str__(self):
         return self.text
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем загруженные оценку и произведение, чтобы при
+        # обновлении отзыва изменить рейтинг на разницу оценок или
+        # пересчитать оба произведения, если отзыв перенесён.
+        instance._loaded_score = instance.__dict__.get("score")
+        instance._loaded_title_id = instance.__dict__.get("title_id")
+        return instance
+
+
+@receiver(post_save, sender=Title)
+def rebuild_loaded_rating(instance, raw, **kwargs):
+    # В фикстурах (в том числе infra/fixtures.json) рейтинга может
+    # не быть, а отзывы могут загрузиться раньше произведения.
+    if raw:
+        Title.objects.filter(pk=instance.pk).update_ratings()
+
+
+@receiver(post_save, sender=Review)
+def add_review_score(instance, created, raw, **kwargs):
+    titles = Title.objects.filter(pk=instance.title_id)
+    loaded_score = getattr(instance, "_loaded_score", None)
+    loaded_title_id = getattr(instance, "_loaded_title_id", None)
+    if created and not raw:
+        titles.update(
+            rating_sum=F("rating_sum") + instance.score,
+            review_count=F("review_count") + 1,
+        )
+    elif loaded_title_id not in (None, instance.title_id):
+        Title.objects.filter(
+            pk__in=(loaded_title_id, instance.title_id)
+        ).update_ratings()
+    elif raw or loaded_score is None:
+        titles.update_ratings()
+    elif loaded_score != instance.score:
+        titles.update(
+            rating_sum=F("rating_sum") + instance.score - loaded_score
+        )
+    instance._loaded_score = instance.score
+    instance._loaded_title_id = instance.title_id
+
+
+class CascadeDelete(threading.local):
+    """
+    Произведения и авторы, которые удаляются в текущем потоке. Их отзывы
+    удаляются каскадом: рейтинг удаляемого произведения не обновляется,
+    а произведения удаляемых авторов пересчитываются один раз после
+    удаления.
+    """
+
+    def __init__(self):
+        self.titles = set()
+        self.authors = set()
+        self.author_titles = set()
+
+
+cascade = CascadeDelete()
+
+
+@receiver(pre_delete, sender=Title)
+def remember_deleted_title(instance, **kwargs):
+    cascade.titles.add(instance.pk)
+
+
+@receiver(post_delete, sender=Title)
+def forget_deleted_title(instance, **kwargs):
+    cascade.titles.discard(instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def remember_author_titles(instance, **kwargs):
+    cascade.authors.add(instance.pk)
+    cascade.author_titles.update(
+        Review.objects.filter(author=instance)
+        .order_by()
+        .values_list("title_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=User)
+def rebuild_author_titles(instance, **kwargs):
+    cascade.authors.discard(instance.pk)
+    if cascade.authors or not cascade.author_titles:
+        return
+    # Последний из удаляемых вместе авторов.
+    title_ids = cascade.author_titles - cascade.titles
+    cascade.author_titles = set()
+    Title.objects.filter(pk__in=title_ids).update_ratings()
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_score(instance, **kwargs):
+    if (
+        instance.title_id in cascade.titles
+        or instance.author_id in cascade.authors
+    ):
+        return
+    Title.objects.filter(pk=instance.title_id).update(
+        rating_sum=F("rating_sum") - instance.score,
+        review_count=F("review_count") - 1,
+    )
+
 
 class Comment(models.Model):
     review = models.ForeignKey(
@@ -186,6 +485,13 @@ class Comment(models.Model):
     class Meta:
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
+        indexes = [
+            models.Index(
+                fields=("review", "pub_date"),
+                name="comment_review_pub_date_idx",
+            ),
+        ]
+        ordering = ("pub_date",)
 
     def __str__(self):
         return self.text[:20]
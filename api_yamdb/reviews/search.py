@@ -0,0 +1,67 @@
+"""
+Поиск произведений по названию и описанию.
+
+На PostgreSQL используются сохранённый tsvector (поддерживается триггером,
+см. миграцию 0005_title_search) и триграммы pg_trgm. Для остальных СУБД
+здесь же реализовано ранжирование в процессе с той же логикой: все слова
+запроса должны совпасть с началом слов названия или описания, либо
+название должно быть похоже на запрос по триграммам.
+"""
+
+import re
+
+SEARCH_CONFIG = "russian"
+# Порог сходства по умолчанию в pg_trgm (pg_trgm.similarity_threshold).
+TRIGRAM_THRESHOLD = 0.3
+# Веса A и B функции ts_rank: название и описание.
+NAME_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.4
+
+WORD_RE = re.compile(r"\w+")
+
+
+def get_words(text):
+    return WORD_RE.findall(text.lower())
+
+
+def trigrams(text):
+    """
+    Триграммы строки по правилам pg_trgm: каждое слово дополняется двумя
+    пробелами слева и одним справа.
+    """
+
+    result = set()
+    for word in get_words(text):
+        word = f"  {word} "
+        result.update(map("".join, zip(word, word[1:], word[2:])))
+    return result
+
+
+def similarity(first, second):
+    first, second = trigrams(first), trigrams(second)
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+def rank(text, name, description):
+    """
+    Релевантность произведения запросу или 0, если оно не подходит.
+    """
+
+    words = get_words(text)
+    name_words = get_words(name)
+    description_words = get_words(description or "")
+    score = 0.0
+    matched = True
+    for word in words:
+        in_name = any(item.startswith(word) for item in name_words)
+        in_description = any(
+            item.startswith(word) for item in description_words
+        )
+        matched = matched and (in_name or in_description)
+        score += NAME_WEIGHT * in_name + DESCRIPTION_WEIGHT * in_description
+    trigram = similarity(text, name)
+    if not (words and matched) and trigram < TRIGRAM_THRESHOLD:
+        return 0.0
+    return score / max(len(words), 1) + trigram
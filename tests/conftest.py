@@ -1,9 +1,56 @@
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
+    'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings():
+    """Тесты с базой данных запускаются на SQLite в памяти."""
+    from django.conf import settings
+    from django.db import connections
+
+    # Настройки проекта не меняются: тестовая база подменяется только
+    # в обработчике соединений, а уже открытое соединение сбрасывается.
+    connections.databases = {
+        'default': dict(
+            settings.DATABASES['default'],
+            ENGINE='django.db.backends.sqlite3',
+            NAME=':memory:',
+        ),
+    }
+    if hasattr(connections._connections, 'default'):
+        del connections['default']
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Кэш ответов не переживает тест: база между тестами откатывается."""
+    from api.authentication import token_versions, user_cache
+    from django.core.cache import cache
+
+    cache.clear()
+    user_cache.clear()
+    token_versions.clear()
+
+
+@pytest.fixture(autouse=True)
+def metrics_in_memory(settings):
+    """
+    Метрики тестовых запросов не пишутся в общий каталог, счётчики кэша
+    и ограничения частоты начинаются с нуля.
+    """
+    from api.metrics import registry
+
+    settings.METRICS = dict(
+        settings.METRICS, STORE='api.metrics.MemoryStore'
+    )
+    registry.clear()
@@ -0,0 +1,105 @@
+from contextlib import contextmanager
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create(
+        username='TestUser', email='testuser@yamdb.fake'
+    )
+
+
+@pytest.fixture
+def another_user(django_user_model):
+    return django_user_model.objects.create(
+        username='TestUser2', email='testuser2@yamdb.fake'
+    )
+
+
+@pytest.fixture
+def admin(django_user_model):
+    return django_user_model.objects.create(
+        username='TestAdmin', email='testadmin@yamdb.fake', role='admin'
+    )
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def another_user_client(another_user):
+    client = APIClient()
+    client.force_authenticate(another_user)
+    return client
+
+
+@pytest.fixture
+def admin_client(admin):
+    client = APIClient()
+    client.force_authenticate(admin)
+    return client
+
+
+@pytest.fixture
+def title():
+    from reviews.models import Category, Genre, Title
+
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    title = Title.objects.create(name='Тестовое произведение', year=2000,
+                                 category=category)
+    title.genre.add(genre)
+    return title
+
+
+@pytest.fixture
+def assert_num_data_queries():
+    """
+    Проверка числа запросов без учёта управления транзакциями:
+    BEGIN/SAVEPOINT попадают в журнал запросов не на всех СУБД.
+    """
+    service = ('BEGIN', 'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK')
+
+    @contextmanager
+    def assert_num_data_queries(num):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if not query['sql'].upper().startswith(service)
+        ]
+        assert len(queries) == num, (
+            f'Ожидалось {num} запросов, выполнено {len(queries)}:\n'
+            + '\n'.join(queries)
+        )
+
+    return assert_num_data_queries
+
+
+@pytest.fixture
+def assert_no_n_plus_one():
+    """
+    Проверка, что в блоке нет SQL-запросов одного вида, выполненных
+    больше threshold раз (по умолчанию NPLUSONE["THRESHOLD"]).
+    """
+    from api.nplusone import QueryCollector
+
+    @contextmanager
+    def assert_no_n_plus_one(threshold=None):
+        collector = QueryCollector(threshold)
+        with connection.execute_wrapper(collector):
+            yield collector
+        if collector.problems:
+            pytest.fail(
+                'Повторяющиеся SQL-запросы (N+1):\n' + collector.format()
+            )
+
+    return assert_no_n_plus_one
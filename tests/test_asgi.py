@@ -0,0 +1,148 @@
+import asyncio
+import json
+
+import pytest
+from api.asgi import ThreadPoolApplication
+from reviews.models import Category, Genre, Review, Title, User
+
+
+def call(application, path, method='GET', query='', body=b'',
+         disconnect=False, headers=()):
+    scope = {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'root_path': '',
+        'query_string': query.encode(),
+        'headers': [
+            (b'host', b'testserver'),
+            (b'content-type', b'application/json'),
+            *headers,
+        ],
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+    chunks = body if isinstance(body, list) else [body]
+    messages = [
+        {'type': 'http.request', 'body': chunk, 'more_body': True}
+        for chunk in chunks
+    ]
+    messages[-1]['more_body'] = False
+    if disconnect:
+        messages = [{'type': 'http.disconnect'}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    return sent
+
+
+@pytest.mark.django_db(transaction=True)
+class TestThreadPoolApplication:
+
+    @pytest.fixture
+    def application(self):
+        application = ThreadPoolApplication(read_threads=2, write_threads=1)
+        yield application
+        application.read_executor.shutdown()
+        application.write_executor.shutdown()
+
+    @pytest.fixture(autouse=True)
+    def titles(self):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        genre = Genre.objects.create(name='Драма', slug='drama')
+        Category.objects.create(name='Книга', slug='book')
+        author = User.objects.create(username='author', email='a@yamdb.fake')
+        for index in range(3):
+            title = Title.objects.create(
+                name=f'Произведение {index}', year=2000, category=category
+            )
+            title.genre.add(genre)
+            Review.objects.create(
+                title=title, author=author, text='Отзыв', score=5 + index
+            )
+        return title
+
+    @pytest.mark.parametrize('path, query', (
+        ('/api/v1/titles/', ''),
+        ('/api/v1/titles/', 'genre=drama&page=1'),
+        ('/api/v1/categories/', ''),
+        ('/api/v1/genres/', 'search=dr'),
+        ('/api/v1/titles/{title}/reviews/', ''),
+        ('/api/v1/titles/{title}/', ''),
+    ))
+    def test_same_response_as_wsgi(
+        self, application, client, titles, path, query
+    ):
+        path = path.format(title=titles.pk)
+        expected = client.get(f'{path}?{query}')
+
+        start, body = call(application, path, query=query)
+
+        assert start['type'] == 'http.response.start'
+        assert start['status'] == expected.status_code == 200
+        assert (b'content-type', expected['Content-Type'].encode()) in (
+            start['headers']
+        )
+        assert body['body'] == expected.content
+        assert json.loads(body['body'])
+
+    def test_read_paths_use_read_pool(self, application, titles):
+        scope = {'method': 'GET', 'path': '/api/v1/titles/'}
+        assert application.get_executor(scope) is application.read_executor
+        for method, path in (
+            ('POST', '/api/v1/titles/'),
+            ('GET', '/api/v1/users/me/'),
+            ('GET', f'/api/v1/titles/{titles.pk}/'),
+        ):
+            scope = {'method': method, 'path': path}
+            assert application.get_executor(scope) is (
+                application.write_executor
+            )
+
+    def test_write_goes_through_django(self, application):
+        start, body = call(
+            application, '/api/v1/titles/', method='POST',
+            body=json.dumps({'name': 'Новое'}).encode(),
+        )
+        assert start['status'] == 401
+        assert not Title.objects.filter(name='Новое').exists()
+
+    def test_disconnected_client_is_not_handled(self, application):
+        assert call(application, '/api/v1/titles/', disconnect=True) == []
+
+    def test_too_large_body(self, application, settings):
+        settings.DATA_UPLOAD_MAX_MEMORY_SIZE = 10
+        handled = []
+        application.handle = handled.append
+
+        start, body = call(
+            application, '/api/v1/titles/', method='POST',
+            headers=[(b'content-length', b'11')],
+        )
+        assert start['status'] == 413
+        start, body = call(
+            application, '/api/v1/titles/', method='POST',
+            body=[b'123456', b'78901', b'x' * 100],
+        )
+        assert start['status'] == 413, (
+            'Проверьте, что тело без Content-Length тоже ограничено'
+        )
+        assert json.loads(body['body'])['detail']
+        assert handled == []
+
+    def test_body_within_limit(self, application, settings):
+        settings.DATA_UPLOAD_MAX_MEMORY_SIZE = 100
+        start, body = call(
+            application, '/api/v1/titles/', method='POST',
+            body=[b'{"name": ', '"\u041d"}'.encode()],
+            headers=[(b'content-length', b'14')],
+        )
+        assert start['status'] == 401
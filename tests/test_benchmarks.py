@@ -0,0 +1,110 @@
+import pytest
+from api.benchmarks import (WORKLOADS, LocalClient, compare, get_dataset,
+                            get_path_values, percentile, run_endpoints,
+                            run_workload, seed_dataset)
+from reviews.models import Comment, Genre, Review, Title, User
+
+
+def result(time=10.0, rps=100.0, queries=3):
+    return {'endpoints': {
+        'titles p95': (time, 'ms'),
+        'titles rps': (rps, '/s'),
+        'titles SQL': (queries, 'queries'),
+    }}
+
+
+class TestCompare:
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([7], 95) == 7
+
+    def test_no_regression_within_threshold(self):
+        assert compare(result(time=12, rps=80), result(), 25) == []
+
+    @pytest.mark.parametrize('current', (
+        result(time=13), result(rps=70), result(queries=4),
+    ))
+    def test_regression(self, current):
+        regressions = compare(current, result(), 25)
+        assert len(regressions) == 1
+        assert regressions[0].startswith('endpoints, titles ')
+
+    def test_saved_baseline(self):
+        # Базовая линия читается из JSON: пары становятся списками.
+        baseline = {'endpoints': {
+            label: list(value)
+            for label, value in result()['endpoints'].items()
+        }}
+        assert len(compare(result(time=13), baseline, 25)) == 1
+
+    def test_new_measurement_is_not_compared(self):
+        assert compare({'search': {'search': (100.0, 'ms')}}, {}, 25) == []
+        assert compare(result(time=100), {'endpoints': {}}, 25) == []
+
+    def test_dataset_scales_with_size(self):
+        assert get_dataset()['reviews'] == 5000
+        assert get_dataset(100) == {
+            'users': 20, 'categories': 1, 'genres': 2, 'titles': 100,
+            'reviews': 500, 'comments': 1000,
+        }
+        assert get_dataset(10)['reviews'] == 20
+
+
+@pytest.mark.django_db
+class TestEndpoints:
+
+    @pytest.fixture(autouse=True)
+    def dataset(self, settings):
+        # Как в команде benchmark: замеряются ответы без кэша.
+        settings.API_CACHE = dict(settings.API_CACHE, ENABLED=False)
+        seed_dataset(
+            users=5, categories=2, genres=3, titles=10, reviews=20,
+            comments=30,
+        )
+
+    def test_seed_dataset(self):
+        assert User.objects.count() == 6
+        assert Genre.objects.count() == 3
+        assert Title.objects.count() == 10
+        assert Review.objects.count() == 20
+        assert Comment.objects.count() == 30
+        assert not Title.objects.filter(review_count=0).exists()
+
+    def test_too_many_reviews(self):
+        with pytest.raises(ValueError):
+            seed_dataset(
+                users=1, categories=1, genres=1, titles=1, reviews=2,
+                comments=0,
+            )
+
+    def test_all_workloads_run(self):
+        client = LocalClient()
+        admin_client = LocalClient.for_admin()
+        values = get_path_values(client)
+        assert set(values) == {'title', 'year', 'genre', 'review'}
+        for name, (method, path, data) in WORKLOADS.items():
+            workload_client = admin_client if name in (
+                'users', 'me', 'comment create'
+            ) else client
+            stats = run_workload(
+                workload_client, method, path.format(**values), data, 3
+            )
+            assert stats['requests'] == 3
+            assert stats['queries'] > 0
+            assert stats['p50'] <= stats['p95'] <= stats['p99']
+
+    def test_titles_list_queries(self):
+        method, path, data = WORKLOADS['titles']
+        assert run_workload(LocalClient(), method, path, data, 1)[
+            'queries'
+        ] == 4
+
+    def test_run_endpoints(self):
+        results = run_endpoints(LocalClient(), None, 2)
+        assert 'titles p95' in results
+        assert results['titles SQL'] == (4, 'queries')
+        assert results['genres rps'][1] == '/s'
+        assert 'users p95' not in results
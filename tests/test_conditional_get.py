@@ -0,0 +1,99 @@
+import pytest
+from api.cache import bump_all
+from django.core.management import call_command
+from django.utils.http import http_date
+from reviews.models import Review, Title
+
+
+# Версии ресурсов увеличиваются при фиксации транзакции (on_commit).
+@pytest.mark.django_db(transaction=True)
+class TestConditionalGet:
+
+    @pytest.fixture
+    def review(self, title, user):
+        return Review.objects.create(title=title, author=user, text='Отзыв',
+                                     score=5)
+
+    def test_etag_short_circuits_to_304(self, client, title,
+                                        django_assert_num_queries):
+        url = f'/api/v1/titles/{title.id}/'
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response['ETag'] and response['Last-Modified'], (
+            'Проверьте, что ответ содержит ETag и Last-Modified'
+        )
+
+        # Только запрос версий ресурсов.
+        with django_assert_num_queries(1):
+            response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == 304
+        assert not response.content
+
+    def test_etag_changes_after_write(self, client, user_client, title,
+                                      review):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        etag = client.get(url)['ETag']
+
+        user_client.patch(f'{url}{review.id}/', data={'text': 'Новый'})
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что изменение отзыва меняет ETag списка отзывов'
+        )
+        assert response['ETag'] != etag
+        assert response.json()['results'][0]['text'] == 'Новый'
+
+    def test_comments_if_modified_since(self, client, user_client, title,
+                                        review):
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+        last_modified = client.get(url)['Last-Modified']
+
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 304
+
+        user_client.post(url, data={'text': 'Комментарий'})
+        response = client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date(0)
+        )
+        assert response.status_code == 200
+        assert response.json()['count'] == 1
+
+    def test_etag_changes_after_write_outside_api(self, client, title):
+        # Запись в другом процессе или через админку: кэш процесса
+        # ни при чём, версии меняют сигналы моделей.
+        url = f'/api/v1/titles/{title.id}/'
+        etag = client.get(url)['ETag']
+
+        title.name = 'Новое название'
+        title.save()
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.json()['name'] == 'Новое название'
+
+    def test_etag_changes_after_commands(self, client, title, review):
+        url = f'/api/v1/titles/{title.id}/'
+        etag = client.get(url)['ETag']
+
+        Title.objects.update(rating_sum=0, review_count=0)
+        call_command('rebuild_ratings')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.json()['rating'] == 5
+
+        etag = response['ETag']
+        bump_all()
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_any_etag_requires_existing_object(self, client, title):
+        response = client.get(f'/api/v1/titles/{title.id}/',
+                              HTTP_IF_NONE_MATCH='*')
+        assert response.status_code == 304
+        response = client.get('/api/v1/titles/999/', HTTP_IF_NONE_MATCH='*')
+        assert response.status_code == 404, (
+            'Проверьте, что If-None-Match: * не даёт 304 для '
+            'несуществующего объекта'
+        )
+        response = client.get('/api/v1/titles/999/reviews/',
+                              HTTP_IF_NONE_MATCH='*')
+        assert response.status_code == 404
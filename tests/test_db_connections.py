@@ -0,0 +1,39 @@
+import pytest
+from api.connections import HEALTH_CHECK_IDLE, check_connections, mark_idle
+from django.db import connection
+
+
+@pytest.mark.django_db
+class TestConnectionHealthChecks:
+
+    @pytest.fixture(autouse=True)
+    def closed(self, monkeypatch):
+        # SQLite в памяти не закрывает соединение, поэтому закрытие
+        # только отмечается. Обработчики сигналов вызываются напрямую:
+        # Django сам закрывает соединение внутри транзакции теста.
+        closed = []
+        monkeypatch.setitem(
+            connection.settings_dict, 'CONN_HEALTH_CHECKS', True
+        )
+        monkeypatch.setattr(connection, 'close', lambda: closed.append(1))
+        connection.ensure_connection()
+        mark_idle()
+        yield closed
+        del connection.idle_since
+
+    def start_request(self, monkeypatch, idle, usable):
+        connection.idle_since -= idle
+        monkeypatch.setattr(connection, 'is_usable', lambda: usable)
+        check_connections()
+
+    def test_broken_idle_connection_is_closed(self, monkeypatch, closed):
+        self.start_request(monkeypatch, HEALTH_CHECK_IDLE + 1, usable=False)
+        assert closed
+
+    def test_usable_connection_is_kept(self, monkeypatch, closed):
+        self.start_request(monkeypatch, HEALTH_CHECK_IDLE + 1, usable=True)
+        assert not closed
+
+    def test_recent_connection_is_not_checked(self, monkeypatch, closed):
+        self.start_request(monkeypatch, 0, usable=False)
+        assert not closed
@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+import pytest
+from api.models import OutgoingEmail
+from api.outbox import queue_email
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+
+
+class CountingBackend(EmailBackend):
+    opened = 0
+
+    def open(self):
+        type(self).opened += 1
+        return super().open()
+
+
+class FailingBackend(EmailBackend):
+    def send_messages(self, messages):
+        if any('fail' in message.to[0] for message in messages):
+            raise ConnectionError('Сервер недоступен')
+        return super().send_messages(messages)
+
+
+@pytest.mark.django_db
+class TestEmailOutbox:
+
+    def test_signup_queues_email(self, client):
+        response = client.post('/api/v1/auth/signup/', data={
+            'username': 'newbie', 'email': 'newbie@yamdb.fake'
+        })
+
+        assert response.status_code == 200
+        assert len(mail.outbox) == 0, (
+            'Проверьте, что регистрация не отправляет письмо в запросе'
+        )
+        email = OutgoingEmail.objects.get()
+        assert email.recipients == 'newbie@yamdb.fake'
+        assert email.status == OutgoingEmail.PENDING
+
+        call_command('send_emails', '--once')
+
+        assert len(mail.outbox) == 1
+        assert mail.outbox[0].to == ['newbie@yamdb.fake']
+        assert 'Код доступа к API' in mail.outbox[0].body
+        email.refresh_from_db()
+        assert email.status == OutgoingEmail.SENT
+
+    def test_batch_uses_one_connection(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_email_outbox.CountingBackend'
+        CountingBackend.opened = 0
+        for i in range(5):
+            queue_email('Тема', 'Текст', 'from@yamdb.fake',
+                        [f'user{i}@yamdb.fake'])
+
+        call_command('send_emails', '--once', '--batch-size', '10')
+
+        assert len(mail.outbox) == 5
+        assert CountingBackend.opened == 1
+
+    def test_failed_email_is_retried_with_backoff(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_email_outbox.FailingBackend'
+        settings.EMAIL_OUTBOX = dict(settings.EMAIL_OUTBOX, MAX_ATTEMPTS=2)
+        queue_email('Тема', 'Текст', 'from@yamdb.fake', ['ok@yamdb.fake'])
+        failing = queue_email(
+            'Тема', 'Текст', 'from@yamdb.fake', ['fail@yamdb.fake']
+        )
+
+        call_command('send_emails', '--once')
+
+        assert [message.to for message in mail.outbox] == [['ok@yamdb.fake']]
+        failing.refresh_from_db()
+        assert failing.status == OutgoingEmail.PENDING
+        assert failing.attempts == 1
+        assert 'Сервер недоступен' in failing.last_error
+        delay = failing.next_attempt - timezone.now()
+        assert timedelta(seconds=50) < delay <= timedelta(seconds=60)
+
+        call_command('send_emails', '--once')
+        failing.refresh_from_db()
+        assert failing.attempts == 1, (
+            'Проверьте, что письмо не отправляется раньше следующей попытки'
+        )
+
+        OutgoingEmail.objects.update(next_attempt=timezone.now())
+        call_command('send_emails', '--once')
+        failing.refresh_from_db()
+        assert failing.attempts == 2
+        assert failing.status == OutgoingEmail.FAILED
@@ -0,0 +1,71 @@
+import gzip
+import json
+import os
+
+import pytest
+from django.core.management import call_command
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+from .conftest import root_dir
+
+data_dir = os.path.join(root_dir, 'tests', 'data')
+
+
+@pytest.mark.django_db
+class TestExportData:
+
+    @pytest.fixture(autouse=True)
+    def imported(self):
+        call_command('import_data', '--path', data_dir)
+
+    def test_csv_round_trip(self, tmp_path):
+        call_command(
+            'export_data', '--path', tmp_path, '--chunk-size', '1'
+        )
+        assert not (tmp_path / 'users.csv').exists(), (
+            'Проверьте, что пользователи не выгружаются без явного запроса'
+        )
+        call_command('export_data', 'users.csv', '--path', tmp_path)
+
+        header = (tmp_path / 'titles.csv').read_text(
+            encoding='utf-8'
+        ).splitlines()[0]
+        assert header == (
+            'id,name,year,category,description,rating_sum,review_count'
+        )
+        assert 'password' not in (tmp_path / 'users.csv').read_text(
+            encoding='utf-8'
+        )
+
+        expected = {
+            model: list(model.objects.order_by('pk').values())
+            for model in (Category, Genre, Title, Review, Comment)
+        }
+        expected_genres = list(
+            Title.genre.through.objects.order_by('pk').values()
+        )
+        for model in (Comment, Review, Title, Genre, Category, User):
+            model.objects.all().delete()
+
+        call_command('import_data', '--path', tmp_path)
+
+        for model, rows in expected.items():
+            assert list(model.objects.order_by('pk').values()) == rows, (
+                f'Проверьте выгрузку {model.__name__} в раскладке import_data'
+            )
+        assert list(
+            Title.genre.through.objects.order_by('pk').values()
+        ) == expected_genres
+
+    def test_jsonl_gzip(self, tmp_path):
+        call_command(
+            'export_data', 'review.csv', '--path', tmp_path,
+            '--format', 'jsonl', '--gzip',
+        )
+
+        with gzip.open(tmp_path / 'review.jsonl.gz', 'rt') as file:
+            rows = [json.loads(line) for line in file]
+        assert [row['id'] for row in rows] == [1, 2]
+        assert rows[0]['author'] == 100
+        assert rows[0]['text'] == "Ещё один отзыв, с запятой и 'кавычками'"
+        assert rows[0]['pub_date'] == '2019-09-24T21:08:21.567Z'
@@ -0,0 +1,172 @@
+import time
+
+import pytest
+from api.authentication import ProcessCache, user_cache
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from reviews.models import User
+
+
+def get_client(user):
+    response = APIClient().post('/api/v1/auth/token/', data={
+        'username': user.username,
+        'confirmation_code': user.confirmation_code,
+    })
+    assert response.status_code == 201
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["token"]}')
+    return client
+
+
+@pytest.mark.django_db
+class TestClaimsAuthentication:
+
+    def test_token_claims(self, client, user):
+        response = client.post('/api/v1/auth/token/', data={
+            'username': user.username,
+            'confirmation_code': user.confirmation_code,
+        })
+        token = AccessToken(response.json()['token'])
+
+        assert token['username'] == user.username
+        assert token['role'] == 'user'
+        assert token['ver'] == 0
+
+    def test_no_queries_for_auth(self, admin, django_assert_num_queries):
+        client = get_client(admin)
+
+        with django_assert_num_queries(0):
+            response = client.get('/api/v1/cache/stats/')
+        assert response.status_code == 200, (
+            'Проверьте, что роль администратора берётся из токена без '
+            'обращения к базе'
+        )
+
+    def test_role_change_revokes_token(self, user, admin_client):
+        client = get_client(user)
+        assert client.get('/api/v1/users/me/').status_code == 200
+
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'role': 'moderator'}
+        )
+        assert response.status_code == 200
+
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code == 401
+        assert response.json()['detail'] == 'Токен отозван, получите новый!'
+        assert get_client(user).get('/api/v1/users/me/').json()['role'] == (
+            'moderator'
+        )
+
+    def test_profile_change_keeps_token(self, user):
+        client = get_client(user)
+
+        response = client.patch('/api/v1/users/me/', data={'bio': 'Новое'})
+        assert response.status_code == 200
+
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code == 200
+        assert response.json()['bio'] == 'Новое', (
+            'Проверьте, что изменение пользователя сбрасывает его кэш'
+        )
+
+    def test_deleted_user_token_is_rejected(self, user):
+        client = get_client(user)
+        user.delete()
+
+        assert client.get('/api/v1/titles/').status_code == 401
+
+    def test_revocation_in_another_process(self, user, settings,
+                                           monkeypatch):
+        client = get_client(user)
+        assert client.get('/api/v1/titles/').status_code == 200
+
+        # Другой воркер понизил роль: сигналы этого процесса не сработали.
+        User.objects.filter(pk=user.pk).update(token_version=1)
+        assert client.get('/api/v1/titles/').status_code == 200
+
+        now = time.monotonic()
+        monkeypatch.setattr(
+            time, 'monotonic',
+            lambda: now + settings.API_AUTH['TOKEN_VERSION_TTL'] + 1,
+        )
+        assert client.get('/api/v1/titles/').status_code == 401, (
+            'Проверьте, что версия токенов перечитывается из базы по '
+            'истечении TOKEN_VERSION_TTL'
+        )
+
+    def test_write_as_token_user(self, user, title,
+                                 django_assert_num_queries):
+        client = get_client(user)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response = client.post(url, data={'text': 'Отзыв', 'score': 7})
+        assert response.status_code == 201
+        assert response.json()['author'] == user.username
+
+        review_url = f'{url}{response.json()["id"]}/'
+        response = client.patch(review_url, data={'text': 'Изменено'})
+        assert response.status_code == 200, (
+            'Проверьте, что автор определяется по идентификатору из токена'
+        )
+
+    def test_legacy_token(self, admin):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(admin)}'
+        )
+
+        assert client.get('/api/v1/cache/stats/').status_code == 200
+
+
+class LoadCounter(ProcessCache):
+    ttl_setting = 'USER_CACHE_TTL'
+
+    def __init__(self):
+        super().__init__()
+        self.loaded = []
+
+    def load(self, user_id):
+        self.loaded.append(user_id)
+        return user_id * 10
+
+
+class TestProcessCache:
+
+    def test_size_limit(self, settings):
+        settings.API_AUTH = dict(settings.API_AUTH, CACHE_SIZE=2)
+        cache = LoadCounter()
+        cache.get(1)
+        cache.get(2)
+        cache.get(1)
+        cache.get(3)
+
+        assert list(cache.values) == [1, 3], (
+            'Проверьте, что вытесняется давно не запрошенное значение'
+        )
+        assert cache.get(1) == 10
+        assert cache.loaded == [1, 2, 3]
+
+    def test_expired_values_are_dropped(self, settings, monkeypatch):
+        cache = LoadCounter()
+        cache.get(1)
+        cache.get(2)
+
+        now = time.monotonic()
+        monkeypatch.setattr(
+            time, 'monotonic',
+            lambda: now + settings.API_AUTH['USER_CACHE_TTL'] + 1,
+        )
+        cache.get(3)
+        assert list(cache.values) == [3]
+
+    @pytest.mark.django_db
+    def test_user_copies_are_independent(self, user):
+        first = user_cache.get(user.pk)
+        first._state.fields_cache['marker'] = object()
+        first.bio = 'Изменено'
+
+        second = user_cache.get(user.pk)
+        assert second.bio == user.bio
+        assert 'marker' not in second._state.fields_cache, (
+            'Проверьте, что запросы не делят _state пользователя из кэша'
+        )
@@ -0,0 +1,60 @@
+import pytest
+from rest_framework.pagination import PageNumberPagination
+from reviews.models import Review
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+
+    @pytest.fixture
+    def reviews(self, title, django_user_model, monkeypatch):
+        monkeypatch.setattr(
+            'api.pagination.KeysetPagination.page_size', 3
+        )
+        users = [
+            django_user_model.objects.create(username=f'user{i}',
+                                             email=f'user{i}@yamdb.fake')
+            for i in range(8)
+        ]
+        return [
+            Review.objects.create(title=title, author=user, text=str(i),
+                                  score=5)
+            for i, user in enumerate(users)
+        ]
+
+    def test_walk_forward_and_back(self, client, title, reviews):
+        url = f'/api/v1/titles/{title.id}/reviews/?cursor='
+        pages = []
+        while url:
+            data = client.get(url).json()
+            assert 'count' not in data, (
+                'Проверьте, что keyset-пагинация не считает общее число '
+                'объектов'
+            )
+            pages.append([review['id'] for review in data['results']])
+            previous, url = data['previous'], data['next']
+
+        assert pages == [
+            [review.id for review in reviews[i:i + 3]] for i in (0, 3, 6)
+        ]
+        data = client.get(previous).json()
+        assert [review['id'] for review in data['results']] == pages[1]
+        assert data['previous'] is not None
+
+    def test_no_count_query(self, client, title, reviews,
+                            django_assert_num_queries):
+        # Версии ресурсов, произведение и страница отзывов, без COUNT(*).
+        with django_assert_num_queries(3):
+            client.get(f'/api/v1/titles/{title.id}/reviews/?cursor=')
+
+    def test_page_number_mode_is_default(self, client, title, reviews):
+        data = client.get(f'/api/v1/titles/{title.id}/reviews/').json()
+        assert data['count'] == len(reviews)
+        assert len(data['results']) == min(PageNumberPagination.page_size,
+                                           len(reviews))
+
+    def test_invalid_cursor(self, client, title, reviews):
+        response = client.get(
+            f'/api/v1/titles/{title.id}/reviews/?cursor=broken'
+        )
+        assert response.status_code == 404
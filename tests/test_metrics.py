@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+
+import pytest
+from api import cache, throttling
+from api.metrics import (CACHE, REQUESTS, THROTTLE, FileStore, Registry,
+                         flush, merge, registry, render)
+
+
+@pytest.fixture
+def metrics(settings):
+    settings.METRICS = dict(settings.METRICS, SAMPLE_RATE=1, TOKEN='secret')
+    registry.clear()
+    yield settings.METRICS
+    registry.clear()
+
+
+def get_metrics(client):
+    response = client.get(
+        '/api/v1/metrics/', HTTP_AUTHORIZATION='Metrics secret'
+    )
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain')
+    return response.content.decode()
+
+
+@pytest.mark.django_db
+class TestMetricsMiddleware:
+
+    def test_view_action_histograms(self, client, title, metrics):
+        client.get('/api/v1/titles/')
+        client.get(f'/api/v1/titles/{title.pk}/')
+        client.get('/api/v1/titles/404/')
+
+        text = get_metrics(client)
+        labels = 'view="TitleViewSet",action="list"'
+        assert f'api_requests_total{{{labels},status="2xx"}} 1' in text
+        assert (
+            'api_requests_total{view="TitleViewSet",action="retrieve",'
+            'status="4xx"} 1'
+        ) in text
+        assert f'api_db_queries_count{{{labels}}} 1' in text
+        assert f'api_db_queries_sum{{{labels}}} 4' in text
+        assert f'api_db_queries_bucket{{{labels},le="3"}} 0' in text
+        assert f'api_db_queries_bucket{{{labels},le="5"}} 1' in text
+        assert (
+            f'api_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1'
+        ) in text
+        assert f'api_response_size_bytes_count{{{labels}}} 1' in text
+        assert 'api_response_cache_total{view="titles",result="misses"}' in (
+            text
+        )
+
+    def test_sampling(self, client, metrics):
+        metrics['SAMPLE_RATE'] = 0
+        client.get('/api/v1/genres/')
+
+        text = get_metrics(client)
+        assert (
+            'api_requests_total{view="GenreViewSet",action="list",'
+            'status="2xx"} 1'
+        ) in text
+        assert 'api_db_queries_count{view="GenreViewSet"' not in text
+
+    def test_disabled(self, client, metrics):
+        metrics['ENABLED'] = False
+        client.get('/api/v1/genres/')
+        assert 'GenreViewSet' not in get_metrics(client)
+
+    def test_store_error_does_not_fail_request(
+        self, client, metrics, monkeypatch
+    ):
+        def save(self, snapshot):
+            raise OSError('Нет места на диске')
+
+        monkeypatch.setattr('api.metrics.MemoryStore.save', save)
+        metrics['FLUSH_INTERVAL'] = 0
+        assert client.get('/api/v1/genres/').status_code == 200
+
+    def test_access(self, client, user_client, admin_client, metrics):
+        url = '/api/v1/metrics/'
+        assert client.get(url).status_code == 401
+        assert client.get(
+            url, HTTP_AUTHORIZATION='Metrics wrong'
+        ).status_code == 401
+        assert user_client.get(url).status_code == 403
+        assert admin_client.get(url).status_code == 200
+
+
+class TestFileStore:
+
+    def test_merges_worker_files(self, settings, tmp_path):
+        settings.METRICS = dict(settings.METRICS, DIR=str(tmp_path))
+        worker = Registry()
+        worker.count((REQUESTS, 'TitleViewSet', 'list', '2xx'))
+        worker.observe('TitleViewSet', 'list', {'api_db_queries': 3})
+        for pid in (1, 2):
+            (tmp_path / f'{pid}.json').write_text(
+                json.dumps(worker.snapshot())
+            )
+        store = FileStore()
+
+        counters, histograms = merge(store.load())
+        assert counters[(REQUESTS, 'TitleViewSet', 'list', '2xx')] >= 2
+        histogram = histograms[('api_db_queries', 'TitleViewSet', 'list')]
+        assert histogram[-1] >= 6
+
+        store.save(registry.snapshot())
+        assert (tmp_path / f'{os.getpid()}.json').exists()
+        store.clear()
+        assert not list(tmp_path.iterdir())
+
+    def test_collects_exited_workers(self, settings, tmp_path):
+        settings.METRICS = dict(settings.METRICS, DIR=str(tmp_path))
+        worker = Registry()
+        worker.count((REQUESTS, 'TitleViewSet', 'list', '2xx'))
+        worker.observe('TitleViewSet', 'list', {'api_db_queries': 3})
+        store = FileStore()
+        for pid in (1, 2, 1):
+            # Третий воркер получил pid завершившегося первого.
+            (tmp_path / f'{pid}.json').write_text(
+                json.dumps(worker.snapshot())
+            )
+            store.collect(pid)
+
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            FileStore.TOTAL
+        ]
+        counters, histograms = merge(store.load())
+        assert counters[(REQUESTS, 'TitleViewSet', 'list', '2xx')] == 3, (
+            'Проверьте, что метрики завершившихся воркеров суммируются'
+        )
+        histogram = histograms[('api_db_queries', 'TitleViewSet', 'list')]
+        assert histogram[-1] == 9
+        store.collect(3)
+
+    def test_stats_of_other_workers(self, settings, tmp_path):
+        settings.METRICS = dict(
+            settings.METRICS,
+            DIR=str(tmp_path),
+            STORE='api.metrics.FileStore',
+        )
+        cache.CACHED_VIEWS.add('genres')
+        worker = Registry()
+        worker.count((CACHE, 'genres', 'hits'))
+        worker.count((THROTTLE, 'token_ip', 'throttled'))
+        (tmp_path / '1.json').write_text(json.dumps(worker.snapshot()))
+
+        assert cache.get_stats()['genres'] == {'hits': 1, 'misses': 0}
+        assert throttling.get_stats()['token_ip'] == {
+            'allowed': 0, 'throttled': 1
+        }
+        assert 'api_response_cache_total{view="genres",result="hits"} 1' in (
+            render()
+        )
+
+    def test_concurrent_flush(self, settings, tmp_path):
+        settings.METRICS = dict(
+            settings.METRICS,
+            DIR=str(tmp_path),
+            STORE='api.metrics.FileStore',
+        )
+        registry.count((REQUESTS, 'TitleViewSet', 'list', '2xx'))
+        errors = []
+
+        def run():
+            for _ in range(300):
+                try:
+                    flush(force=True)
+                except OSError as error:
+                    errors.append(error)
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == [], (
+            'Проверьте, что потоки одного воркера сохраняют метрики '
+            'без конфликтов'
+        )
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            f'{os.getpid()}.json'
+        ]
+        assert json.loads(
+            (tmp_path / f'{os.getpid()}.json').read_text()
+        ) == registry.snapshot()
@@ -0,0 +1,116 @@
+import pytest
+from reviews.models import Comment, Review
+
+
+@pytest.mark.django_db(transaction=True)
+class TestNestedResources:
+    # Каждая операция находит свои объекты одним SELECT и выполняет одну
+    # запись, затем одним запросом увеличивает версии ресурсов.
+    # Изменение оценки дополнительно обновляет сохранённый рейтинг
+    # произведения, удаление отзыва — каскадно удаляет его комментарии.
+    MUTATION_QUERIES = 2
+    VERSION_QUERIES = 1
+    RATING_QUERIES = 1
+    CASCADE_QUERIES = 1
+
+    @pytest.fixture
+    def review(self, title, user):
+        return Review.objects.create(title=title, author=user, text='Отзыв',
+                                     score=5)
+
+    @pytest.fixture
+    def comment(self, review, user):
+        return Comment.objects.create(review=review, author=user,
+                                      text='Комментарий')
+
+    def test_review_mutations_queries(self, user_client, another_user_client,
+                                      title, review,
+                                      assert_num_data_queries):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+
+        with assert_num_data_queries(
+            self.MUTATION_QUERIES + self.VERSION_QUERIES
+            + self.RATING_QUERIES
+        ):
+            response = another_user_client.post(
+                url, data={'text': 'Второй отзыв', 'score': 7}
+            )
+        assert response.status_code == 201
+
+        with assert_num_data_queries(
+            self.MUTATION_QUERIES + self.VERSION_QUERIES
+        ):
+            response = user_client.patch(f'{url}{review.id}/',
+                                         data={'text': 'Новый текст'})
+        assert response.status_code == 200
+        assert response.json()['title'] == title.name
+        assert response.json()['author'] == review.author.username
+
+        with assert_num_data_queries(
+            self.MUTATION_QUERIES + self.VERSION_QUERIES
+            + self.RATING_QUERIES
+            + self.CASCADE_QUERIES
+        ):
+            response = user_client.delete(f'{url}{review.id}/')
+        assert response.status_code == 204
+
+    def test_comment_mutations_queries(self, user_client, title, review,
+                                       comment, assert_num_data_queries):
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+
+        with assert_num_data_queries(
+            self.MUTATION_QUERIES + self.VERSION_QUERIES
+        ):
+            response = user_client.post(url, data={'text': 'Ещё один'})
+        assert response.status_code == 201
+
+        with assert_num_data_queries(
+            self.MUTATION_QUERIES + self.VERSION_QUERIES
+        ):
+            response = user_client.patch(f'{url}{comment.id}/',
+                                         data={'text': 'Новый текст'})
+        assert response.status_code == 200
+        assert response.json()['review'] == review.text
+
+        with assert_num_data_queries(
+            self.MUTATION_QUERIES + self.VERSION_QUERIES
+        ):
+            response = user_client.delete(f'{url}{comment.id}/')
+        assert response.status_code == 204
+
+    def test_foreign_objects_are_not_editable(self, another_user_client,
+                                              title, review, comment):
+        review_url = f'/api/v1/titles/{title.id}/reviews/{review.id}/'
+        comment_url = f'{review_url}comments/{comment.id}/'
+
+        response = another_user_client.patch(review_url, data={'score': 1})
+        assert response.status_code == 403
+        response = another_user_client.delete(comment_url)
+        assert response.status_code == 403
+
+    def test_duplicate_review(self, user_client, title, review):
+        response = user_client.post(
+            f'/api/v1/titles/{title.id}/reviews/',
+            data={'text': 'Повтор', 'score': 3},
+        )
+        assert response.status_code == 400, (
+            'Проверьте, что нельзя оставить второй отзыв на произведение'
+        )
+
+    @pytest.mark.parametrize('path, detail', (
+        ('/api/v1/titles/0/reviews/', 'Не найдено произведение!'),
+        ('/api/v1/titles/{title}/reviews/0/', 'Не найден отзыв!'),
+        ('/api/v1/titles/0/reviews/{review}/comments/',
+         'Не найдено произведение!'),
+        ('/api/v1/titles/{title}/reviews/{review}/comments/0/',
+         'Не найден комментарий!'),
+    ))
+    def test_not_found(self, user_client, title, review, comment, path,
+                       detail):
+        response = user_client.get(
+            path.format(title=title.id, review=review.id)
+        )
+        assert response.status_code == 404
+        assert response.json()['detail'] == detail, (
+            'Проверьте, что 404 сообщает, какой из объектов не найден'
+        )
@@ -0,0 +1,105 @@
+import logging
+
+import pytest
+from api.nplusone import QueryCollector, normalize
+from api.serializers import TitleUserSerializer
+from api.views import TitleViewSet
+from django.db import connection
+from reviews.models import Comment, Review, Title
+
+
+class TestNormalize:
+
+    @pytest.mark.parametrize('first, second', (
+        (
+            'SELECT * FROM "t" WHERE "t"."id" = %s',
+            'SELECT  *  FROM "t"\nWHERE "t"."id" = %s',
+        ),
+        (
+            'SELECT * FROM "t" WHERE "t"."id" IN (%s, %s)',
+            'SELECT * FROM "t" WHERE "t"."id" IN (%s, %s, %s, %s)',
+        ),
+        (
+            "SELECT * FROM \"t\" WHERE \"name\" = 'a' AND \"year\" = 1",
+            "SELECT * FROM \"t\" WHERE \"name\" = 'it''s' AND \"year\" = 20",
+        ),
+    ))
+    def test_same_shape(self, first, second):
+        assert normalize(first) == normalize(second)
+
+    def test_different_tables(self):
+        assert normalize('SELECT * FROM "t1"') != normalize(
+            'SELECT * FROM "t2"'
+        )
+
+
+@pytest.mark.django_db
+class TestNPlusOne:
+
+    @pytest.fixture(autouse=True)
+    def titles(self, title, user):
+        for index in range(5):
+            copy = Title.objects.create(
+                name=f'Произведение {index}', year=2000,
+                category=title.category,
+            )
+            copy.genre.set(title.genre.all())
+        review = Review.objects.create(
+            title=title, author=user, text='Отзыв', score=5
+        )
+        for index in range(5):
+            Comment.objects.create(
+                review=review, author=user, text=f'Комментарий {index}'
+            )
+        return title, review
+
+    def test_list_endpoints(self, client, titles, assert_no_n_plus_one):
+        title, review = titles
+        for url in (
+            '/api/v1/titles/',
+            f'/api/v1/titles/{title.pk}/reviews/',
+            f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/',
+            '/api/v1/categories/',
+            '/api/v1/genres/',
+        ):
+            with assert_no_n_plus_one():
+                assert client.get(url).status_code == 200
+
+    def test_detects_missing_prefetch(self, client, monkeypatch):
+        monkeypatch.setattr(
+            TitleViewSet, 'get_queryset', lambda self: Title.objects.all()
+        )
+        monkeypatch.setattr(
+            TitleViewSet, 'get_serializer_class',
+            lambda self: TitleUserSerializer,
+        )
+        collector = QueryCollector(threshold=3)
+        with connection.execute_wrapper(collector):
+            client.get('/api/v1/titles/')
+
+        fields = {problem['field'] for problem in collector.get_problems()}
+        assert fields == {
+            'TitleUserSerializer.category', 'TitleUserSerializer.genre'
+        }
+        for problem in collector.get_problems():
+            assert problem['count'] == 6
+            assert problem['stack'][-1].startswith('api/mixins.py:')
+
+    def test_middleware_logs(self, client, settings, monkeypatch, caplog):
+        settings.NPLUSONE = dict(settings.NPLUSONE, ENABLED=True)
+        monkeypatch.setattr(
+            TitleViewSet, 'get_queryset', lambda self: Title.objects.all()
+        )
+        with caplog.at_level(logging.WARNING, logger='api.nplusone'):
+            client.get('/api/v1/titles/')
+
+        assert 'TitleViewSet.list' in caplog.text
+        assert 'поле: TitleReadSerializer' in caplog.text
+
+    def test_middleware_is_opt_in(self, client, monkeypatch, caplog):
+        monkeypatch.setattr(
+            TitleViewSet, 'get_queryset', lambda self: Title.objects.all()
+        )
+        with caplog.at_level(logging.WARNING, logger='api.nplusone'):
+            client.get('/api/v1/titles/')
+        assert not caplog.text
@@ -0,0 +1,109 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+
+def explain(sql):
+    """
+    Строки плана запроса, в которых таблица читается целиком.
+    """
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # На маленькой тестовой базе полный просмотр дешевле индекса:
+            # запрещаем его, и он останется в плане, только если
+            # подходящего индекса нет.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            nodes = [plan[0]['Plan']]
+            scans = []
+            while nodes:
+                node = nodes.pop()
+                if node['Node Type'] == 'Seq Scan':
+                    scans.append(f"Seq Scan on {node['Relation Name']}")
+                nodes.extend(node.get('Plans', ()))
+            return scans
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [
+            row[-1] for row in cursor.fetchall()
+            if row[-1].startswith('SCAN') and 'CONSTANT ROW' not in row[-1]
+        ]
+
+
+@pytest.mark.django_db
+class TestQueryPlans:
+    """
+    Основные запросы эндпоинтов используют индексы. Полный список
+    произведений без фильтров не проверяется: он читает всю таблицу.
+    """
+
+    @pytest.fixture(autouse=True)
+    def seed(self):
+        categories = [
+            Category.objects.create(
+                name=f'Категория {i}', slug=f'category-{i}'
+            )
+            for i in range(5)
+        ]
+        genres = [
+            Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+            for i in range(5)
+        ]
+        users = [
+            User.objects.create(
+                username=f'user{i}', email=f'user{i}@yamdb.fake'
+            )
+            for i in range(3)
+        ]
+        for i in range(30):
+            title = Title.objects.create(
+                name=f'Произведение {i}', year=2000 + i % 5,
+                category=categories[i % 5],
+            )
+            title.genre.add(genres[i % 5])
+            for user in users:
+                review = Review.objects.create(
+                    title=title, author=user, text='Отзыв', score=5
+                )
+                Comment.objects.create(
+                    review=review, author=user, text='Комментарий'
+                )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.review = Review.objects.order_by('pk').first()
+
+    @pytest.mark.parametrize('url', (
+        '/api/v1/titles/?category=category-1&year=2001',
+        '/api/v1/titles/?genre=genre-1',
+        '/api/v1/titles/{title_id}/',
+        '/api/v1/titles/{title_id}/reviews/',
+        '/api/v1/titles/{title_id}/reviews/?cursor=',
+        '/api/v1/titles/{title_id}/reviews/{review_id}/',
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/',
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+        '{comment_id}/',
+    ))
+    def test_no_sequential_scans(self, client, url):
+        url = url.format(
+            title_id=self.review.title_id,
+            review_id=self.review.pk,
+            comment_id=self.review.comments.get().pk,
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == 200
+
+        for query in context.captured_queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            scans = explain(query['sql'])
+            assert not scans, (
+                f'Запрос {url} читает таблицу целиком: {scans}\n'
+                f'{query["sql"]}'
+            )
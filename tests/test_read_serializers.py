@@ -0,0 +1,126 @@
+import datetime as dt
+import json
+import random
+
+import pytest
+from api.serializers import (CommentReadSerializer, CommentSerializer,
+                             ReviewReadSerializer, ReviewSerializer,
+                             TitleReadSerializer, TitleUserSerializer)
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+WORDS = ('тишина', 'Zero', 'кавычки "в" тексте', 'ёжик', '🙂', "it's", '')
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+def random_text(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+
+
+def random_date(rng):
+    return timezone.make_aware(
+        dt.datetime(2000, 1, 1)
+        + dt.timedelta(
+            seconds=rng.randint(0, 10 ** 9),
+            microseconds=rng.choice((0, rng.randint(1, 999_999))),
+        ),
+        timezone.utc,
+    )
+
+
+def seed(rng):
+    users = [
+        User.objects.create(username=f'user{i}', email=f'user{i}@yamdb.fake')
+        for i in range(5)
+    ]
+    categories = [
+        Category.objects.create(name=random_text(rng), slug=f'category{i}')
+        for i in range(3)
+    ]
+    genres = [
+        Genre.objects.create(name=random_text(rng), slug=f'genre{i}')
+        for i in range(4)
+    ]
+    for i in range(15):
+        title = Title.objects.create(
+            name=random_text(rng) or f'Произведение {i}',
+            year=rng.randint(1900, 2020),
+            description=rng.choice((None, '', random_text(rng))),
+            category=rng.choice(categories + [None]),
+        )
+        title.genre.set(rng.sample(genres, rng.randint(0, len(genres))))
+        for author in rng.sample(users, rng.randint(0, len(users))):
+            review = Review.objects.create(
+                title=title,
+                author=author,
+                text=random_text(rng),
+                score=rng.randint(1, 10),
+            )
+            Review.objects.filter(pk=review.pk).update(
+                pub_date=random_date(rng)
+            )
+            for _ in range(rng.randint(0, 2)):
+                comment = Comment.objects.create(
+                    review=review,
+                    author=rng.choice(users),
+                    text=random_text(rng),
+                )
+                Comment.objects.filter(pk=comment.pk).update(
+                    pub_date=random_date(rng)
+                )
+    Title.objects.update_ratings()
+
+
+@pytest.mark.django_db
+class TestReadSerializers:
+
+    @pytest.fixture(autouse=True, params=(0, 1, 2))
+    def dataset(self, request):
+        seed(random.Random(request.param))
+
+    @pytest.mark.parametrize('serializer, read_serializer, queryset', (
+        (
+            TitleUserSerializer,
+            TitleReadSerializer,
+            lambda: Title.objects.select_related('category')
+            .prefetch_related('genre').defer('search_vector'),
+        ),
+        (
+            ReviewSerializer,
+            ReviewReadSerializer,
+            lambda: Review.objects.select_related('title', 'author'),
+        ),
+        (
+            CommentSerializer,
+            CommentReadSerializer,
+            lambda: Comment.objects.select_related('review', 'author'),
+        ),
+    ))
+    def test_same_output(self, serializer, read_serializer, queryset):
+        objects = list(queryset())
+        assert objects
+        assert render(read_serializer(objects, many=True).data) == render(
+            serializer(objects, many=True).data
+        )
+        assert render(read_serializer(objects[0]).data) == render(
+            serializer(objects[0]).data
+        )
+
+    def test_api_output(self, client):
+        response = client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        results = response.json()['results']
+        titles = Title.objects.in_bulk([result['id'] for result in results])
+        assert results == json.loads(render(TitleUserSerializer(
+            [titles[result['id']] for result in results], many=True
+        ).data))
+
+        review = Review.objects.order_by('pk').first()
+        response = client.get(
+            f'/api/v1/titles/{review.title_id}/reviews/{review.pk}/'
+        )
+        assert response.content == render(ReviewSerializer(review).data)
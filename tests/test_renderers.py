@@ -0,0 +1,109 @@
+import datetime as dt
+import uuid
+from decimal import Decimal
+from io import BytesIO
+
+import pytest
+from api import renderers
+from api.renderers import FastJSONParser, FastJSONRenderer
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+DATA = ReturnDict({
+    'count': 2,
+    'next': None,
+    'results': ReturnList([
+        {
+            'name': 'Произведение «1» \u2028\u2029',
+            'rating': None,
+            'genre': [],
+            'ratio': 0.1,
+        },
+        {'name': '🙂 "кавычки"\n', 'year': 2000, 'big': 2 ** 53},
+    ], serializer=None),
+    'pub_date': timezone.make_aware(
+        dt.datetime(2022, 5, 1, 12, 30, 15, 123456), timezone.utc
+    ),
+    'naive': dt.datetime(2022, 5, 1, 12, 30),
+    'date': dt.date(2022, 5, 1),
+    'time': dt.time(12, 30, 15),
+    'score': Decimal('7.25'),
+    'duration': dt.timedelta(minutes=90),
+    'uuid': uuid.UUID(int=1),
+    'lazy': gettext_lazy('Произведение'),
+    2000: 'число в ключе',
+}, serializer=None)
+
+
+class TestFastJSONRenderer:
+
+    def test_same_output(self):
+        assert FastJSONRenderer().render(DATA) == JSONRenderer().render(DATA)
+
+    def test_none(self):
+        assert FastJSONRenderer().render(None) == b''
+
+    def test_indent_falls_back(self):
+        media_type = 'application/json; indent=4'
+        assert FastJSONRenderer().render(DATA, media_type) == (
+            JSONRenderer().render(DATA, media_type)
+        )
+
+    def test_wide_int_falls_back(self):
+        data = {'big': 2 ** 70, 'name': 'Произведение'}
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_float_exponent(self):
+        # Известное отличие от JSONRenderer: экспонента без "+" и нулей.
+        assert FastJSONRenderer().render([1e16, 1e-7]) == b'[1e16,1e-7]'
+
+    def test_without_orjson(self, monkeypatch):
+        monkeypatch.setattr(renderers, 'orjson', None)
+        assert FastJSONRenderer().render(DATA) == JSONRenderer().render(DATA)
+
+    def test_configured(self):
+        assert api_settings.DEFAULT_RENDERER_CLASSES == [FastJSONRenderer]
+        assert BrowsableAPIRenderer not in api_settings.DEFAULT_RENDERER_CLASSES
+        assert api_settings.DEFAULT_PARSER_CLASSES[0] is FastJSONParser
+
+
+class TestFastJSONParser:
+
+    @pytest.mark.parametrize('content', (
+        b'{"name": "\\u041f\\u0440", "genre": ["drama"], "year": 2000}',
+        '{"name": "Произведение 🙂", "score": 7.5}'.encode(),
+        b'[]',
+    ))
+    def test_same_result(self, content):
+        assert FastJSONParser().parse(BytesIO(content)) == (
+            JSONParser().parse(BytesIO(content))
+        )
+
+    @pytest.mark.parametrize('content', (b'{"name": ', b'NaN', b''))
+    def test_invalid(self, content):
+        with pytest.raises(ParseError):
+            FastJSONParser().parse(BytesIO(content))
+
+    def test_other_encoding(self):
+        content = '{"name": "Произведение"}'.encode('utf-16')
+        assert FastJSONParser().parse(
+            BytesIO(content), parser_context={'encoding': 'utf-16'}
+        ) == {'name': 'Произведение'}
+
+    @pytest.mark.django_db
+    def test_api(self, admin_client, title):
+        response = admin_client.post(
+            '/api/v1/categories/',
+            '{"name": "Книга", "slug": "book"}',
+            content_type='application/json',
+        )
+        assert response.status_code == 201, response.content
+        assert response['Content-Type'] == 'application/json'
+        assert response.content == (
+            '{"name":"Книга","slug":"book"}'.encode()
+        )
@@ -0,0 +1,113 @@
+import pytest
+from reviews.models import Genre, Title
+
+
+# Версии ресурсов увеличиваются при фиксации транзакции (on_commit).
+@pytest.mark.django_db(transaction=True)
+class TestResponseCache:
+
+    def test_repeated_get_is_served_from_cache(self, client, title,
+                                               django_assert_num_queries):
+        response = client.get('/api/v1/titles/')
+        assert response['X-Cache'] == 'MISS'
+
+        # Только запрос версий ресурсов.
+        with django_assert_num_queries(1):
+            response = client.get('/api/v1/titles/')
+        assert response['X-Cache'] == 'HIT', (
+            'Проверьте, что повторный запрос отдаётся из кэша'
+        )
+        assert response.json()['results'][0]['name'] == title.name
+
+    def test_query_params_are_part_of_key(self, client, title):
+        client.get('/api/v1/titles/?year=2000')
+        response = client.get('/api/v1/titles/?year=1999')
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['count'] == 0
+
+    def test_write_invalidates_only_affected_resources(self, client,
+                                                       admin_client, title):
+        client.get('/api/v1/categories/')
+        client.get('/api/v1/genres/')
+
+        response = admin_client.post('/api/v1/categories/',
+                                     data={'name': 'Книга', 'slug': 'book'})
+        assert response.status_code == 201
+
+        response = client.get('/api/v1/categories/')
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что запись категории сбрасывает кэш категорий'
+        )
+        assert 'book' in [
+            category['slug'] for category in response.json()['results']
+        ]
+        assert client.get('/api/v1/genres/')['X-Cache'] == 'HIT', (
+            'Проверьте, что запись категории не сбрасывает кэш жанров'
+        )
+
+    def test_write_in_another_process_invalidates(self, client, title):
+        client.get('/api/v1/genres/')
+
+        # Так пишет другой воркер или админка: не через этот вьюсет.
+        Genre.objects.create(name='Комедия', slug='comedy')
+
+        response = client.get('/api/v1/genres/')
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что запись в обход вьюсета сбрасывает кэш'
+        )
+        assert response.json()['count'] == 2
+
+    def test_only_username_change_invalidates_reviews(
+        self, client, user, user_client, title
+    ):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        user_client.post(url, data={'text': 'Отзыв', 'score': 9})
+        client.get(url)
+
+        response = user_client.patch('/api/v1/users/me/',
+                                     data={'bio': 'Новая биография'})
+        assert response.status_code == 200
+        assert client.get(url)['X-Cache'] == 'HIT', (
+            'Проверьте, что изменение профиля без смены имени не сбрасывает '
+            'кэш отзывов'
+        )
+
+        user.username = 'renamed'
+        user.save()
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что смена имени автора сбрасывает кэш отзывов'
+        )
+        assert response.json()['results'][0]['author'] == 'renamed'
+
+    def test_review_invalidates_its_title(self, client, user_client, title):
+        other = Title.objects.create(name='Другое', year=2001)
+        other.genre.add(Genre.objects.get())
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        other_url = f'/api/v1/titles/{other.id}/reviews/'
+        client.get(url)
+        client.get(other_url)
+        client.get(f'/api/v1/titles/{title.id}/')
+
+        user_client.post(url, data={'text': 'Отзыв', 'score': 9})
+
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['count'] == 1
+        assert client.get(other_url)['X-Cache'] == 'HIT', (
+            'Проверьте, что отзыв не сбрасывает кэш отзывов других '
+            'произведений'
+        )
+        response = client.get(f'/api/v1/titles/{title.id}/')
+        assert response.json()['rating'] == 9, (
+            'Проверьте, что отзыв сбрасывает кэш рейтинга произведения'
+        )
+
+    def test_stats(self, client, user_client, admin_client, title):
+        client.get('/api/v1/genres/')
+        client.get('/api/v1/genres/')
+
+        assert user_client.get('/api/v1/cache/stats/').status_code == 403
+        response = admin_client.get('/api/v1/cache/stats/')
+        assert response.status_code == 200
+        assert response.json()['genres'] == {'hits': 1, 'misses': 1}
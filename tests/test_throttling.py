@@ -0,0 +1,99 @@
+import time
+
+import pytest
+from api import throttling
+
+
+def get_token(client, username):
+    return client.post('/api/v1/auth/token/', data={
+        'username': username, 'confirmation_code': 'wrong',
+    })
+
+
+@pytest.mark.django_db
+class TestThrottling:
+
+    @pytest.fixture(params=('CacheStore', 'MemoryStore'))
+    def store(self, request, settings):
+        settings.API_THROTTLE = dict(
+            settings.API_THROTTLE,
+            STORE=f'api.throttling.{request.param}',
+            RATES={'token_ip': '4/m', 'token_username': '2/m'},
+        )
+        throttling.MemoryStore.clear()
+        yield
+        throttling.MemoryStore.clear()
+
+    def test_username_bucket(self, client, user, store,
+                             django_assert_num_queries):
+        for _ in range(2):
+            assert get_token(client, user.username).status_code == 400
+
+        with django_assert_num_queries(0):
+            response = get_token(client, user.username.upper())
+        assert response.status_code == 429, (
+            'Проверьте, что перебор кода для одного имени ограничен'
+        )
+        assert 0 < int(response['Retry-After']) <= 30
+
+    def test_ip_bucket(self, client, store):
+        for number in range(4):
+            assert get_token(client, f'user{number}').status_code == 404
+
+        assert get_token(client, 'other').status_code == 429
+
+    def test_ip_bucket_behind_proxy(self, client, store):
+        # nginx дописывает адрес клиента в конец X-Forwarded-For,
+        # подставленные клиентом адреса не помогают обойти ограничение.
+        for number in range(4):
+            response = client.post(
+                '/api/v1/auth/token/',
+                {'username': f'user{number}', 'confirmation_code': 'wrong'},
+                HTTP_X_FORWARDED_FOR=f'10.0.0.{number}, 203.0.113.7',
+            )
+            assert response.status_code == 404
+
+        response = client.post(
+            '/api/v1/auth/token/',
+            {'username': 'other', 'confirmation_code': 'wrong'},
+            HTTP_X_FORWARDED_FOR='10.0.0.99, 203.0.113.7',
+        )
+        assert response.status_code == 429
+        response = client.post(
+            '/api/v1/auth/token/',
+            {'username': 'other', 'confirmation_code': 'wrong'},
+            HTTP_X_FORWARDED_FOR='203.0.113.8',
+        )
+        assert response.status_code == 404, (
+            'Проверьте, что клиенты за nginx ограничиваются по своим '
+            'адресам, а не по адресу nginx'
+        )
+
+    def test_bucket_refills(self, client, user, store, monkeypatch):
+        for _ in range(2):
+            get_token(client, user.username)
+        assert get_token(client, user.username).status_code == 429
+
+        now = time.time()
+        monkeypatch.setattr(throttling.time, 'time', lambda: now + 31)
+        assert get_token(client, user.username).status_code == 400
+        assert get_token(client, user.username).status_code == 429
+
+    def test_disabled(self, client, user, settings):
+        settings.API_THROTTLE = dict(
+            settings.API_THROTTLE, ENABLED=False,
+            RATES={'token_username': '1/m'},
+        )
+        for _ in range(3):
+            assert get_token(client, user.username).status_code == 400
+
+    def test_stats(self, client, user, admin_client, store):
+        for _ in range(3):
+            get_token(client, user.username)
+
+        response = admin_client.get('/api/v1/throttle/stats/')
+        assert response.status_code == 200
+        assert response.json()['token_username'] == {
+            'allowed': 2, 'throttled': 1
+        }
+        assert response.json()['token_ip'] == {'allowed': 3, 'throttled': 0}
@@ -0,0 +1,72 @@
+import pytest
+from reviews.models import Category, Genre, Title
+
+
+@pytest.mark.django_db
+class TestTitleFacets:
+    # Запросы списка произведений и один запрос на все фасеты.
+    LIST_QUERIES = 5
+
+    @pytest.fixture(autouse=True)
+    def titles(self):
+        movie = Category.objects.create(name='Фильм', slug='movie')
+        book = Category.objects.create(name='Книга', slug='book')
+        drama = Genre.objects.create(name='Драма', slug='drama')
+        comedy = Genre.objects.create(name='Комедия', slug='comedy')
+        for name, year, category, genres in (
+            ('Крестный отец', 1972, movie, (drama,)),
+            ('Побег из Шоушенка', 1994, movie, (drama,)),
+            ('Маска', 1994, movie, (comedy, drama)),
+            ('Мастер и Маргарита', 1967, book, (drama,)),
+            ('Без категории', 2001, None, ()),
+        ):
+            title = Title.objects.create(
+                name=name, year=year, category=category
+            )
+            title.genre.set(genres)
+
+    def test_facets(self, client, django_assert_num_queries):
+        with django_assert_num_queries(self.LIST_QUERIES):
+            response = client.get('/api/v1/titles/', {'facets': 'true'})
+
+        assert response.status_code == 200
+        assert response.json()['facets'] == {
+            'category': {'movie': 3, 'book': 1},
+            'genre': {'drama': 4, 'comedy': 1},
+            'year': {'1960-1969': 1, '1970-1979': 1, '1990-1999': 2,
+                     '2000-2009': 1},
+        }
+
+    def test_facets_follow_filters(self, client):
+        response = client.get(
+            '/api/v1/titles/', {'facets': '1', 'genre': 'comedy'}
+        )
+
+        assert response.json()['count'] == 1
+        assert response.json()['facets'] == {
+            'category': {'movie': 1},
+            'genre': {'comedy': 1, 'drama': 1},
+            'year': {'1990-1999': 1},
+        }, 'Проверьте, что фасеты считаются по отфильтрованной выборке'
+
+    def test_no_facets_by_default(self, client):
+        assert 'facets' not in client.get('/api/v1/titles/').json()
+
+    # Версии ресурсов увеличиваются при фиксации транзакции.
+    @pytest.mark.django_db(transaction=True)
+    def test_title_write_refreshes_cached_facets(self, client, admin_client):
+        url = '/api/v1/titles/?facets=true'
+        client.get(url)
+        assert client.get(url)['X-Cache'] == 'HIT'
+
+        response = admin_client.post('/api/v1/titles/', data={
+            'name': 'Бриллиантовая рука', 'year': 1968,
+            'category': 'movie', 'genre': ['comedy'],
+        })
+        assert response.status_code == 201
+
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS'
+        facets = response.json()['facets']
+        assert facets['category']['movie'] == 4
+        assert facets['year']['1960-1969'] == 2
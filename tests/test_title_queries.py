@@ -0,0 +1,52 @@
+import pytest
+from rest_framework.pagination import PageNumberPagination
+from reviews.models import Category, Genre, Title
+
+
+def create_titles(count):
+    genres = [
+        Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+        for i in range(3)
+    ]
+    for i in range(count):
+        category = Category.objects.create(name=f'Категория {i}',
+                                           slug=f'category-{i}')
+        title = Title.objects.create(name=f'Произведение {i}', year=2000,
+                                     category=category)
+        title.genre.set(genres)
+
+
+@pytest.mark.django_db
+class TestTitleQueries:
+    # Версии ресурсов, COUNT для пагинации, произведения с категориями
+    # и жанры страницы.
+    LIST_QUERIES = 4
+    # Версии ресурсов, произведение с категорией и его жанры.
+    RETRIEVE_QUERIES = 3
+
+    @pytest.mark.parametrize('page_size', (1, 10, 50))
+    def test_list_queries_do_not_depend_on_page_size(
+        self, client, monkeypatch, django_assert_num_queries, page_size
+    ):
+        monkeypatch.setattr(PageNumberPagination, 'page_size', page_size)
+        create_titles(page_size)
+
+        with django_assert_num_queries(self.LIST_QUERIES):
+            response = client.get('/api/v1/titles/')
+
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert len(results) == page_size
+        assert all(len(title['genre']) == 3 for title in results), (
+            'Проверьте, что в ответе возвращаются все жанры произведения'
+        )
+
+    def test_retrieve_queries(self, client, django_assert_num_queries):
+        create_titles(1)
+        title = Title.objects.get()
+
+        with django_assert_num_queries(self.RETRIEVE_QUERIES):
+            response = client.get(f'/api/v1/titles/{title.id}/')
+
+        assert response.status_code == 200
+        assert response.json()['category']['slug'] == 'category-0'
@@ -0,0 +1,166 @@
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+from reviews.models import Comment, Review, Title, User
+
+
+@pytest.mark.django_db
+class TestTitleRating:
+
+    def get_rating(self, client, title):
+        response = client.get(f'/api/v1/titles/{title.id}/')
+        assert response.status_code == 200
+        return response.json()['rating']
+
+    # Версии ресурсов увеличиваются при фиксации транзакции.
+    @pytest.mark.django_db(transaction=True)
+    def test_rating_follows_reviews(self, user_client, another_user_client,
+                                    title):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        assert self.get_rating(user_client, title) is None, (
+            'Проверьте, что рейтинг произведения без отзывов равен None'
+        )
+
+        response = user_client.post(url, data={'text': 'a', 'score': 10})
+        assert response.status_code == 201
+        review_id = response.json()['id']
+        another_user_client.post(url, data={'text': 'b', 'score': 5})
+        assert self.get_rating(user_client, title) == 7, (
+            'Проверьте, что рейтинг обновляется при добавлении отзыва'
+        )
+
+        user_client.patch(f'{url}{review_id}/', data={'score': 1})
+        assert self.get_rating(user_client, title) == 3, (
+            'Проверьте, что рейтинг обновляется при изменении оценки'
+        )
+
+        user_client.delete(f'{url}{review_id}/')
+        assert self.get_rating(user_client, title) == 5, (
+            'Проверьте, что рейтинг обновляется при удалении отзыва'
+        )
+        title.refresh_from_db()
+        assert (title.rating_sum, title.review_count) == (5, 1)
+
+    def test_rating_follows_cascade_delete(self, user, another_user, title):
+        Review.objects.create(title=title, author=user, text='a', score=8)
+        Review.objects.create(title=title, author=another_user, text='b',
+                              score=2)
+        another_user.delete()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.review_count) == (8, 1), (
+            'Проверьте, что рейтинг обновляется при каскадном удалении '
+            'отзывов'
+        )
+
+    def rating_queries(self, context):
+        return [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('UPDATE "reviews_title"')
+        ]
+
+    def seed_reviews(self, title, other_title, count=20):
+        authors = [
+            User.objects.create(username=f'author{i}',
+                                email=f'author{i}@yamdb.fake')
+            for i in range(count)
+        ]
+        for author in authors:
+            review = Review.objects.create(title=title, author=author,
+                                           text='a', score=4)
+            Comment.objects.create(review=review, author=author, text='c')
+            Review.objects.create(title=other_title, author=author,
+                                  text='b', score=6)
+        return authors
+
+    # Связи с жанрами, отзывы и комментарии выбираются и удаляются
+    # тремя парами запросов, затем удаляется само произведение и одним
+    # запросом увеличиваются версии ресурсов.
+    TITLE_DELETE_QUERIES = 8
+    # Отзывы и комментарии автора, произведения его отзывов, удаление
+    # связанных строк и пользователя, пересчёт рейтинга и версии.
+    AUTHOR_DELETE_QUERIES = 12
+
+    @pytest.mark.django_db(transaction=True)
+    def test_title_delete_queries(self, title, assert_num_data_queries):
+        other_title = Title.objects.create(name='Другое', year=2000)
+        self.seed_reviews(title, other_title)
+
+        with assert_num_data_queries(self.TITLE_DELETE_QUERIES) as context:
+            title.delete()
+        assert self.rating_queries(context) == [], (
+            'Проверьте, что каскадное удаление отзывов произведения не '
+            'обновляет его рейтинг'
+        )
+        other_title.refresh_from_db()
+        assert (other_title.rating_sum, other_title.review_count) == (
+            120, 20
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_author_delete_queries(self, title, assert_num_data_queries):
+        other_title = Title.objects.create(name='Другое', year=2000)
+        author, *_ = self.seed_reviews(title, other_title)
+
+        with assert_num_data_queries(self.AUTHOR_DELETE_QUERIES) as context:
+            author.delete()
+        assert len(self.rating_queries(context)) == 1, (
+            'Проверьте, что рейтинг произведений удалённого автора '
+            'пересчитывается одним запросом'
+        )
+        for rated in (title, other_title):
+            rated.refresh_from_db()
+            assert rated.review_count == 19
+        assert (title.rating_sum, other_title.rating_sum) == (76, 114)
+
+    def test_rebuild_ratings_command(self, user, title):
+        Review.objects.create(title=title, author=user, text='a', score=6)
+        Title.objects.update(rating_sum=0, review_count=0)
+
+        with pytest.raises(CommandError):
+            call_command('rebuild_ratings', '--check')
+
+        call_command('rebuild_ratings')
+        title.refresh_from_db()
+        assert (title.rating_sum, title.review_count) == (6, 1)
+        call_command('rebuild_ratings', '--check')
+
+    def test_rating_follows_moved_review(self, user, title):
+        other = Title.objects.create(name='Другое', year=2000)
+        review = Review.objects.create(title=title, author=user, text='a',
+                                       score=6)
+        review = Review.objects.get(pk=review.pk)
+        review.title = other
+        review.save()
+
+        title.refresh_from_db()
+        other.refresh_from_db()
+        assert (title.rating_sum, title.review_count) == (0, 0), (
+            'Проверьте, что перенос отзыва убирает оценку у прежнего '
+            'произведения'
+        )
+        assert (other.rating_sum, other.review_count) == (6, 1)
+
+    def test_rating_after_loaddata(self, user, tmp_path):
+        fixture = tmp_path / 'fixture.json'
+        fixture.write_text(json.dumps([
+            {
+                'model': 'reviews.review',
+                'pk': 1,
+                'fields': {
+                    'title': 10, 'author': user.pk, 'text': 'a', 'score': 4,
+                    'pub_date': '2022-01-01T00:00:00Z',
+                },
+            },
+            {
+                'model': 'reviews.title',
+                'pk': 10,
+                'fields': {'name': 'Из фикстуры', 'year': 2000, 'genre': []},
+            },
+        ]))
+
+        call_command('loaddata', str(fixture), verbosity=0)
+        title = Title.objects.get(pk=10)
+        assert (title.rating_sum, title.review_count) == (4, 1), (
+            'Проверьте, что рейтинг считается для данных из фикстур'
+        )
@@ -0,0 +1,73 @@
+import pytest
+from reviews.models import Category, Title
+from reviews.search import rank, similarity
+
+
+def names(response):
+    assert response.status_code == 200
+    return [title['name'] for title in response.json()['results']]
+
+
+class TestSearchRank:
+
+    def test_similarity_matches_pg_trgm(self):
+        # SELECT similarity('word', 'two words') в PostgreSQL.
+        assert similarity('word', 'two words') == pytest.approx(4 / 11)
+
+    def test_name_outranks_description(self):
+        assert rank('побег', 'Побег из Шоушенка', '') > rank(
+            'побег', 'Зелёная миля', 'Тоже о побеге'
+        ) > 0
+
+    def test_all_words_must_match(self):
+        assert rank('побег миля', 'Побег из Шоушенка', '') == 0
+
+
+@pytest.mark.django_db
+class TestTitleSearch:
+
+    @pytest.fixture(autouse=True)
+    def titles(self):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        for name, description in (
+            ('Зелёная миля', 'Надзиратель и заключённый, тоже о побеге'),
+            ('Побег из Шоушенка', 'Тюремная драма'),
+            ('Крестный отец', None),
+        ):
+            Title.objects.create(
+                name=name, description=description, year=1994,
+                category=category,
+            )
+
+    def test_ranked_by_relevance(self, client):
+        response = client.get('/api/v1/titles/', {'search': 'побег'})
+
+        assert names(response) == ['Побег из Шоушенка', 'Зелёная миля'], (
+            'Проверьте, что совпадения в названии идут раньше совпадений '
+            'в описании'
+        )
+        assert 'search_vector' not in response.json()['results'][0]
+
+    def test_prefix(self, client):
+        response = client.get('/api/v1/titles/', {'search': 'крест'})
+
+        assert names(response) == ['Крестный отец']
+
+    def test_typo(self, client):
+        response = client.get('/api/v1/titles/', {'search': 'Шоушенко'})
+
+        assert names(response) == ['Побег из Шоушенка'], (
+            'Проверьте, что поиск находит название с опечаткой по триграммам'
+        )
+
+    def test_combined_with_filters(self, client):
+        response = client.get(
+            '/api/v1/titles/', {'search': 'побег', 'category': 'book'}
+        )
+
+        assert names(response) == []
+
+    def test_no_words(self, client):
+        response = client.get('/api/v1/titles/', {'search': '?!'})
+
+        assert names(response) == []
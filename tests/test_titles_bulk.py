@@ -0,0 +1,144 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Category, Genre, Title
+
+
+@pytest.mark.django_db
+class TestTitlesBulk:
+    URL = '/api/v1/titles/bulk/'
+
+    @pytest.fixture(autouse=True)
+    def slugs(self):
+        Category.objects.create(name='Фильм', slug='movie')
+        Category.objects.create(name='Книга', slug='book')
+        Genre.objects.create(name='Драма', slug='drama')
+        Genre.objects.create(name='Комедия', slug='comedy')
+
+    def get_items(self, count):
+        return [
+            {
+                'name': f'Произведение {index}',
+                'year': 1950 + index % 70,
+                'category': ('movie', 'book')[index % 2],
+                'genre': ['drama', 'comedy'][:index % 3],
+            }
+            for index in range(count)
+        ]
+
+    def test_bulk_create(self, admin_client):
+        items = self.get_items(50)
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(self.URL, items, format='json')
+
+        assert response.status_code == 201
+        data = response.json()
+        assert len(data) == 50
+        assert Title.objects.count() == 50
+        title = Title.objects.get(pk=data[5]['id'])
+        assert title.name == 'Произведение 5'
+        assert title.category.slug == 'book'
+        assert [genre.slug for genre in title.genre.all()] == ['drama', 'comedy']
+        assert data[5] == dict(items[5], id=title.pk, description=None)
+
+        selects = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+        ]
+        through_inserts = [
+            query['sql'] for query in context.captured_queries
+            if 'INSERT INTO "reviews_title_genre"' in query['sql']
+        ]
+        assert len(selects) == 2, (
+            'Проверьте, что категории и жанры всего пакета загружаются '
+            'одним запросом на модель'
+        )
+        assert len(through_inserts) == 1, (
+            'Проверьте, что связи с жанрами вставляются одним запросом'
+        )
+
+    def test_per_item_errors(self, admin_client):
+        items = self.get_items(4)
+        items[1]['category'] = 'music'
+        items[2]['genre'] = ['drama', 'horror']
+        items[3]['year'] = 3000
+
+        response = admin_client.post(self.URL, items, format='json')
+
+        assert response.status_code == 201
+        data = response.json()
+        assert 'id' in data[0]
+        assert set(data[1]['errors']) == {'category'}
+        assert 'horror' in data[2]['errors']['genre'][0]
+        assert set(data[3]['errors']) == {'year'}
+        assert Title.objects.count() == 1
+
+    def test_all_invalid(self, admin_client):
+        response = admin_client.post(
+            self.URL, [{'name': 'Без года'}], format='json'
+        )
+
+        assert response.status_code == 400
+        assert set(response.json()[0]['errors']) >= {'year', 'category'}
+        assert not Title.objects.exists()
+
+    def test_not_a_list(self, admin_client):
+        response = admin_client.post(
+            self.URL, self.get_items(1)[0], format='json'
+        )
+        assert response.status_code == 400
+
+    def test_too_many_items(self, admin_client, settings):
+        settings.TITLES_BULK = dict(settings.TITLES_BULK, MAX_ITEMS=2)
+        response = admin_client.post(
+            self.URL, self.get_items(3), format='json'
+        )
+        assert response.status_code == 400
+        assert not Title.objects.exists()
+
+    def test_admin_only(self, client, user_client):
+        items = self.get_items(1)
+        assert client.post(
+            self.URL, json.dumps(items), content_type='application/json'
+        ).status_code == 401
+        assert user_client.post(
+            self.URL, items, format='json'
+        ).status_code == 403
+
+    def test_fetch_by_ids(
+        self, admin_client, client, django_assert_num_queries
+    ):
+        ids = [
+            item['id'] for item in admin_client.post(
+                self.URL, self.get_items(30), format='json'
+            ).json()
+        ]
+        wanted = ids[::2]
+
+        # Версии ресурсов, произведения и их жанры.
+        with django_assert_num_queries(3):
+            response = client.get(
+                '/api/v1/titles/', {'ids': ','.join(map(str, wanted))}
+            )
+
+        assert response.status_code == 200
+        assert [title['id'] for title in response.json()] == wanted
+
+    def test_fetch_too_many_ids(self, client, settings):
+        settings.TITLES_BULK = dict(settings.TITLES_BULK, MAX_ITEMS=2)
+        response = client.get('/api/v1/titles/', {'ids': '1,2,3'})
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize('ids', ('', ',', ',,'))
+    def test_empty_ids_paginated(self, admin_client, client, ids):
+        admin_client.post(self.URL, self.get_items(15), format='json')
+        response = client.get('/api/v1/titles/', {'ids': ids})
+        assert response.status_code == 200
+        data = response.json()
+        assert data['count'] == 15
+        assert len(data['results']) == 10, (
+            'Проверьте, что с пустым ids список произведений отдаётся '
+            'по страницам'
+        )
@@ -0,0 +1,44 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import User
+
+
+@pytest.mark.django_db
+class TestUserCreation:
+
+    def test_signup_writes_user_once(self, client):
+        with CaptureQueriesContext(connection) as context:
+            response = client.post('/api/v1/auth/signup/', data={
+                'username': 'newbie', 'email': 'newbie@yamdb.fake'
+            })
+
+        assert response.status_code == 200
+        user_writes = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith(('INSERT', 'UPDATE'))
+            and '"reviews_user"' in query['sql']
+        ]
+        assert len(user_writes) == 1, (
+            'Проверьте, что код подтверждения создаётся до вставки '
+            'пользователя, без повторного сохранения'
+        )
+        assert User.objects.get().confirmation_code
+
+    def test_code_length(self, settings):
+        settings.CONFIRMATION_CODE_LENGTH = 8
+        user = User.objects.create(username='newbie', email='n@yamdb.fake')
+
+        assert len(user.confirmation_code) == 8
+        assert user.confirmation_code.isdigit()
+
+    def test_bulk_create_sets_codes(self):
+        User.objects.bulk_create(
+            User(username=f'user{i}', email=f'user{i}@yamdb.fake')
+            for i in range(50)
+        )
+
+        codes = list(User.objects.values_list('confirmation_code', flat=True))
+        assert len(codes) == 50
+        assert all(code and code.isdigit() for code in codes)
+        assert len(set(codes)) > 1